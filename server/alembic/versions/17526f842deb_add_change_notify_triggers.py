@@ -0,0 +1,78 @@
+"""Add change notification triggers
+
+Revision ID: 17526f842deb
+Revises: d1a0243a2798
+Create Date: 2026-10-19 09:12:41.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '17526f842deb'
+down_revision: Union[str, Sequence[str], None] = 'd1a0243a2798'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, event, transition table, id column, event type)
+TRIGGERS = [
+    ('tickets', 'INSERT', 'NEW', 'id', 'ticket.created'),
+    ('tickets', 'UPDATE', 'NEW', 'id', 'ticket.updated'),
+    ('tickets', 'DELETE', 'OLD', 'id', 'ticket.deleted'),
+    ('tags', 'INSERT', 'NEW', 'id', 'tag.created'),
+    ('tags', 'UPDATE', 'NEW', 'id', 'tag.updated'),
+    ('tags', 'DELETE', 'OLD', 'id', 'tag.deleted'),
+    ('ticket_tags', 'INSERT', 'NEW', 'ticket_id', 'ticket.tags_changed'),
+    ('ticket_tags', 'DELETE', 'OLD', 'ticket_id', 'ticket.tags_changed'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Statement-level trigger function: one NOTIFY per statement, so batch
+    # operations produce a single event instead of one per row. Large ID
+    # lists are dropped to stay under the 8000 byte NOTIFY payload limit.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_pmanager_change()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            ids integer[];
+            payload json;
+        BEGIN
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM changed_rows', TG_ARGV[1])
+            INTO ids;
+            IF ids IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            payload := json_build_object(
+                'type', TG_ARGV[0],
+                'ids', CASE WHEN cardinality(ids) <= 500 THEN to_json(ids) END,
+                'count', cardinality(ids),
+                'batch', cardinality(ids) > 1
+            );
+            PERFORM pg_notify('pmanager_events', payload::text);
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+    """)
+
+    for table, event, transition, column, event_type in TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER notify_{table}_{event.lower()}
+            AFTER {event} ON {table}
+            REFERENCING {transition} TABLE AS changed_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION notify_pmanager_change('{event_type}', '{column}');
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, event, _, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS notify_{table}_{event.lower()} ON {table};")
+
+    op.execute("DROP FUNCTION IF EXISTS notify_pmanager_change();")
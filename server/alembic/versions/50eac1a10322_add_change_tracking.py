@@ -0,0 +1,96 @@
+"""Add change tracking for incremental sync
+
+Revision ID: 50eac1a10322
+Revises: 17526f842deb
+Create Date: 2026-10-19 11:03:27.581930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '50eac1a10322'
+down_revision: Union[str, Sequence[str], None] = '17526f842deb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows get 0 so they show up in a full (since=0) sync
+    op.add_column(
+        'tickets',
+        sa.Column('change_xid', sa.BigInteger(), server_default='0', nullable=False)
+    )
+    op.create_index(op.f('ix_tickets_change_xid'), 'tickets', ['change_xid'], unique=False)
+    op.create_index(op.f('ix_tickets_updated_at'), 'tickets', ['updated_at'], unique=False)
+
+    op.create_table('ticket_tombstones',
+    sa.Column('ticket_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_xid', sa.BigInteger(), nullable=False),
+    sa.Column(
+        'deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True
+    ),
+    sa.PrimaryKeyConstraint('ticket_id')
+    )
+    op.create_index(
+        op.f('ix_ticket_tombstones_deleted_xid'), 'ticket_tombstones', ['deleted_xid'], unique=False
+    )
+
+    # Stamp every insert/update with the writing transaction's ID. Unlike
+    # timestamps, xids are immune to clock skew, and the snapshot xmin tells
+    # us which of them are guaranteed to be finished.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_change_xid()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.change_xid = pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql';
+    """)
+    op.execute("""
+        CREATE TRIGGER set_tickets_change_xid
+        BEFORE INSERT OR UPDATE ON tickets
+        FOR EACH ROW
+        EXECUTE FUNCTION set_change_xid();
+    """)
+
+    # Deletion log, written once per statement so batch deletes stay cheap
+    op.execute("""
+        CREATE OR REPLACE FUNCTION log_ticket_tombstones()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO ticket_tombstones (ticket_id, deleted_xid)
+            SELECT id, pg_current_xact_id()::text::bigint FROM deleted_rows
+            ON CONFLICT (ticket_id) DO UPDATE SET
+                deleted_xid = EXCLUDED.deleted_xid,
+                deleted_at = now();
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+    """)
+    op.execute("""
+        CREATE TRIGGER log_tickets_tombstones
+        AFTER DELETE ON tickets
+        REFERENCING OLD TABLE AS deleted_rows
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION log_ticket_tombstones();
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS log_tickets_tombstones ON tickets;")
+    op.execute("DROP FUNCTION IF EXISTS log_ticket_tombstones();")
+    op.execute("DROP TRIGGER IF EXISTS set_tickets_change_xid ON tickets;")
+    op.execute("DROP FUNCTION IF EXISTS set_change_xid();")
+
+    op.drop_index(op.f('ix_ticket_tombstones_deleted_xid'), table_name='ticket_tombstones')
+    op.drop_table('ticket_tombstones')
+    op.drop_index(op.f('ix_tickets_updated_at'), table_name='tickets')
+    op.drop_index(op.f('ix_tickets_change_xid'), table_name='tickets')
+    op.drop_column('tickets', 'change_xid')
@@ -0,0 +1,119 @@
+"""Add ticket archive tables
+
+Revision ID: 58a3827d78ff
+Revises: 7846895e11df
+Create Date: 2026-10-19 15:26:48.930171
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '58a3827d78ff'
+down_revision: Union[str, Sequence[str], None] = '7846895e11df'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Archiving moves rows out of tickets with DELETE. The archive job sets this
+# transaction-local flag so the delete is not reported as a user deletion.
+ARCHIVING_CHECK = "coalesce(current_setting('pmanager.archiving', true), '') = 'on'"
+
+NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_pmanager_change()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        ids integer[];
+        payload json;
+    BEGIN
+        {guard}
+        EXECUTE format('SELECT array_agg(DISTINCT %I) FROM changed_rows', TG_ARGV[1])
+        INTO ids;
+        IF ids IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        payload := json_build_object(
+            'type', TG_ARGV[0],
+            'ids', CASE WHEN cardinality(ids) <= 500 THEN to_json(ids) END,
+            'count', cardinality(ids),
+            'batch', cardinality(ids) > 1
+        );
+        PERFORM pg_notify('pmanager_events', payload::text);
+        RETURN NULL;
+    END;
+    $$ language 'plpgsql';
+"""
+
+TOMBSTONE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION log_ticket_tombstones()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        {guard}
+        INSERT INTO ticket_tombstones (ticket_id, deleted_xid)
+        SELECT id, pg_current_xact_id()::text::bigint FROM deleted_rows
+        ON CONFLICT (ticket_id) DO UPDATE SET
+            deleted_xid = EXCLUDED.deleted_xid,
+            deleted_at = now();
+        RETURN NULL;
+    END;
+    $$ language 'plpgsql';
+"""
+
+GUARD = f"IF {ARCHIVING_CHECK} THEN RETURN NULL; END IF;"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tickets_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('is_completed', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column(
+        'archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True
+    ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        op.f('ix_tickets_archive_updated_at'), 'tickets_archive', ['updated_at'], unique=False
+    )
+    op.create_table('ticket_tags_archive',
+    sa.Column('ticket_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column(
+        'created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True
+    ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['ticket_id'], ['tickets_archive.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ticket_id', 'tag_id')
+    )
+    op.create_index(
+        'ix_ticket_tags_archive_tag_id', 'ticket_tags_archive', ['tag_id'], unique=False
+    )
+
+    # Archive candidates: completed tickets by age, without touching open ones
+    op.create_index(
+        'ix_tickets_completed_updated_at', 'tickets', ['updated_at'],
+        unique=False, postgresql_where=sa.text('is_completed')
+    )
+
+    op.execute(NOTIFY_FUNCTION.format(guard=GUARD))
+    op.execute(TOMBSTONE_FUNCTION.format(guard=GUARD))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(TOMBSTONE_FUNCTION.format(guard=""))
+    op.execute(NOTIFY_FUNCTION.format(guard=""))
+
+    op.drop_index('ix_tickets_completed_updated_at', table_name='tickets')
+    op.drop_index('ix_ticket_tags_archive_tag_id', table_name='ticket_tags_archive')
+    op.drop_table('ticket_tags_archive')
+    op.drop_index(op.f('ix_tickets_archive_updated_at'), table_name='tickets_archive')
+    op.drop_table('tickets_archive')
@@ -0,0 +1,115 @@
+"""Add soft delete for tickets
+
+Revision ID: 641b20079d95
+Revises: 58a3827d78ff
+Create Date: 2026-10-19 17:05:13.448261
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '641b20079d95'
+down_revision: Union[str, Sequence[str], None] = '58a3827d78ff'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tickets', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    # Live-ticket reads never see deleted rows in their index
+    op.create_index(
+        'ix_tickets_live_updated_at', 'tickets', ['updated_at'],
+        unique=False, postgresql_where=sa.text('deleted_at IS NULL')
+    )
+    # Purger scan: only the (few) soft-deleted rows
+    op.create_index(
+        'ix_tickets_deleted_at', 'tickets', ['deleted_at'],
+        unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL')
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_pmanager_ids(event_type text, ids integer[])
+        RETURNS void AS $$
+        BEGIN
+            IF ids IS NULL THEN
+                RETURN;
+            END IF;
+            PERFORM pg_notify('pmanager_events', json_build_object(
+                'type', event_type,
+                'ids', CASE WHEN cardinality(ids) <= 500 THEN to_json(ids) END,
+                'count', cardinality(ids),
+                'batch', cardinality(ids) > 1
+            )::text);
+        END;
+        $$ language 'plpgsql';
+    """)
+
+    # Soft deletes are UPDATEs that set deleted_at: report them as deletions.
+    # The purger's hard deletes were already reported, so they stay silent.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_pmanager_change()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            ids integer[];
+        BEGIN
+            IF coalesce(current_setting('pmanager.archiving', true), '') = 'on'
+               OR coalesce(current_setting('pmanager.purging', true), '') = 'on' THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_TABLE_NAME = 'tickets' AND TG_OP = 'UPDATE' THEN
+                SELECT array_agg(id) INTO ids FROM changed_rows WHERE deleted_at IS NOT NULL;
+                PERFORM notify_pmanager_ids('ticket.deleted', ids);
+                SELECT array_agg(id) INTO ids FROM changed_rows WHERE deleted_at IS NULL;
+                PERFORM notify_pmanager_ids('ticket.updated', ids);
+                RETURN NULL;
+            END IF;
+
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM changed_rows', TG_ARGV[1])
+            INTO ids;
+            PERFORM notify_pmanager_ids(TG_ARGV[0], ids);
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_pmanager_change()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            ids integer[];
+            payload json;
+        BEGIN
+            IF coalesce(current_setting('pmanager.archiving', true), '') = 'on' THEN
+                RETURN NULL;
+            END IF;
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM changed_rows', TG_ARGV[1])
+            INTO ids;
+            IF ids IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            payload := json_build_object(
+                'type', TG_ARGV[0],
+                'ids', CASE WHEN cardinality(ids) <= 500 THEN to_json(ids) END,
+                'count', cardinality(ids),
+                'batch', cardinality(ids) > 1
+            );
+            PERFORM pg_notify('pmanager_events', payload::text);
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+    """)
+    op.execute("DROP FUNCTION IF EXISTS notify_pmanager_ids(text, integer[]);")
+
+    op.drop_index('ix_tickets_deleted_at', table_name='tickets')
+    op.drop_index('ix_tickets_live_updated_at', table_name='tickets')
+    op.drop_column('tickets', 'deleted_at')
@@ -0,0 +1,30 @@
+"""Add version columns for optimistic concurrency
+
+Revision ID: 7846895e11df
+Revises: 50eac1a10322
+Create Date: 2026-10-19 13:40:02.115384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7846895e11df'
+down_revision: Union[str, Sequence[str], None] = '50eac1a10322'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tickets', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('tags', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tags', 'version')
+    op.drop_column('tickets', 'version')
@@ -0,0 +1,33 @@
+"""Add title prefix index for short searches
+
+Revision ID: a3c94e1f7b26
+Revises: 641b20079d95
+Create Date: 2026-10-19 19:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c94e1f7b26'
+down_revision: Union[str, Sequence[str], None] = '641b20079d95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Search terms under SEARCH_MIN_LENGTH become lower(title) LIKE 'x%'
+    op.create_index(
+        'ix_tickets_title_lower_prefix', 'tickets',
+        [sa.text('lower(title) text_pattern_ops')],
+        unique=False, postgresql_where=sa.text('deleted_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tickets_title_lower_prefix', table_name='tickets')
@@ -0,0 +1,169 @@
+"""Touch tickets when their tags change, log deleted tags
+
+Revision ID: b6d2e4f8a1c3
+Revises: f3b7d91c2e58
+Create Date: 2026-10-20 09:12:44.318027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2e4f8a1c3'
+down_revision: Union[str, Sequence[str], None] = 'f3b7d91c2e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _flag(name: str) -> str:
+    return f"coalesce(current_setting('pmanager.{name}', true), '') = 'on'"
+
+
+# A ticket's representation embeds its tags (name and color), so a change to
+# its ticket_tags rows or to one of its tags changes the ticket: bump its
+# version (the ETag) and, through set_tickets_change_xid, its change_xid (the
+# changes feed). Tickets already written by the same transaction (a create
+# with tags, an update of fields and tags) are bumped once. The ticket itself
+# did not change, so pmanager.touching keeps its updated_at (list order,
+# archive age) as it was.
+TOUCH_TICKETS = """
+    PERFORM set_config('pmanager.touching', 'on', true);
+    UPDATE tickets SET version = version + 1
+    WHERE id IN ({ticket_ids})
+      AND change_xid IS DISTINCT FROM pg_current_xact_id()::text::bigint;
+    PERFORM set_config('pmanager.touching', '', true);
+"""
+
+# Links removed by the archive job and the purger belong to rows on their
+# way out of tickets. Deleting or merging a tag (pmanager.retagging) can
+# re-point links of a large share of the tickets; it is logged once in
+# tag_tombstones instead and clients apply it to their copies.
+LINKS_GUARD = (
+    f"IF {_flag('archiving')} OR {_flag('purging')} OR {_flag('retagging')} THEN"
+    " RETURN NULL; END IF;"
+)
+
+TOUCHING_GUARD = f"IF {_flag('touching')} THEN RETURN NEW; END IF;"
+
+UPDATED_AT_FUNCTION = """
+    CREATE OR REPLACE FUNCTION update_updated_at_column()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        {guard}
+        NEW.updated_at = CURRENT_TIMESTAMP;
+        RETURN NEW;
+    END;
+    $$ language 'plpgsql';
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(UPDATED_AT_FUNCTION.format(guard=TOUCHING_GUARD))
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION touch_tickets_of_links()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            {LINKS_GUARD}
+            {TOUCH_TICKETS.format(ticket_ids="SELECT ticket_id FROM changed_links")}
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+    """)
+    # Transition tables need one trigger per event; both use the same name
+    op.execute("""
+        CREATE TRIGGER touch_tickets_on_ticket_tags_insert
+        AFTER INSERT ON ticket_tags
+        REFERENCING NEW TABLE AS changed_links
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION touch_tickets_of_links();
+    """)
+    op.execute("""
+        CREATE TRIGGER touch_tickets_on_ticket_tags_delete
+        AFTER DELETE ON ticket_tags
+        REFERENCING OLD TABLE AS changed_links
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION touch_tickets_of_links();
+    """)
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION touch_tickets_of_tags()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            {TOUCH_TICKETS.format(ticket_ids='''
+                SELECT tt.ticket_id
+                FROM ticket_tags tt
+                JOIN new_tags n ON n.id = tt.tag_id
+                JOIN old_tags o ON o.id = n.id
+                WHERE n.name IS DISTINCT FROM o.name OR n.color IS DISTINCT FROM o.color
+            ''')}
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+    """)
+    op.execute("""
+        CREATE TRIGGER touch_tickets_on_tags_update
+        AFTER UPDATE ON tags
+        REFERENCING OLD TABLE AS old_tags NEW TABLE AS new_tags
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION touch_tickets_of_tags();
+    """)
+
+    # Deleted tags, for the changes feed: one row per tag, however many
+    # tickets carried it. tag_service.merge_tag sets pmanager.merge_target.
+    op.create_table('tag_tombstones',
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('merged_into_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_xid', sa.BigInteger(), nullable=False),
+    sa.Column(
+        'deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True
+    ),
+    sa.PrimaryKeyConstraint('tag_id')
+    )
+    op.create_index(
+        op.f('ix_tag_tombstones_deleted_xid'), 'tag_tombstones', ['deleted_xid'], unique=False
+    )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION log_tag_tombstones()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO tag_tombstones (tag_id, merged_into_id, deleted_xid)
+            SELECT
+                id,
+                nullif(current_setting('pmanager.merge_target', true), '')::integer,
+                pg_current_xact_id()::text::bigint
+            FROM deleted_tags
+            ON CONFLICT (tag_id) DO UPDATE SET
+                merged_into_id = EXCLUDED.merged_into_id,
+                deleted_xid = EXCLUDED.deleted_xid,
+                deleted_at = now();
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+    """)
+    op.execute("""
+        CREATE TRIGGER log_tags_tombstones
+        AFTER DELETE ON tags
+        REFERENCING OLD TABLE AS deleted_tags
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION log_tag_tombstones();
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS log_tags_tombstones ON tags;")
+    op.execute("DROP FUNCTION IF EXISTS log_tag_tombstones();")
+    op.drop_index(op.f('ix_tag_tombstones_deleted_xid'), table_name='tag_tombstones')
+    op.drop_table('tag_tombstones')
+
+    op.execute("DROP TRIGGER IF EXISTS touch_tickets_on_tags_update ON tags;")
+    op.execute("DROP FUNCTION IF EXISTS touch_tickets_of_tags();")
+    op.execute("DROP TRIGGER IF EXISTS touch_tickets_on_ticket_tags_delete ON ticket_tags;")
+    op.execute("DROP TRIGGER IF EXISTS touch_tickets_on_ticket_tags_insert ON ticket_tags;")
+    op.execute("DROP FUNCTION IF EXISTS touch_tickets_of_links();")
+    op.execute(UPDATED_AT_FUNCTION.format(guard=""))
@@ -0,0 +1,30 @@
+"""Add ticket_tags tag_id index
+
+Revision ID: c81d5e2a9f43
+Revises: a3c94e1f7b26
+Create Date: 2026-10-19 20:41:08.316472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81d5e2a9f43'
+down_revision: Union[str, Sequence[str], None] = 'a3c94e1f7b26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tag deletes and merges find a tag's tickets by tag_id; the primary key
+    # (ticket_id, tag_id) cannot serve that
+    op.create_index('ix_ticket_tags_tag_id', 'ticket_tags', ['tag_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ticket_tags_tag_id', table_name='ticket_tags')
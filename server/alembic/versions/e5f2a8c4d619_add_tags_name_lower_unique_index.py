@@ -0,0 +1,47 @@
+"""Add unique index on lower(tags.name)
+
+Revision ID: e5f2a8c4d619
+Revises: c81d5e2a9f43
+Create Date: 2026-10-19 21:17:52.904136
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f2a8c4d619'
+down_revision: Union[str, Sequence[str], None] = 'c81d5e2a9f43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_tag already rejects names that differ only in case, but tags
+    # created before that check (or by a race) may still clash. Which one
+    # to keep is the operator's call, so stop with the list instead of
+    # failing on the index build
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT lower(name) AS name, string_agg(id::text, ', ' ORDER BY id) AS ids
+        FROM tags
+        GROUP BY lower(name)
+        HAVING count(*) > 1
+        ORDER BY lower(name)
+    """)).all()
+    if duplicates:
+        clashes = "; ".join(f"'{row.name}': tags {row.ids}" for row in duplicates)
+        raise RuntimeError(
+            f"Tag names differ only in case ({clashes}). Merge each group into one tag "
+            "(POST /api/tags/{id}/merge) or rename them, then run the migration again."
+        )
+
+    # Makes it a constraint; also the conflict target of the bulk tag upsert
+    op.create_index('ix_tags_name_lower', 'tags', [sa.text('lower(name)')], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tags_name_lower', table_name='tags')
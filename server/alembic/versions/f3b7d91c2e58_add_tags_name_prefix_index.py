@@ -0,0 +1,34 @@
+"""Add tag name prefix index for suggestions
+
+Revision ID: f3b7d91c2e58
+Revises: e5f2a8c4d619
+Create Date: 2026-10-19 23:05:31.772419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d91c2e58'
+down_revision: Union[str, Sequence[str], None] = 'e5f2a8c4d619'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /api/tags/suggest matches lower(name) LIKE 'x%'; ix_tags_name_lower
+    # uses the default operator class, which LIKE cannot use outside the C locale
+    op.create_index(
+        'ix_tags_name_lower_prefix', 'tags',
+        [sa.text('lower(name) text_pattern_ops')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tags_name_lower_prefix', table_name='tags')
@@ -0,0 +1,155 @@
+"""
+Admission control for database-bound requests
+
+Every API request needs a pooled connection, and a worker only has
+DB_POOL_SIZE + DB_MAX_OVERFLOW of them. Instead of letting bursts pile up in
+the threadpool behind the pool, at most that many requests run at once; the
+rest wait in a priority queue and get a 503 with ``Retry-After`` when they
+cannot start within ADMISSION_QUEUE_TIMEOUT_SECONDS.
+
+Requests are classified by route:
+- ``cheap``: tag reads and single-ticket reads; served first
+- ``normal``: filtered ticket lists, the changes feed, fetches by ID and
+  single-ticket writes
+- ``expensive``: the unfiltered ticket list and batch writes; limited to
+  ADMISSION_EXPENSIVE_SHARE of the slots so they cannot starve the rest
+- ``multi_op``: multi-operation batches (POST /api/batch), a short
+  transaction of up to BATCH_MAX_OPERATIONS single-row writes; queued like
+  ``normal`` but limited to ADMISSION_MULTI_OP_SHARE of the slots, apart from
+  the bulk endpoints
+"""
+import asyncio
+import heapq
+import itertools
+import math
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+
+from app.config import Settings
+
+CHEAP = "cheap"
+NORMAL = "normal"
+EXPENSIVE = "expensive"
+MULTI_OP = "multi_op"
+
+# Lower number = served first
+PRIORITIES = {CHEAP: 0, NORMAL: 1, MULTI_OP: 1, EXPENSIVE: 2}
+
+# Not limited: no pooled connection, or must keep answering under load
+EXEMPT_PREFIXES = ("/health", "/metrics", "/debug", "/api/events", "/docs", "/openapi.json")
+
+
+def classify(request: Request) -> Optional[str]:
+    """Cost class of a request, or None if it bypasses admission control"""
+    path = request.url.path.rstrip("/") or "/"
+    if path == "/" or path.startswith(EXEMPT_PREFIXES):
+        return None
+
+    method = request.method
+    if path == "/api/batch":
+        return MULTI_OP
+    if path == "/api/tags/batch":
+        return EXPENSIVE
+    if path.startswith("/api/tags"):
+        return CHEAP if method in ("GET", "HEAD") else NORMAL
+    if path == "/api/tickets/batch/get":
+        return NORMAL
+    if path.startswith("/api/tickets/batch"):
+        return EXPENSIVE
+    if path == "/api/tickets":
+        if method not in ("GET", "HEAD"):
+            return NORMAL
+        filtered = request.query_params.get("search") or request.query_params.get("tags")
+        return NORMAL if filtered else EXPENSIVE
+    if path == "/api/tickets/changes":
+        return NORMAL
+    if path.startswith("/api/tickets/") and method in ("GET", "HEAD"):
+        return CHEAP
+    return NORMAL
+
+
+class AdmissionController:
+    """Priority queue of concurrency slots with per-class limits"""
+
+    def __init__(self, capacity: int, class_limits: Dict[str, int], queue_timeout: float):
+        self.capacity = capacity
+        self.class_limits = class_limits
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._class_in_flight: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "AdmissionController":
+        """Size the limits from the connection pool settings"""
+        capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        expensive = max(1, math.floor(capacity * settings.ADMISSION_EXPENSIVE_SHARE))
+        multi_op = max(1, math.floor(capacity * settings.ADMISSION_MULTI_OP_SHARE))
+        return cls(
+            capacity,
+            {CHEAP: capacity, NORMAL: capacity, MULTI_OP: multi_op, EXPENSIVE: expensive},
+            settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        )
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, waiter in self._waiters if not waiter.done())
+
+    def _has_room(self, cost: str) -> bool:
+        return (
+            self.in_flight < self.capacity and self._class_in_flight[cost] < self.class_limits[cost]
+        )
+
+    def _take(self, cost: str) -> None:
+        self.in_flight += 1
+        self._class_in_flight[cost] += 1
+
+    async def acquire(self, cost: str) -> bool:
+        """Wait for a slot; False if none was free within the queue timeout"""
+        if self._has_room(cost) and not self._waiters:
+            self._take(cost)
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[cost], next(self._sequence), cost, waiter))
+        self._wake()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self._abandon(cost, waiter)
+            return False
+        except asyncio.CancelledError:
+            # Client went away while queued
+            self._abandon(cost, waiter)
+            raise
+
+    def _abandon(self, cost: str, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # Granted right as we gave up: hand the slot back
+            self.release(cost)
+        waiter.cancel()
+
+    def release(self, cost: str) -> None:
+        self.in_flight -= 1
+        self._class_in_flight[cost] -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Grant free slots to waiters, highest priority first"""
+        skipped = []
+        while self._waiters and self.in_flight < self.capacity:
+            entry = heapq.heappop(self._waiters)
+            _, _, cost, waiter = entry
+            if waiter.done():
+                continue
+            if not self._has_room(cost):
+                # Class at its limit: let lower priority classes through
+                skipped.append(entry)
+                continue
+            self._take(cost)
+            waiter.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
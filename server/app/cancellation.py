@@ -0,0 +1,171 @@
+"""
+Cancel the queries of requests whose client has gone away
+
+The UI sends a new search per keystroke and drops the previous request, but
+a sync endpoint keeps running its statement to the end in a threadpool
+thread, holding a pooled connection. Endpoints declared with
+``dependencies=[cancel_on_disconnect(route)]`` instead watch the connection
+for ``http.disconnect`` while they run; when it comes, the statement running
+on the request's connections is cancelled through the driver: ``cancel()``
+on psycopg2 (a cancel request over a separate connection, like
+``pg_cancel_backend``), ``interrupt()`` on SQLite. The endpoint then fails,
+its session is rolled back at once so the connection goes back to the pool
+and ``db.cancelled_queries.<route>`` counts it. Nobody is left to read a
+response, so none is sent: ``DisconnectedClientMiddleware`` ends the request
+quietly.
+
+A connection is only cancelled while the request holds it: it is forgotten
+as it is checked in, before another request can check it out.
+
+Turned off with CANCEL_QUERIES_ON_DISCONNECT.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Set
+
+from fastapi import Depends, Request
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+
+from app.database import get_db
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Key of the QueryCanceller in Session.info and in the pooled connection's info
+CANCELLER_KEY = "query_canceller"
+
+
+class ClientDisconnected(Exception):
+    """The request's queries were cancelled because its client went away"""
+
+
+class QueryCanceller:
+    """The DBAPI connections one request holds, and a way to cancel their statements"""
+
+    def __init__(self):
+        self.cancelled = False
+        self._connections: Set[Any] = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def track(self, dbapi_connection: Any) -> None:
+        with self._lock:
+            if not self._closed:
+                self._connections.add(dbapi_connection)
+
+    def release(self, dbapi_connection: Any) -> None:
+        with self._lock:
+            self._connections.discard(dbapi_connection)
+
+    def cancel(self) -> None:
+        """Cancel the statements running on the tracked connections (any thread)"""
+        with self._lock:
+            if self._closed:
+                return
+            self.cancelled = True
+            for dbapi_connection in self._connections:
+                cancel = (
+                    getattr(dbapi_connection, "cancel", None)
+                    or getattr(dbapi_connection, "interrupt", None)
+                )
+                if cancel is None:
+                    continue
+                try:
+                    cancel()
+                except Exception:
+                    logger.warning(
+                        "Could not cancel a query of a disconnected client", exc_info=True
+                    )
+
+    def close(self) -> None:
+        """Stop tracking; later cancel() calls do nothing"""
+        with self._lock:
+            self._closed = True
+            self._connections.clear()
+
+
+def query_cancelled(db: Session) -> bool:
+    """Whether the session's statements were cancelled because the client left"""
+    canceller = db.info.get(CANCELLER_KEY)
+    return canceller is not None and canceller.cancelled
+
+
+@event.listens_for(Session, "after_begin")
+def _track_connection(session, transaction, connection):
+    canceller = session.info.get(CANCELLER_KEY)
+    if canceller is None:
+        return
+    pooled = connection.connection
+    pooled.info[CANCELLER_KEY] = canceller
+    canceller.track(pooled.dbapi_connection)
+
+
+@event.listens_for(Pool, "checkin")
+def _release_connection(dbapi_connection, connection_record):
+    canceller = (
+        connection_record.info.pop(CANCELLER_KEY, None) if connection_record is not None else None
+    )
+    if canceller is not None:
+        canceller.release(dbapi_connection)
+
+
+async def _cancel_when_disconnected(request: Request, canceller: QueryCanceller) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+    # Cancelling opens a connection to the server; keep it off the event loop
+    # and out of the (possibly exhausted) endpoint threadpool
+    await asyncio.to_thread(canceller.cancel)
+
+
+def cancel_on_disconnect(route: str):
+    """Dependency that cancels the request's queries if its client disconnects
+
+    Function-scoped: the watch ends when the endpoint returns, not after the
+    response has been sent.
+    """
+
+    async def dependency(request: Request, db: Session = Depends(get_db)):
+        if not request.app.state.settings.CANCEL_QUERIES_ON_DISCONNECT:
+            yield
+            return
+
+        canceller = QueryCanceller()
+        db.info[CANCELLER_KEY] = canceller
+        watcher = asyncio.create_task(_cancel_when_disconnected(request, canceller))
+        try:
+            yield
+        except DBAPIError:
+            if not canceller.cancelled:
+                raise
+            # Return the connection now rather than when the session closes
+            await asyncio.to_thread(db.rollback)
+            metrics.increment(f"db.cancelled_queries.{route}")
+            logger.info("Cancelled the queries of %s: client disconnected", route)
+            raise ClientDisconnected(route)
+        finally:
+            watcher.cancel()
+            canceller.close()
+            db.info.pop(CANCELLER_KEY, None)
+
+    return Depends(dependency, scope="function")
+
+
+class DisconnectedClientMiddleware:
+    """Ends requests whose queries were cancelled without sending a response
+
+    Must wrap every other middleware: the ``http`` ones expect a response
+    from the app they call.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.app(scope, receive, send)
+        except ClientDisconnected:
+            pass
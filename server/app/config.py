@@ -1,9 +1,82 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DATABASE_REPLICA_URLS: List[str] = []
+    # How long a client reads from the primary after a write (replica lag budget)
+    REPLICA_PIN_SECONDS: int = 5
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Connections opened per engine at worker startup, before reporting ready
+    DB_POOL_WARMUP_CONNECTIONS: int = 2
+
+    # Admission control (see app/admission.py); slots = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_EXPENSIVE_SHARE: float = 0.5
+    ADMISSION_MULTI_OP_SHARE: float = 0.5
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+
+    # Query guards (see app/services/query_guards.py); 0 or missing = no timeout
+    STATEMENT_TIMEOUTS_MS: Dict[str, int] = {
+        "tickets_list": 3000,
+        "tickets_search": 2000,
+        "tickets_changes": 5000,
+        "tags_list": 2000,
+        "tags_suggest": 500,
+    }
+    # Cancel the running statement of list/search requests whose client has
+    # disconnected (see app/cancellation.py)
+    CANCEL_QUERIES_ON_DISCONNECT: bool = True
+    # Shorter search terms only match title prefixes
+    SEARCH_MIN_LENGTH: int = 3
+    TICKET_LIST_MAX_RESULTS: int = 5000
+    # Most IDs one POST /api/tickets/batch/get may ask for
+    BATCH_GET_MAX_IDS: int = 5000
+    # GET /api/tags/suggest caches prefixes up to this length (they match the most tags)
+    TAG_SUGGEST_CACHE_PREFIX_LENGTH: int = 1
+    # Most tags one POST /api/tags/batch may upsert
+    TAG_UPSERT_MAX_TAGS: int = 1000
+    # Tickets per UPDATE (and transaction) in POST /api/tickets/batch/update
+    BATCH_UPDATE_CHUNK_SIZE: int = 1000
+    # Most operations in one POST /api/batch
+    BATCH_MAX_OPERATIONS: int = 100
+
+    # Per-client rate limits (see app/rate_limit.py): group -> (requests/second, burst)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+        "tickets_read": (10.0, 40),
+        "tickets_write": (5.0, 20),
+        "batch": (0.5, 5),
+        # POST /api/batch: up to BATCH_MAX_OPERATIONS single-row writes each
+        "multi_op": (2.0, 10),
+        "tags": (10.0, 40),
+    }
+    RATE_LIMIT_URL: Optional[str] = None  # e.g. redis://localhost:6379/0 to share across workers
+
+    # Readiness probe (see app/health.py): warn = degraded, fail = not ready
+    HEALTH_PROBE_INTERVAL_SECONDS: float = 5.0
+    HEALTH_PROBE_STALE_SECONDS: float = 30.0
+    HEALTH_DB_LATENCY_WARN_MS: float = 100.0
+    HEALTH_DB_LATENCY_FAIL_MS: float = 1000.0
+    HEALTH_POOL_SATURATION_WARN: float = 0.8
+    HEALTH_POOL_SATURATION_FAIL: float = 1.0
+    HEALTH_CHECK_MIGRATIONS: bool = True
+
+    # On-demand profiling (see app/profiling.py); off unless a token is set
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_INTERVAL_MS: float = 1.0
+
+    # Tracing (see app/tracing.py); needs opentelemetry-sdk when enabled
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATIO: float = 0.1
+    TRACING_EXPORTER: str = "otlp"  # or "file"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_SERVICE_NAME: str = "pmanager-api"
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     ENVIRONMENT: str = "development"
@@ -11,10 +84,39 @@ class Settings(BaseSettings):
     ALLOWED_ORIGINS: List[str] = ["http://localhost:5173", "http://127.0.0.1:5173"]
     SECRET_KEY: str
 
+    # Query result cache (see app/services/query_cache.py). Unset means on
+    # only with QUERY_CACHE_URL: a per-worker cache is invalidated by that
+    # worker's writes only, so the other workers would serve stale reads.
+    QUERY_CACHE_ENABLED: Optional[bool] = None
+    QUERY_CACHE_TTL_SECONDS: float = 30.0
+    QUERY_CACHE_MAX_ENTRIES: int = 256
+    QUERY_CACHE_URL: Optional[str] = None  # e.g. redis://localhost:6379/0 to share across workers
+
+    # Archival of completed tickets (python -m app.jobs.archive)
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_BATCH_SIZE: int = 1000
+
+    # Soft delete: undo window and background purge rate
+    SOFT_DELETE_RETENTION_SECONDS: int = 7 * 24 * 3600
+    PURGE_ENABLED: bool = True
+    PURGE_BATCH_SIZE: int = 500
+    PURGE_INTERVAL_SECONDS: float = 1.0
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": True
     }
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Settings are read from the environment once, on first use"""
+    return Settings()
+
+
+def __getattr__(name):
+    # ``from app.config import settings`` keeps working without reading the
+    # environment at import time
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,21 +1,181 @@
-from sqlalchemy import create_engine
+import random
+from functools import wraps
+from typing import List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.config import settings
-
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from sqlalchemy.orm import Session, sessionmaker
+from app.config import Settings, get_settings
+
+# Cookie set after a write so that the same client keeps reading from the
+# primary until replicas have caught up (read-your-writes)
+PRIMARY_PIN_COOKIE = "pm_read_primary"
+
+
+_engine: Optional[Engine] = None
+_replica_engines: Optional[List[Engine]] = None
+
+
+def _create_engine(url: str, settings: Settings) -> Engine:
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW
+    )
+
+
+def init_engines(settings: Optional[Settings] = None) -> Engine:
+    """Create this process's engines for the primary and the read replicas
+
+    Called from the app lifespan, i.e. in each worker after gunicorn forks.
+    Engines inherited from a parent process are dropped without closing
+    their connections, which still belong to the parent.
+    """
+    global _engine, _replica_engines
+    settings = settings or get_settings()
+    for inherited in [_engine, *(_replica_engines or [])]:
+        if inherited is not None:
+            inherited.dispose(close=False)
+
+    _engine = _create_engine(settings.DATABASE_URL, settings)
+    _replica_engines = [_create_engine(url, settings) for url in settings.DATABASE_REPLICA_URLS]
+    return _engine
+
+
+def dispose_engines() -> None:
+    """Close all pooled connections (app shutdown)"""
+    global _engine, _replica_engines
+    for engine in [_engine, *(_replica_engines or [])]:
+        if engine is not None:
+            engine.dispose()
+    _engine = None
+    _replica_engines = None
+
+
+def get_engine() -> Engine:
+    """Engine for the primary database, created on first use
+
+    Creating it loads the DB driver, so it is kept out of import time.
+    """
+    if _engine is None:
+        init_engines()
+    return _engine
+
+
+def get_replica_engines() -> List[Engine]:
+    """Engines for the configured read replicas, created on first use"""
+    if _replica_engines is None:
+        init_engines()
+    return _replica_engines
+
+
+def warm_pool(engine: Engine, connections: int) -> None:
+    """Open up to ``connections`` pooled connections so requests don't pay for setup"""
+    pool_size = getattr(engine.pool, "size", None)
+    if pool_size is not None:
+        connections = min(connections, pool_size())
+
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in opened:
+            connection.close()
+
+
+def __getattr__(name):
+    # Backwards compatible ``engine`` / ``replica_engines`` module attributes
+    if name == "engine":
+        return get_engine()
+    if name == "replica_engines":
+        return get_replica_engines()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class RoutingSession(Session):
+    """Session that sends replica-safe reads to a read replica
+
+    Everything goes to the primary unless the request allows replica reads
+    (``info["allow_replica"]``), the code runs inside a ``replica_read``
+    service function and the session has not written anything yet.
+    """
+
+    def __init__(self, bind=None, replicas=None, **kwargs):
+        if bind is None and not kwargs.get("binds"):
+            # Unbound sessions (SessionLocal) use the configured databases
+            bind = get_engine()
+            if replicas is None:
+                replicas = get_replica_engines()
+        super().__init__(bind=bind, **kwargs)
+        self.replicas = list(replicas or [])
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.replicas
+            and self.info.get("allow_replica")
+            and self.info.get("replica_reads", 0) > 0
+            and not self.info.get("wrote")
+            and not self._flushing
+        ):
+            # Stick to one replica per session for consistent reads
+            if "replica" not in self.info:
+                self.info["replica"] = random.choice(self.replicas)
+            return self.info["replica"]
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _pin_after_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+def uses_replicas(db: Session) -> bool:
+    """Whether replica_read functions on this session may hit a replica"""
+    return bool(getattr(db, "replicas", None)) and bool(db.info.get("allow_replica"))
+
+
+def replica_read(func):
+    """Mark a read-only service function as safe to run on a replica"""
+    @wraps(func)
+    def wrapper(db, *args, **kwargs):
+        if not db.info.get("allow_replica"):
+            return func(db, *args, **kwargs)
+
+        db.info["replica_reads"] = db.info.get("replica_reads", 0) + 1
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.info["replica_reads"] -= 1
+
+    return wrapper
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency for database sessions"""
+def get_db(request: Request):
+    """Dependency for database sessions
+
+    Only GET/HEAD requests from clients that have not written recently may
+    read from replicas.
+    """
     db = SessionLocal()
+    db.info["allow_replica"] = (
+        request.method in ("GET", "HEAD")
+        and PRIMARY_PIN_COOKIE not in request.cookies
+    )
     try:
         yield db
     finally:
@@ -0,0 +1,172 @@
+"""
+Realtime change feed
+
+Postgres triggers (see the ``add_change_notify_triggers`` migration) publish
+one NOTIFY per write statement on the ``pmanager_events`` channel. Each worker
+runs a single ``PostgresListener`` thread that LISTENs on that channel and
+hands events to the ``EventBroker``, which fans them out to every open
+Server-Sent Events connection in that worker.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy.engine import Engine
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "pmanager_events"
+
+
+class EventBroker:
+    """In-memory fan-out of change events to subscriber queues"""
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Set the event loop that owns the subscriber queues"""
+        self._loop = loop
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a new subscriber and return its queue"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Publish an event; safe to call from any thread"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Slow consumer: drop its backlog and tell it to resync
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+            queue.put_nowait(event)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Encode an event as a Server-Sent Events message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+class PostgresListener:
+    """Background thread that forwards NOTIFY payloads to the broker
+
+    Reconnects after a failed connect or a lost connection, waiting
+    min_backoff seconds at first and twice as long after each further
+    failure, up to max_backoff. A connection that stayed up for
+    max_backoff seconds starts the next outage at min_backoff again.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        broker: EventBroker,
+        poll_interval: float = 5.0,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0
+    ):
+        self.engine = engine
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def _connect(self):
+        # Dedicated DBAPI connection outside the pool: it is held forever
+        dialect = self.engine.dialect
+        cargs, cparams = dialect.create_connect_args(self.engine.url)
+        conn = dialect.loaded_dbapi.connect(*cargs, **cparams)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL};")
+        return conn
+
+    def _run(self) -> None:
+        backoff = self.min_backoff
+        while not self._stop.is_set():
+            try:
+                conn = self._connect()
+            except Exception:
+                logger.exception(
+                    "Change feed listener could not connect; retrying in %.0fs", backoff
+                )
+            else:
+                connected_at = time.monotonic()
+                try:
+                    self._listen(conn)
+                except Exception:
+                    logger.exception("Change feed listener lost its connection; reconnecting")
+                    # Events may have been missed while disconnected
+                    self.broker.publish({"type": "resync"})
+                finally:
+                    conn.close()
+                if time.monotonic() - connected_at >= self.max_backoff:
+                    backoff = self.min_backoff
+
+            if self._stop.wait(backoff):
+                return
+            metrics.increment("events.listener_reconnects")
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _listen(self, conn) -> None:
+        while not self._stop.is_set():
+            readable, _, _ = select.select([conn], [], [], self.poll_interval)
+            if not readable:
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    self.broker.publish(json.loads(notify.payload))
+                except ValueError:
+                    logger.warning("Ignoring malformed change event: %s", notify.payload)
+
+
+broker = EventBroker()
+metrics.register_gauge("events.subscribers", lambda: broker.subscriber_count)
+
+
+def start_listener(engine: Engine) -> Optional[PostgresListener]:
+    """Start the LISTEN thread when running against Postgres"""
+    broker.bind_loop(asyncio.get_running_loop())
+    if engine.dialect.name != "postgresql":
+        return None
+
+    listener = PostgresListener(engine, broker)
+    listener.start()
+    return listener
@@ -0,0 +1,211 @@
+"""
+Background health probe behind GET /health/ready
+
+Each worker runs one ``HealthProbe`` thread. Every HEALTH_PROBE_INTERVAL_SECONDS
+it times a ``SELECT 1`` on its own connection (outside the request pool, so an
+exhausted pool cannot block it), reads the saturation of the request pool and
+compares the database's alembic revision with the migration head of the code.
+The readiness endpoint only reads the latest result; it never touches the
+database itself.
+
+Statuses:
+- ``ok``: all checks within thresholds
+- ``degraded``: latency or pool saturation above the warning threshold, or
+  the migration check itself failing (the database answered, its revision
+  is unknown); the worker still takes traffic
+- ``unavailable``: database unreachable, latency or saturation above the
+  failure threshold, schema behind the migration head of the code, or no
+  recent probe result; readiness returns 503
+
+A schema at a revision the code does not know was migrated by newer code
+(a rolling deploy migrates before all workers are replaced). Migrations
+are additive, so the older workers keep serving and report ``degraded``.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+DEGRADED = "degraded"
+UNAVAILABLE = "unavailable"
+
+ALEMBIC_INI = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"
+)
+
+
+def pool_saturation(engine: Engine, capacity: int) -> float:
+    """Fraction of the pool's capacity (size + overflow) checked out"""
+    checkedout = getattr(engine.pool, "checkedout", None)
+    if checkedout is None or capacity <= 0:
+        return 0.0
+    return checkedout() / capacity
+
+
+def migration_heads() -> List[str]:
+    """Head revision(s) of the migration scripts shipped with the code"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return sorted(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+
+
+def migration_revisions() -> Set[str]:
+    """Every revision of the migration scripts shipped with the code"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    scripts = ScriptDirectory.from_config(Config(ALEMBIC_INI))
+    return {script.revision for script in scripts.walk_revisions()}
+
+
+def _grade(value: float, warn: float, fail: float) -> str:
+    if value >= fail:
+        return UNAVAILABLE
+    if value >= warn:
+        return DEGRADED
+    return OK
+
+
+def _worst(statuses: List[str]) -> str:
+    for status in (UNAVAILABLE, DEGRADED):
+        if status in statuses:
+            return status
+    return OK
+
+
+class HealthProbe:
+    """Background thread that periodically checks the database"""
+
+    def __init__(self, engine: Engine, settings: Settings):
+        self.engine = engine
+        self.settings = settings
+        self.interval_seconds = settings.HEALTH_PROBE_INTERVAL_SECONDS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._expected_heads: Optional[List[str]] = None
+        self._known_revisions: Optional[Set[str]] = None
+        # One connection of its own, kept open between probes
+        self._probe_engine = create_engine(
+            engine.url, pool_size=1, max_overflow=0, pool_pre_ping=True
+        )
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="health-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds + 5)
+        self._probe_engine.dispose()
+
+    def _run(self) -> None:
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval_seconds):
+                return
+
+    def run_once(self) -> Dict[str, Any]:
+        """Run all checks and store the result"""
+        checks: Dict[str, Dict[str, Any]] = {}
+        try:
+            checks["database"] = self._check_latency()
+        except Exception as exc:
+            logger.warning("Health probe could not reach the database", exc_info=True)
+            checks["database"] = {"status": UNAVAILABLE, "error": exc.__class__.__name__}
+        else:
+            if self.settings.HEALTH_CHECK_MIGRATIONS:
+                try:
+                    checks["migrations"] = self._check_migrations()
+                except Exception as exc:
+                    logger.warning("Health probe could not check the migrations", exc_info=True)
+                    checks["migrations"] = {
+                        "status": DEGRADED,
+                        "reason": "migration check failed",
+                        "error": exc.__class__.__name__,
+                    }
+        checks["pool"] = self._check_pool()
+
+        result = {
+            "status": _worst([check["status"] for check in checks.values()]),
+            "checks": checks,
+        }
+        self._result = result
+        self._checked_at = time.monotonic()
+        return result
+
+    def _check_latency(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with self._probe_engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+        latency_ms = (time.perf_counter() - started) * 1000
+        return {
+            "status": _grade(
+                latency_ms,
+                self.settings.HEALTH_DB_LATENCY_WARN_MS,
+                self.settings.HEALTH_DB_LATENCY_FAIL_MS
+            ),
+            "latency_ms": round(latency_ms, 2),
+        }
+
+    def _check_pool(self) -> Dict[str, Any]:
+        saturation = pool_saturation(
+            self.engine, self.settings.DB_POOL_SIZE + self.settings.DB_MAX_OVERFLOW
+        )
+        return {
+            "status": _grade(
+                saturation,
+                self.settings.HEALTH_POOL_SATURATION_WARN,
+                self.settings.HEALTH_POOL_SATURATION_FAIL
+            ),
+            "saturation": round(saturation, 3),
+        }
+
+    def _check_migrations(self) -> Dict[str, Any]:
+        from alembic.runtime.migration import MigrationContext
+
+        if self._expected_heads is None:
+            self._expected_heads = migration_heads()
+            self._known_revisions = migration_revisions()
+        with self._probe_engine.connect() as connection:
+            current = sorted(MigrationContext.configure(connection).get_current_heads())
+
+        if current == self._expected_heads:
+            status = OK
+        elif current and not set(current) & self._known_revisions:
+            # Only revisions this code does not know: migrated by newer code
+            status = DEGRADED
+        else:
+            # Unmigrated, or at an older revision of this code
+            status = UNAVAILABLE
+        return {
+            "status": status,
+            "current": current,
+            "expected": self._expected_heads,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Latest result; unavailable if the probe has not reported recently"""
+        if self._result is None or self._checked_at is None:
+            return {"status": UNAVAILABLE, "reason": "no probe result yet"}
+
+        age = time.monotonic() - self._checked_at
+        if age > self.settings.HEALTH_PROBE_STALE_SECONDS:
+            return {
+                "status": UNAVAILABLE,
+                "reason": f"last probe {age:.0f}s ago",
+                "checks": self._result["checks"],
+            }
+        return self._result
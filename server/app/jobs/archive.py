@@ -0,0 +1,43 @@
+"""
+Archive old completed tickets
+
+Usage:
+    python -m app.jobs.archive [--older-than-days N] [--batch-size N] [--max-batches N]
+
+Intended to run periodically (cron / scheduler), outside the web workers.
+"""
+import argparse
+import logging
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.archive_service import archive_completed_tickets
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--older-than-days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        archived = archive_completed_tickets(
+            db,
+            older_than_days=args.older_than_days,
+            batch_size=args.batch_size,
+            max_batches=args.max_batches
+        )
+    finally:
+        db.close()
+
+    logger.info("Archived %d ticket(s)", archived)
+    return archived
+
+
+if __name__ == "__main__":
+    main()
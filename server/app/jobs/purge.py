@@ -0,0 +1,106 @@
+"""
+Purge soft-deleted tickets
+
+Usage:
+    python -m app.jobs.purge [--batch-size N]
+
+Web workers also run a ``Purger`` thread (PURGE_ENABLED) that removes at
+most PURGE_BATCH_SIZE tickets every PURGE_INTERVAL_SECONDS. On Postgres the
+threads of all workers share that rate: each batch takes a transaction-level
+advisory lock, and a worker that finds it taken skips its turn. This command
+drains the whole backlog once, e.g. after changing the retention window.
+"""
+import argparse
+import logging
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.purge_service import purge_deleted_tickets
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_xact_lock key of the background purge batches
+PURGE_LOCK_KEY = 0x706D_7075_7267  # "pmpurg"
+
+
+class Purger:
+    """Background thread that purges soft-deleted tickets at a fixed rate"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        retention_seconds: int,
+        batch_size: int,
+        interval_seconds: float
+    ):
+        self.session_factory = session_factory
+        self.retention_seconds = retention_seconds
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="ticket-purger", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds + 5)
+
+    def run_once(self, exclusive: bool = False) -> int:
+        """Purge one batch; returns the number of tickets purged
+
+        With ``exclusive`` (the background thread), the batch is skipped and
+        0 returned while another purger's batch holds PURGE_LOCK_KEY, so the
+        purge rate does not grow with the number of workers. The lock is
+        released with the batch's transaction.
+        """
+        db = self.session_factory()
+        try:
+            if exclusive and db.get_bind().dialect.name == "postgresql":
+                locked = db.execute(select(func.pg_try_advisory_xact_lock(PURGE_LOCK_KEY)))
+                if not locked.scalar():
+                    db.rollback()
+                    return 0
+            return purge_deleted_tickets(db, self.retention_seconds, self.batch_size)
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                purged = self.run_once(exclusive=True)
+            except Exception:
+                logger.exception("Ticket purge batch failed")
+                continue
+            if purged:
+                logger.info("Purged %d soft-deleted ticket(s)", purged)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=settings.PURGE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    purger = Purger(SessionLocal, settings.SOFT_DELETE_RETENTION_SECONDS, args.batch_size, 0)
+    total = 0
+    while True:
+        purged = purger.run_once()
+        total += purged
+        if purged < args.batch_size:
+            break
+
+    logger.info("Purged %d ticket(s)", total)
+    return total
+
+
+if __name__ == "__main__":
+    main()
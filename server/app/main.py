@@ -1,33 +1,269 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
-from app.routers import tickets, tags
-
-app = FastAPI(
-    title="Ticket Manager API",
-    description="Simple tag-based ticket management system",
-    version="1.0.0"
+from fastapi.responses import JSONResponse
+from app.admission import AdmissionController, classify
+from app.cancellation import DisconnectedClientMiddleware
+from app.config import Settings, get_settings
+from app.database import (
+    PRIMARY_PIN_COOKIE,
+    SessionLocal,
+    dispose_engines,
+    get_engine,
+    get_replica_engines,
+    init_engines,
+    warm_pool
 )
+from app.events import start_listener
+from app.health import HealthProbe, UNAVAILABLE
+from app.metrics import metrics
+from app.profiling import profile_request
+from app.rate_limit import RateLimiter, rate_limit_headers
+from app.tracing import configure_tracing, shutdown_tracer_provider
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+logger = logging.getLogger(__name__)
+
+
+def warm_up(settings: Settings) -> None:
+    """Open pooled connections and prime the tag list cache"""
+    from app.services import tag_service
+
+    for engine in [get_engine(), *get_replica_engines()]:
+        warm_pool(engine, settings.DB_POOL_WARMUP_CONNECTIONS)
+    with SessionLocal() as db:
+        db.info["allow_replica"] = True
+        tag_service.get_tags_with_counts(db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.jobs.purge import Purger
+
+    settings = app.state.settings
+    # Runs in every worker (after the fork with --preload): the engines,
+    # their pools and the threads below are created per worker.
+    engine = init_engines(settings)
+    if settings.DB_POOL_WARMUP_CONNECTIONS > 0:
+        try:
+            await asyncio.to_thread(warm_up, settings)
+        except Exception:
+            # Not fatal: connections are then opened by the first requests
+            logger.warning("Startup warmup failed", exc_info=True)
+
+    # One LISTEN connection per worker feeds every SSE client in it
+    listener = start_listener(engine)
+    probe = HealthProbe(engine, settings)
+    await asyncio.to_thread(probe.run_once)
+    probe.start()
+    app.state.health_probe = probe
+    purger = None
+    if settings.PURGE_ENABLED:
+        purger = Purger(
+            SessionLocal,
+            settings.SOFT_DELETE_RETENTION_SECONDS,
+            settings.PURGE_BATCH_SIZE,
+            settings.PURGE_INTERVAL_SECONDS
+        )
+        purger.start()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    if purger is not None:
+        purger.stop()
+    if listener is not None:
+        listener.stop()
+    probe.stop()
+    dispose_engines()
+    if app.state.tracer_provider is not None:
+        shutdown_tracer_provider(app.state.tracer_provider)
 
-# Register routers
-app.include_router(tickets.router, prefix="/api/tickets", tags=["tickets"])
-app.include_router(tags.router, prefix="/api/tags", tags=["tags"])
+
+async def pin_writers_to_primary(request: Request, call_next):
+    """After a successful write, read from the primary for a short while"""
+    response = await call_next(request)
+    if (
+        get_replica_engines()
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            "1",
+            max_age=request.app.state.settings.REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+
+async def admission_control(request: Request, call_next):
+    """Run at most pool-capacity requests at once; shed the rest with a 503"""
+    controller = request.app.state.admission
+    cost = classify(request) if controller is not None else None
+    if cost is None:
+        return await call_next(request)
+
+    if not await controller.acquire(cost):
+        metrics.increment(f"admission.rejected.{cost}")
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Server busy, please retry"},
+            headers={"Retry-After": str(request.app.state.settings.ADMISSION_RETRY_AFTER_SECONDS)}
+        )
+    try:
+        return await call_next(request)
+    finally:
+        controller.release(cost)
+
+
+async def rate_limit(request: Request, call_next):
+    """Per-client token buckets; 429 with Retry-After when exhausted"""
+    limiter = request.app.state.rate_limiter
+    result = await limiter.check(request) if limiter is not None else None
+    if result is None:
+        return await call_next(request)
+
+    group, decision, burst = result
+    headers = rate_limit_headers(decision, burst)
+    if not decision[0]:
+        metrics.increment(f"rate_limit.rejected.{group}")
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": "Rate limit exceeded"},
+            headers=headers
+        )
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
 
 
-@app.get("/")
 def read_root():
     return {"message": "Ticket Manager API", "status": "running"}
 
 
-@app.get("/health")
 def health_check():
+    """Liveness: the worker is running and serving requests"""
     return {"status": "healthy"}
+
+
+def readiness_check(request: Request):
+    """Readiness from the last background probe (503 when unavailable)
+
+    Not ready before startup warmup is done and again while shutting down.
+    """
+    if not request.app.state.ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": UNAVAILABLE, "reason": "starting or shutting down"}
+        )
+
+    report = request.app.state.health_probe.report()
+    if report["status"] == UNAVAILABLE:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=report)
+    return report
+
+
+def get_metrics():
+    """Process-local counters (query cache hits/misses, ...)"""
+    return metrics.snapshot()
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the application (from the environment's settings by default)
+
+    Routers (and with them every route and pydantic schema) are imported and
+    built here rather than when ``app.main`` is imported. With
+    ``gunicorn 'app.main:create_app()' --preload`` this happens once in the
+    master process and the forked workers share the result.
+    """
+    from app.routers import tickets, tags, events, batch, debug
+
+    settings = settings or get_settings()
+    tracer_provider = configure_tracing(settings)
+    app = FastAPI(
+        title="Ticket Manager API",
+        description="Simple tag-based ticket management system",
+        version="1.0.0",
+        lifespan=lifespan,
+        # Request, endpoint and serialization spans (see app/tracing.py)
+        telemetry=(
+            {
+                "tracer_provider": tracer_provider,
+                "metrics": False,
+                "logs": False,
+                "auto_configure": False,
+            }
+            if tracer_provider is not None
+            else None
+        ),
+    )
+    app.state.settings = settings
+    app.state.tracer_provider = tracer_provider
+    app.state.ready = False
+    app.state.admission = None
+    if app.state.settings.ADMISSION_ENABLED:
+        app.state.admission = AdmissionController.from_settings(app.state.settings)
+        metrics.register_gauge("admission.in_flight", lambda: app.state.admission.in_flight)
+        metrics.register_gauge("admission.queued", lambda: app.state.admission.queued)
+
+    app.state.rate_limiter = None
+    if app.state.settings.RATE_LIMIT_ENABLED:
+        app.state.rate_limiter = RateLimiter.from_settings(app.state.settings)
+
+    # Inside CORS, so that rejected requests still get CORS headers; rate
+    # limiting runs first so that rejected clients never take a slot
+    app.middleware("http")(admission_control)
+    app.middleware("http")(rate_limit)
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=app.state.settings.ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[
+            "RateLimit-Limit",
+            "RateLimit-Remaining",
+            "RateLimit-Reset",
+            "Retry-After",
+            "Preference-Applied",
+        ],
+    )
+    app.middleware("http")(pin_writers_to_primary)
+    if app.state.settings.PROFILING_TOKEN:
+        # Outside the other middleware, so that the profile covers the whole request
+        app.middleware("http")(profile_request)
+    # Around every middleware (see app/cancellation.py)
+    app.add_middleware(DisconnectedClientMiddleware)
+
+    # Register routers
+    app.include_router(tickets.router, prefix="/api/tickets", tags=["tickets"])
+    app.include_router(tags.router, prefix="/api/tags", tags=["tags"])
+    app.include_router(events.router, prefix="/api/events", tags=["events"])
+    app.include_router(batch.router, prefix="/api/batch", tags=["batch"])
+    if app.state.settings.PROFILING_TOKEN:
+        app.include_router(debug.router, prefix="/debug", tags=["debug"])
+
+    app.get("/")(read_root)
+    app.get("/health")(health_check)
+    app.get("/health/live")(health_check)
+    app.get("/health/ready")(readiness_check)
+    app.get("/metrics")(get_metrics)
+    return app
+
+
+@lru_cache
+def _default_app() -> FastAPI:
+    return create_app()
+
+
+def __getattr__(name):
+    # ``app.main:app`` (uvicorn, tests) builds the app on first access
+    if name == "app":
+        return _default_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,48 @@
+"""
+Lightweight in-process metrics
+
+Counters are process-local (one registry per gunicorn worker) and are
+exposed as JSON at GET /metrics.
+"""
+import threading
+from typing import Callable, Dict
+
+
+class MetricsRegistry:
+    """Thread-safe registry of named counters and gauges"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Increment a counter, creating it on first use"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name: str) -> int:
+        """Current value of a counter (0 if never incremented)"""
+        return self._counters.get(name, 0)
+
+    def register_gauge(self, name: str, func: Callable[[], float]) -> None:
+        """Register a callable that is evaluated on every snapshot"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return all counters and gauges as a flat dict"""
+        with self._lock:
+            data: Dict[str, float] = dict(self._counters)
+            gauges = list(self._gauges.items())
+        for name, func in gauges:
+            data[name] = func()
+        return data
+
+    def reset(self) -> None:
+        """Reset all counters (gauges are kept)"""
+        with self._lock:
+            self._counters.clear()
+
+
+metrics = MetricsRegistry()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -11,6 +11,29 @@ class Tag(Base):
     name = Column(String(50), unique=True, nullable=False, index=True)
     color = Column(String(7), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
     tickets = relationship("Ticket", secondary="ticket_tags", back_populates="tags")
+
+    __table_args__ = (
+        # Names are unique case-insensitively; also the bulk upsert's conflict target
+        Index("ix_tags_name_lower", func.lower(name), unique=True),
+        # Suggestions: name prefix match on lower(name)
+        Index(
+            "ix_tags_name_lower_prefix",
+            func.lower(name).label("name_lower"),
+            postgresql_ops={"name_lower": "text_pattern_ops"}
+        ),
+    )
+
+
+class TagTombstone(Base):
+    """Deleted and merged tags, for incremental sync (filled by a Postgres trigger)"""
+    __tablename__ = "tag_tombstones"
+
+    tag_id = Column(Integer, primary_key=True)
+    # The tag that took over its tickets (tag merge), None for a plain delete
+    merged_into_id = Column(Integer, nullable=True)
+    deleted_xid = Column(BigInteger, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Table, ForeignKey
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Text, Boolean, DateTime, Table, ForeignKey, Index
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -9,7 +11,9 @@ ticket_tags = Table(
     Base.metadata,
     Column('ticket_id', Integer, ForeignKey('tickets.id', ondelete='CASCADE'), primary_key=True),
     Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
-    Column('created_at', DateTime(timezone=True), server_default=func.now())
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    # The primary key only serves lookups by ticket
+    Index('ix_ticket_tags_tag_id', 'tag_id')
 )
 
 
@@ -21,7 +25,71 @@ class Ticket(Base):
     description = Column(Text, nullable=True)
     is_completed = Column(Boolean, default=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True
+    )
+    # ID of the last writing transaction, maintained by a Postgres trigger
+    change_xid = Column(BigInteger, nullable=False, server_default="0", index=True)
+    # Optimistic concurrency token, bumped by every conditional update
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Soft delete marker; rows are hard-deleted later by the purger
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     tags = relationship("Tag", secondary=ticket_tags, back_populates="tickets")
+
+    __table_args__ = (
+        # Archive candidates: completed tickets by age
+        Index("ix_tickets_completed_updated_at", "updated_at", postgresql_where=is_completed),
+        # Live-ticket reads skip soft-deleted rows
+        Index("ix_tickets_live_updated_at", "updated_at", postgresql_where=deleted_at.is_(None)),
+        # Purger scan
+        Index("ix_tickets_deleted_at", "deleted_at", postgresql_where=deleted_at.isnot(None)),
+        # Short searches: title prefix match on lower(title)
+        Index(
+            "ix_tickets_title_lower_prefix",
+            func.lower(title).label("title_lower"),
+            postgresql_ops={"title_lower": "text_pattern_ops"},
+            postgresql_where=deleted_at.is_(None)
+        ),
+    )
+
+
+class TicketTombstone(Base):
+    """Deletion log used by incremental sync (filled by a Postgres trigger)"""
+    __tablename__ = "ticket_tombstones"
+
+    ticket_id = Column(Integer, primary_key=True)
+    deleted_xid = Column(BigInteger, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Archive of old completed tickets (see app/services/archive_service.py)
+ticket_tags_archive = Table(
+    'ticket_tags_archive',
+    Base.metadata,
+    Column(
+        'ticket_id', Integer, ForeignKey('tickets_archive.id', ondelete='CASCADE'),
+        primary_key=True
+    ),
+    Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Index('ix_ticket_tags_archive_tag_id', 'tag_id')
+)
+
+
+class ArchivedTicket(Base):
+    """Completed ticket moved out of the hot tickets table (read-only)"""
+    __tablename__ = "tickets_archive"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(200), nullable=False)
+    description = Column(Text, nullable=True)
+    is_completed = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), index=True)
+    version = Column(Integer, nullable=False, server_default="1")
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    tags = relationship("Tag", secondary=ticket_tags_archive, viewonly=True)
@@ -0,0 +1,264 @@
+"""
+On-demand profiling of live requests
+
+Only available when PROFILING_TOKEN is set; otherwise neither the middleware
+nor the /debug routes are installed, so profiling costs nothing. Every
+profiling request must carry the token in ``X-Profile-Token``.
+
+- Request profiling: a request sent with ``X-Profile: 1`` (or ``?profile=1``)
+  is sampled every PROFILING_SAMPLE_INTERVAL_MS while it runs, and its
+  response is replaced by the profile: folded stacks (flame graph input) and
+  a breakdown of where the time went (SQL, ORM loading, serialization, JSON
+  encoding). The sampler sees every thread of the worker that is running
+  request code, so requests running at the same time show up too; profile
+  on a quiet worker.
+- Memory: ``tracemalloc`` top-N allocation sites of the worker that serves
+  the request (GET /debug/memory). Tracing slows everything down, so it is
+  only on between POST /debug/memory/start and POST /debug/memory/stop.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from app.metrics import metrics
+
+TOKEN_HEADER = "x-profile-token"
+PROFILE_HEADER = "x-profile"
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+# Most frames kept per stack (innermost ones)
+MAX_STACK_DEPTH = 128
+
+# A thread is serving a request while one of these is on its stack (the
+# event loop running middleware, or a threadpool thread running an endpoint)
+REQUEST_FRAMES = (
+    "fastapi" + os.sep,
+    "starlette" + os.sep,
+    os.path.join(APP_ROOT, "app", "routers") + os.sep,
+)
+
+# Where a sample's time goes: the innermost frame from one of these wins.
+# Fragments are matched against the frame's file path.
+CATEGORIES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("json", (os.sep + "json" + os.sep, "starlette" + os.sep + "responses.py")),
+    (
+        "serialization",
+        ("pydantic", "fastapi" + os.sep + "encoders.py", "fastapi" + os.sep + "_compat"),
+    ),
+    ("orm", ("sqlalchemy" + os.sep + "orm" + os.sep,)),
+    ("sql", ("sqlalchemy" + os.sep, "psycopg2")),
+]
+
+
+def token_matches(settings_token: Optional[str], token: Optional[str]) -> bool:
+    return bool(settings_token) and token is not None and hmac.compare_digest(settings_token, token)
+
+
+def require_profiling_token(
+    request: Request, x_profile_token: Optional[str] = Header(None)
+) -> None:
+    """Dependency for the /debug routes"""
+    if not token_matches(request.app.state.settings.PROFILING_TOKEN, x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+
+
+def _frame_name(frame: FrameType) -> str:
+    """``path:qualname``, with the path relative to site-packages or the app"""
+    path = frame.f_code.co_filename
+    _, found, package_path = path.rpartition("site-packages" + os.sep)
+    if found:
+        path = package_path
+    elif path.startswith(APP_ROOT):
+        path = os.path.relpath(path, APP_ROOT)
+    else:
+        path = os.path.basename(path)
+    return f"{path}:{frame.f_code.co_qualname}"
+
+
+def _category(stack: List[FrameType]) -> str:
+    for frame in reversed(stack):
+        path = frame.f_code.co_filename
+        for name, fragments in CATEGORIES:
+            if any(fragment in path for fragment in fragments):
+                return name
+    return "other"
+
+
+class SamplingProfiler:
+    """Samples the stacks of threads serving requests from a background thread"""
+
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.categories: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.sample(names.get(thread_id, str(thread_id)), frame)
+
+    def sample(self, thread_name: str, frame: Optional[FrameType]) -> None:
+        """Count the stack of a thread, unless it is not serving a request"""
+        stack: List[FrameType] = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            stack.append(frame)
+            frame = frame.f_back
+        if not any(fragment in f.f_code.co_filename for f in stack for fragment in REQUEST_FRAMES):
+            return
+        stack.reverse()
+        self.stacks[";".join([thread_name] + [_frame_name(f) for f in stack])] += 1
+        self.categories[_category(stack)] += 1
+        self.samples += 1
+
+    def report(self) -> Dict[str, object]:
+        interval_ms = self.interval * 1000
+        return {
+            "interval_ms": interval_ms,
+            "samples": self.samples,
+            "breakdown_ms": {
+                name: round(count * interval_ms, 1) for name, count in self.categories.most_common()
+            },
+            "stacks": dict(self.stacks.most_common()),
+        }
+
+
+def profile_requested(request: Request) -> bool:
+    return (
+        request.headers.get(PROFILE_HEADER) == "1" or request.query_params.get("profile") == "1"
+    )
+
+
+async def profile_request(request: Request, call_next):
+    """Replace the response of a profiled request with its profile"""
+    if not profile_requested(request):
+        return await call_next(request)
+
+    settings = request.app.state.settings
+    if not token_matches(settings.PROFILING_TOKEN, request.headers.get(TOKEN_HEADER)):
+        return JSONResponse(
+            status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Invalid profiling token"}
+        )
+
+    metrics.increment("profiling.requests")
+    profiler = SamplingProfiler(settings.PROFILING_SAMPLE_INTERVAL_MS)
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        response = await call_next(request)
+        # Wait for the whole body so that streamed responses are covered too
+        size = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+    finally:
+        profiler.stop()
+
+    return JSONResponse({
+        "status_code": response.status_code,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "response_bytes": size,
+        **profiler.report(),
+    })
+
+
+# Memory snapshots (tracemalloc), per worker
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+
+
+def start_tracing(frames: int) -> Dict[str, object]:
+    """Start tracing allocations; later snapshots can be compared to this point"""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _baseline = _snapshot()
+    return memory_status()
+
+
+def stop_tracing() -> Dict[str, object]:
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+    return memory_status()
+
+
+def memory_status() -> Dict[str, object]:
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "pid": os.getpid(),
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_kib": round(current / 1024, 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def memory_top(limit: int, group_by: str, compare: bool) -> Dict[str, object]:
+    """Largest allocation sites of the worker, or their growth since start_tracing"""
+    if not tracemalloc.is_tracing():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Allocation tracing is off; start it with POST /debug/memory/start"
+        )
+
+    snapshot = _snapshot()
+    if compare and _baseline is not None:
+        stats = snapshot.compare_to(_baseline, group_by)
+        top = [
+            {
+                "location": _location(stat.traceback),
+                "size_kib": round(stat.size / 1024, 1),
+                "size_diff_kib": round(stat.size_diff / 1024, 1),
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+    else:
+        top = [
+            {
+                "location": _location(stat.traceback),
+                "size_kib": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics(group_by)[:limit]
+        ]
+    return {**memory_status(), "group_by": group_by, "top": top}
+
+
+def _location(traceback: tracemalloc.Traceback) -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
@@ -0,0 +1,223 @@
+"""
+Per-client rate limiting
+
+Each client IP gets one token bucket per route group, configured in RATE_LIMITS as
+``group: (requests per second, burst)``. Responses carry ``RateLimit-Limit``,
+``RateLimit-Remaining`` and ``RateLimit-Reset`` headers; rejected requests get
+a 429 with ``Retry-After``.
+
+Two backends are available:
+- ``InMemoryBackend``: per-worker token buckets (default). Only touched from
+  the event loop thread, so it needs no lock.
+- ``SharedBackend``: wraps a Redis-like client (``incr``/``expire``) so that
+  all workers share the limit. It counts requests in fixed windows of
+  ``burst / rate`` seconds, which allows the same average rate and burst.
+  Its calls block, so they run in a worker thread, never on the event loop.
+  While the store is unreachable requests are let through (fail open),
+  counted in ``rate_limit.backend_errors``.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+from starlette.requests import Request
+
+from app.config import Settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TICKETS_READ = "tickets_read"
+TICKETS_WRITE = "tickets_write"
+BATCH = "batch"
+MULTI_OP = "multi_op"
+TAGS = "tags"
+
+# (allowed, remaining, seconds until the bucket is full again / window resets)
+Decision = Tuple[bool, int, float]
+
+# Socket timeouts of the shared store's client; a hit that takes longer
+# fails open
+SHARED_TIMEOUT_SECONDS = 0.25
+
+
+def route_group(request: Request) -> Optional[str]:
+    """Rate limit group of a request, or None if it is not limited"""
+    path = request.url.path
+    if path.startswith("/api/tickets/batch/get"):
+        # A read, however it is sent
+        return TICKETS_READ
+    if path.startswith("/api/batch"):
+        # Many small writes, not one bulk statement
+        return MULTI_OP
+    if path.startswith(("/api/tickets/batch", "/api/tags/batch")):
+        return BATCH
+    if path.startswith("/api/tickets"):
+        return TICKETS_READ if request.method in ("GET", "HEAD") else TICKETS_WRITE
+    if path.startswith("/api/tags"):
+        return TAGS
+    return None
+
+
+def client_identity(request: Request) -> str:
+    """Client IP (behind a proxy, run uvicorn with --proxy-headers)
+
+    Nothing a client sends can be trusted to tell clients apart: there are
+    no API keys to check, and a made-up header per request would get a
+    fresh bucket every time.
+    """
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+class RateLimitBackend(Protocol):
+    """Storage used by RateLimiter"""
+
+    # Whether hit() does I/O (and must not run on the event loop)
+    blocking: bool
+
+    def hit(self, key: str, rate: float, burst: int) -> Decision: ...
+
+
+class InMemoryBackend:
+    """Process-local token buckets, least recently used dropped past max_buckets"""
+
+    blocking = False
+
+    def __init__(self, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        # key -> [tokens, last update], least recently used first
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def hit(self, key: str, rate: float, burst: int) -> Decision:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                # Forgetting a bucket only makes that client's limit reset;
+                # clients that keep sending requests are never the ones dropped
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = [float(burst), now]
+            tokens = float(burst)
+        else:
+            self._buckets.move_to_end(key)
+            tokens = bucket[0] + (now - bucket[1]) * rate
+            if tokens > burst:
+                tokens = float(burst)
+            bucket[1] = now
+
+        if tokens < 1:
+            bucket[0] = tokens
+            return False, 0, (1 - tokens) / rate
+        tokens -= 1
+        bucket[0] = tokens
+        return True, int(tokens), (burst - tokens) / rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SharedBackend:
+    """Fixed-window counters shared between workers through a Redis-like client
+
+    The client only needs ``incr(key)`` and ``expire(key, seconds)``, so tests
+    can pass a local stand-in.
+    """
+
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str = "pmanager:ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key: str, rate: float, burst: int) -> Decision:
+        window = burst / rate
+        now = time.time()
+        window_index = int(now // window)
+        window_key = f"{self.prefix}:{key}:{window_index}"
+        count = int(self.client.incr(window_key))
+        if count == 1:
+            self.client.expire(window_key, math.ceil(window) + 1)
+        reset = (window_index + 1) * window - now
+        return count <= burst, max(0, burst - count), reset
+
+    def __len__(self) -> int:
+        return 0
+
+
+def build_backend(url: Optional[str]) -> RateLimitBackend:
+    """Create the configured backend (shared when a URL is set)"""
+    if not url:
+        return InMemoryBackend()
+
+    try:
+        import redis
+    except ImportError as exc:
+        raise RuntimeError(
+            "RATE_LIMIT_URL is set but the 'redis' package is not installed"
+        ) from exc
+
+    return SharedBackend(redis.Redis.from_url(
+        url, socket_timeout=SHARED_TIMEOUT_SECONDS, socket_connect_timeout=SHARED_TIMEOUT_SECONDS
+    ))
+
+
+class RateLimiter:
+    """Applies the per-group limits to requests"""
+
+    def __init__(self, backend: RateLimitBackend, limits: Dict[str, Tuple[float, int]]):
+        self.backend = backend
+        self.limits = limits
+        self._backend_failing = False
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "RateLimiter":
+        return cls(build_backend(settings.RATE_LIMIT_URL), settings.RATE_LIMITS)
+
+    async def check(self, request: Request) -> Optional[Tuple[str, Decision, int]]:
+        """Take a token for the request; None if its route is not limited
+
+        Also None (the request goes through unlimited) while a shared backend
+        is failing.
+        """
+        group = route_group(request)
+        limit = self.limits.get(group) if group else None
+        if limit is None:
+            return None
+
+        rate, burst = limit
+        key = f"{group}:{client_identity(request)}"
+        if not self.backend.blocking:
+            return group, self.backend.hit(key, rate, burst), burst
+
+        try:
+            decision = await asyncio.to_thread(self.backend.hit, key, rate, burst)
+        except Exception:
+            metrics.increment("rate_limit.backend_errors")
+            if not self._backend_failing:
+                # Logged once per outage, not once per request
+                self._backend_failing = True
+                logger.warning(
+                    "Rate limit backend unavailable; not limiting requests", exc_info=True
+                )
+            return None
+
+        if self._backend_failing:
+            self._backend_failing = False
+            logger.info("Rate limit backend reachable again")
+        return group, decision, burst
+
+
+def rate_limit_headers(decision: Decision, burst: int) -> Dict[str, str]:
+    """``RateLimit-*`` response headers (and ``Retry-After`` when rejected)"""
+    allowed, remaining, reset = decision
+    headers = {
+        "RateLimit-Limit": str(burst),
+        "RateLimit-Remaining": str(remaining),
+        "RateLimit-Reset": str(math.ceil(reset)),
+    }
+    if not allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(reset)))
+    return headers
@@ -1,3 +1,3 @@
-from . import tickets, tags
+from . import tickets, tags, events, batch, debug
 
-__all__ = ["tickets", "tags"]
+__all__ = ["tickets", "tags", "events", "batch", "debug"]
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.schemas.batch import BatchRequest, BatchResponse
+from app.services import batch_service
+
+router = APIRouter()
+
+
+@router.post("/", response_model=BatchResponse)
+def run_batch(request: BatchRequest, db: Session = Depends(get_db)):
+    """Run several ticket/tag operations in one transaction
+
+    Operations run in order and are committed together; if one fails,
+    none is applied and the error names the failing operation. Supported
+    operations: create_tag, update_tag, create_ticket, update_ticket,
+    toggle_complete, delete_ticket, add_tags_to_ticket and
+    remove_tag_from_ticket, with the same arguments as the corresponding
+    endpoints plus "id" for existing tickets and tags. update_tag,
+    update_ticket, toggle_complete and delete_ticket also take
+    "expectedVersion" (like If-Match); the tag link operations reject it.
+    "$ops[N].field" refers to a field of the result of operation N.
+
+    Example request:
+    ```json
+    {
+        "operations": [
+            {"op": "create_ticket", "args": {"title": "Login fails on Safari"}},
+            {"op": "create_tag", "args": {"name": "safari", "color": "#0ea5e9"}},
+            {"op": "create_tag", "args": {"name": "auth"}},
+            {
+                "op": "add_tags_to_ticket",
+                "args": {"id": "$ops[0].id", "tagIds": ["$ops[1].id", "$ops[2].id"]}
+            }
+        ]
+    }
+    ```
+    """
+    return BatchResponse(results=batch_service.run_batch(db, request.operations))
@@ -0,0 +1,35 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from app import profiling
+
+# Only included when PROFILING_TOKEN is set (see app/profiling.py)
+router = APIRouter(dependencies=[Depends(profiling.require_profiling_token)])
+
+
+@router.get("/memory")
+def memory_top(
+    top: int = Query(20, ge=1, le=500),
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno", alias="groupBy"),
+    compare: bool = False
+):
+    """Top allocation sites of this worker (tracemalloc)
+
+    With ``compare=true`` the sites are ranked by growth since tracing was
+    started. Each worker traces on its own: the ``pid`` tells which one
+    answered.
+    """
+    return profiling.memory_top(top, group_by, compare)
+
+
+@router.post("/memory/start")
+def start_memory_tracing(frames: int = Query(1, ge=1, le=50)):
+    """Start tracing allocations in this worker, keeping ``frames`` frames per site"""
+    return profiling.start_tracing(frames)
+
+
+@router.post("/memory/stop")
+def stop_memory_tracing():
+    """Stop tracing allocations in this worker"""
+    return profiling.stop_tracing()
@@ -0,0 +1,42 @@
+import asyncio
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.events import broker, format_sse
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 15
+
+
+@router.get("/")
+async def stream_events(request: Request):
+    """Stream ticket and tag change events (Server-Sent Events)
+
+    Event types: ticket.created, ticket.updated, ticket.deleted,
+    ticket.tags_changed, tag.created, tag.updated, tag.deleted and resync.
+    Each event carries the affected ``ids`` (omitted for very large batches),
+    a ``count`` and a ``batch`` flag. On ``resync`` clients should refetch.
+    """
+    queue = broker.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing idle connections
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
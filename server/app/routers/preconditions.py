@@ -0,0 +1,52 @@
+"""
+HTTP conditional request helpers (ETag / If-Match) and Prefer handling
+
+Tickets and tags expose their ``version`` column as a strong ETag. Clients
+send it back in ``If-Match`` to make an update conditional; the service
+layer turns that into ``UPDATE ... WHERE id = :id AND version = :v`` and
+answers 412 when another request got there first.
+
+Batch endpoints honour ``Prefer: return=representation`` (RFC 7240) by
+returning the affected tickets, and confirm it with ``Preference-Applied``;
+above BATCH_GET_MAX_IDS tickets the preference is ignored.
+"""
+from typing import Optional
+
+from fastapi import Header, HTTPException, Response
+
+
+def if_match_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """Dependency returning the version from If-Match (None if absent or *)"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+    if not value.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match must be an ETag returned by the API")
+    return int(value)
+
+
+def set_etag(response: Response, version: int) -> None:
+    """Expose a resource version as its ETag"""
+    response.headers["ETag"] = f'"{version}"'
+
+
+RETURN_REPRESENTATION = "return=representation"
+
+
+def prefers_representation(prefer: Optional[str] = Header(None)) -> bool:
+    """Dependency: whether the client sent Prefer: return=representation"""
+    if not prefer:
+        return False
+    return any(
+        preference.strip().lower() == RETURN_REPRESENTATION
+        for preference in prefer.split(",")
+    )
+
+
+def set_preference_applied(response: Response) -> None:
+    """Confirm that the representation was returned"""
+    response.headers["Preference-Applied"] = RETURN_REPRESENTATION
@@ -1,20 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from app.cancellation import cancel_on_disconnect
 from app.database import get_db
 from app.schemas.tag import (
     TagCreate,
     TagUpdate,
+    TagUpsertRequest,
+    TagUpsertResponse,
+    TagMergeRequest,
     TagResponse,
     TagWithCount,
-    TagsListResponse
+    TagsListResponse,
+    TagSuggestResponse
 )
 from app.services import tag_service
+from app.routers.preconditions import if_match_version, set_etag
 
 router = APIRouter()
 
 
-@router.get("/", response_model=TagsListResponse)
+@router.get(
+    "/",
+    response_model=TagsListResponse,
+    dependencies=[cancel_on_disconnect("tags_list")]
+)
 def get_tags(db: Session = Depends(get_db)):
     """Get all tags with ticket counts"""
     tags = tag_service.get_tags_with_counts(db)
@@ -27,16 +37,67 @@ def create_tag(tag: TagCreate, db: Session = Depends(get_db)):
     return tag_service.create_tag(db, tag)
 
 
+@router.post("/batch", response_model=TagUpsertResponse)
+def upsert_tags(request: TagUpsertRequest, db: Session = Depends(get_db)):
+    """Create or update tags by name
+
+    Names match case-insensitively. Existing tags take the given name and
+    color (a missing color keeps the current one).
+
+    Example request:
+    ```json
+    {
+        "tags": [
+            {"name": "bug", "color": "#ef4444"},
+            {"name": "Feature"}
+        ]
+    }
+    ```
+    """
+    return tag_service.upsert_tags(db, request.tags)
+
+
+@router.get(
+    "/suggest",
+    response_model=TagSuggestResponse,
+    dependencies=[cancel_on_disconnect("tags_suggest")]
+)
+def suggest_tags(
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """Tags whose name starts with q (case-insensitive), most used first
+
+    For autocomplete; an exact match comes first.
+    """
+    return TagSuggestResponse(tags=tag_service.suggest_tags(db, q, limit))
+
+
 @router.get("/{tag_id}", response_model=TagResponse)
-def get_tag(tag_id: int, db: Session = Depends(get_db)):
+def get_tag(tag_id: int, response: Response, db: Session = Depends(get_db)):
     """Get a single tag by ID"""
-    return tag_service.get_tag_by_id(db, tag_id)
+    db_tag = tag_service.get_tag_by_id(db, tag_id)
+    set_etag(response, db_tag.version)
+    return db_tag
 
 
 @router.put("/{tag_id}", response_model=TagResponse)
-def update_tag(tag_id: int, tag: TagUpdate, db: Session = Depends(get_db)):
-    """Update a tag"""
-    return tag_service.update_tag(db, tag_id, tag)
+def update_tag(
+    tag_id: int,
+    tag: TagUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+    db: Session = Depends(get_db)
+):
+    """Update a tag
+
+    Send the tag's ETag in If-Match to fail with 412 instead of overwriting
+    a concurrent edit.
+    """
+    db_tag = tag_service.update_tag(db, tag_id, tag, expected_version)
+    set_etag(response, db_tag.version)
+    return db_tag
 
 
 @router.delete("/{tag_id}", status_code=204)
@@ -44,3 +105,27 @@ def delete_tag(tag_id: int, db: Session = Depends(get_db)):
     """Delete a tag"""
     tag_service.delete_tag(db, tag_id)
     return None
+
+
+@router.post("/{tag_id}/merge", response_model=TagResponse)
+def merge_tag(
+    tag_id: int,
+    request: TagMergeRequest,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """Merge a tag into another one
+
+    Moves the tag's tickets (live and archived) to the target tag and deletes
+    it. Returns the target tag.
+
+    Example request:
+    ```json
+    {
+        "targetId": 2
+    }
+    ```
+    """
+    db_tag = tag_service.merge_tag(db, tag_id, request.target_id)
+    set_etag(response, db_tag.version)
+    return db_tag
@@ -1,28 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from app.cancellation import cancel_on_disconnect
+from app.config import settings
 from app.database import get_db
 from app.schemas.ticket import (
     TicketCreate,
     TicketUpdate,
     TicketResponse,
     TicketsListResponse,
+    TicketChangesResponse,
     AddTagsRequest,
     BatchUpdateStatusRequest,
     BatchDeleteRequest,
+    BatchUpdateRequest,
+    BatchGetRequest,
+    BatchGetResponse,
     BatchOperationResponse
 )
 from app.services import ticket_service
+from app.routers.preconditions import (
+    if_match_version,
+    prefers_representation,
+    set_etag,
+    set_preference_applied
+)
 
 router = APIRouter()
 
 
-@router.get("/", response_model=TicketsListResponse)
+@router.get(
+    "/",
+    response_model=TicketsListResponse,
+    dependencies=[cancel_on_disconnect("tickets_list")]
+)
 def get_tickets(
-    search: Optional[str] = Query(None, description="Search in title and description"),
+    search: Optional[str] = Query(
+        None,
+        max_length=200,
+        description=(
+            "Search in title and description (terms under 3 characters match title prefixes)"
+        ),
+    ),
     tags: Optional[str] = Query(None, description="Comma-separated tag names or IDs"),
     status: Optional[str] = Query("all", description="Filter by status: all, open, completed"),
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(
+        None, ge=1, description="Maximum number of tickets (newest first)"
+    ),
+    db: Session = Depends(get_db),
 ):
     """Get all tickets with optional filters
 
@@ -35,8 +60,34 @@ def get_tickets(
     if tags:
         tag_ids = ticket_service.parse_tag_filter(db, tags)
 
-    tickets = ticket_service.get_tickets(db, search, tag_ids, status)
-    return TicketsListResponse(tickets=tickets)
+    tickets, truncated = ticket_service.get_tickets(db, search, tag_ids, status, limit)
+    return TicketsListResponse(tickets=tickets, truncated=truncated)
+
+
+@router.get(
+    "/changes",
+    response_model=TicketChangesResponse,
+    dependencies=[cancel_on_disconnect("tickets_changes")]
+)
+def get_ticket_changes(
+    since: Optional[str] = Query(
+        None, description="nextToken from the previous sync; omit for a full sync"
+    ),
+    db: Session = Depends(get_db),
+):
+    """Get tickets changed since a sync token
+
+    Returns tickets created or updated after the token, the IDs of tickets
+    deleted after it (tombstones), the tags deleted or merged after it and
+    the token for the next call.
+    """
+    tickets, deleted_ids, deleted_tags, next_token = ticket_service.get_changes(
+        db,
+        ticket_service.parse_sync_token(since)
+    )
+    return TicketChangesResponse(
+        tickets=tickets, deleted_ids=deleted_ids, deleted_tags=deleted_tags, next_token=next_token
+    )
 
 
 @router.post("/", response_model=TicketResponse, status_code=201)
@@ -46,28 +97,61 @@ def create_ticket(ticket: TicketCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/{ticket_id}", response_model=TicketResponse)
-def get_ticket(ticket_id: int, db: Session = Depends(get_db)):
+def get_ticket(ticket_id: int, response: Response, db: Session = Depends(get_db)):
     """Get a single ticket by ID"""
-    return ticket_service.get_ticket_by_id(db, ticket_id)
+    db_ticket = ticket_service.get_ticket_by_id(db, ticket_id)
+    set_etag(response, db_ticket.version)
+    return db_ticket
 
 
 @router.put("/{ticket_id}", response_model=TicketResponse)
-def update_ticket(ticket_id: int, ticket: TicketUpdate, db: Session = Depends(get_db)):
-    """Update a ticket"""
-    return ticket_service.update_ticket(db, ticket_id, ticket)
+def update_ticket(
+    ticket_id: int,
+    ticket: TicketUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+    db: Session = Depends(get_db)
+):
+    """Update a ticket
+
+    Send the ticket's ETag in If-Match to fail with 412 instead of
+    overwriting a concurrent edit.
+    """
+    db_ticket = ticket_service.update_ticket(db, ticket_id, ticket, expected_version)
+    set_etag(response, db_ticket.version)
+    return db_ticket
 
 
 @router.delete("/{ticket_id}", status_code=204)
-def delete_ticket(ticket_id: int, db: Session = Depends(get_db)):
-    """Delete a ticket"""
-    ticket_service.delete_ticket(db, ticket_id)
+def delete_ticket(
+    ticket_id: int,
+    expected_version: Optional[int] = Depends(if_match_version),
+    db: Session = Depends(get_db)
+):
+    """Delete a ticket (If-Match supported)"""
+    ticket_service.delete_ticket(db, ticket_id, expected_version)
     return None
 
 
+@router.post("/{ticket_id}/restore", response_model=TicketResponse)
+def restore_ticket(ticket_id: int, response: Response, db: Session = Depends(get_db)):
+    """Undo a delete (single or batch) within the retention window"""
+    db_ticket = ticket_service.restore_ticket(db, ticket_id)
+    set_etag(response, db_ticket.version)
+    return db_ticket
+
+
 @router.patch("/{ticket_id}/complete", response_model=TicketResponse)
-def toggle_complete(ticket_id: int, db: Session = Depends(get_db)):
-    """Toggle ticket completion status"""
-    return ticket_service.toggle_complete(db, ticket_id)
+def toggle_complete(
+    ticket_id: int,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+    db: Session = Depends(get_db)
+):
+    """Toggle ticket completion status (If-Match supported)"""
+    db_ticket = ticket_service.toggle_complete(db, ticket_id, expected_version)
+    set_etag(response, db_ticket.version)
+    return db_ticket
 
 
 @router.post("/{ticket_id}/tags", response_model=TicketResponse)
@@ -86,11 +170,42 @@ def remove_tag_from_ticket(ticket_id: int, tag_id: int, db: Session = Depends(ge
     return ticket_service.remove_tag(db, ticket_id, tag_id)
 
 
-@router.post("/batch/status", response_model=BatchOperationResponse)
-def batch_update_status(request: BatchUpdateStatusRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/batch/get",
+    response_model=BatchGetResponse,
+    dependencies=[cancel_on_disconnect("tickets_batch_get")]
+)
+def batch_get_tickets(request: BatchGetRequest, db: Session = Depends(get_db)):
+    """Batch fetch tickets by ID
+
+    Returns the tickets in request order and lists the IDs that do not exist
+    (or were deleted) in missingIds.
+
+    Example request:
+    ```json
+    {
+        "ticketIds": [3, 1, 2]
+    }
+    ```
+    """
+    tickets, missing_ids = ticket_service.get_tickets_by_ids(db, request.ticket_ids)
+    return BatchGetResponse(tickets=tickets, missing_ids=missing_ids)
+
+
+@router.post(
+    "/batch/status", response_model=BatchOperationResponse, response_model_exclude_unset=True
+)
+def batch_update_status(
+    request: BatchUpdateStatusRequest,
+    response: Response,
+    representation: bool = Depends(prefers_representation),
+    db: Session = Depends(get_db)
+):
     """Batch update ticket completion status
 
-    Updates the completion status for multiple tickets at once.
+    Updates the completion status for multiple tickets at once. With
+    `Prefer: return=representation` the updated tickets are returned too
+    (unless there are more than BATCH_GET_MAX_IDS of them).
 
     Example request:
     ```json
@@ -100,25 +215,83 @@ def batch_update_status(request: BatchUpdateStatusRequest, db: Session = Depends
     }
     ```
     """
-    affected_count = ticket_service.batch_update_status(
+    updated_ids = ticket_service.batch_update_status(
         db,
         request.ticket_ids,
         request.is_completed
     )
 
     status_text = "completed" if request.is_completed else "open"
-    return BatchOperationResponse(
-        success=True,
-        affected_count=affected_count,
-        message=f"Successfully updated {affected_count} ticket(s) to {status_text}"
+    return _batch_result(
+        db, response, representation, updated_ids,
+        f"Successfully updated {len(updated_ids)} ticket(s) to {status_text}"
     )
 
 
-@router.post("/batch/delete", response_model=BatchOperationResponse)
-def batch_delete_tickets(request: BatchDeleteRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/batch/update", response_model=BatchOperationResponse, response_model_exclude_unset=True
+)
+def batch_update_tickets(
+    request: BatchUpdateRequest,
+    response: Response,
+    representation: bool = Depends(prefers_representation),
+    db: Session = Depends(get_db)
+):
+    """Batch update ticket fields
+
+    Applies the same patch (any of title, description, isCompleted) to the
+    tickets listed in ticketIds, or to all live tickets matching filter
+    (search, tags and status as on GET /api/tickets). Send exactly one of them.
+    With `Prefer: return=representation` the updated tickets are returned too
+    (unless there are more than BATCH_GET_MAX_IDS of them).
+
+    Example request:
+    ```json
+    {
+        "filter": {"tags": "bug", "status": "open"},
+        "patch": {"description": "Triaged in the weekly review"}
+    }
+    ```
+    """
+    if (request.ticket_ids is None) == (request.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either ticketIds or filter")
+
+    ticket_ids = request.ticket_ids
+    if request.filter is not None:
+        tag_ids = None
+        if request.filter.tags:
+            tag_ids = ticket_service.parse_tag_filter(db, request.filter.tags)
+        if request.filter.tags and not tag_ids:
+            # Unknown tags match nothing rather than every ticket
+            ticket_ids = []
+        else:
+            ticket_ids = ticket_service.match_ticket_ids(
+                db, request.filter.search, tag_ids, request.filter.status
+            )
+        if not ticket_ids:
+            return _batch_result(db, response, representation, [], "No tickets matched the filter")
+
+    updated_ids = ticket_service.batch_update(db, ticket_ids, request.patch)
+
+    return _batch_result(
+        db, response, representation, updated_ids,
+        f"Successfully updated {len(updated_ids)} ticket(s)"
+    )
+
+
+@router.post(
+    "/batch/delete", response_model=BatchOperationResponse, response_model_exclude_unset=True
+)
+def batch_delete_tickets(
+    request: BatchDeleteRequest,
+    response: Response,
+    representation: bool = Depends(prefers_representation),
+    db: Session = Depends(get_db)
+):
     """Batch delete tickets
 
-    Deletes multiple tickets at once.
+    Deletes multiple tickets at once. With `Prefer: return=representation`
+    the IDs actually deleted are returned in deletedIds.
 
     Example request:
     ```json
@@ -127,10 +300,46 @@ def batch_delete_tickets(request: BatchDeleteRequest, db: Session = Depends(get_
     }
     ```
     """
-    affected_count = ticket_service.batch_delete(db, request.ticket_ids)
+    deleted_ids = ticket_service.batch_delete(db, request.ticket_ids)
+
+    return _batch_result(
+        db, response, representation, deleted_ids,
+        f"Successfully deleted {len(deleted_ids)} ticket(s)",
+        deleted=True
+    )
+
+
+def _batch_result(
+    db: Session,
+    response: Response,
+    representation: bool,
+    affected_ids: List[int],
+    message: str,
+    deleted: bool = False
+) -> BatchOperationResponse:
+    """Batch response, with the affected tickets (or deleted IDs) if preferred
+
+    The preference is ignored (RFC 7240 allows it) when more tickets were
+    affected than one POST /api/tickets/batch/get may return: a filter-based
+    update could otherwise load and serialize the whole table.
+    """
+    too_many = not deleted and len(affected_ids) > settings.BATCH_GET_MAX_IDS
+    if not representation or too_many:
+        return BatchOperationResponse(
+            success=True, affected_count=len(affected_ids), message=message
+        )
 
+    set_preference_applied(response)
+    if deleted:
+        return BatchOperationResponse(
+            success=True,
+            affected_count=len(affected_ids),
+            message=message,
+            deleted_ids=affected_ids,
+        )
     return BatchOperationResponse(
         success=True,
-        affected_count=affected_count,
-        message=f"Successfully deleted {affected_count} ticket(s)"
+        affected_count=len(affected_ids),
+        message=message,
+        tickets=ticket_service.load_tickets(db, affected_ids)
     )
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+
+class BatchOperation(BaseModel):
+    """One operation of a batch: an operation name and its arguments
+
+    String arguments of the form ``$ops[N].field`` are replaced by that field
+    of the result of an earlier operation N (e.g. ``$ops[0].id``).
+    """
+    op: str
+    args: Dict[str, Any] = {}
+
+
+class BatchRequest(BaseModel):
+    """Operations to run in order, in one transaction"""
+    operations: List[BatchOperation]
+
+
+class BatchResponse(BaseModel):
+    """Result of each operation, in request order (null for deletes)"""
+    results: List[Optional[Dict[str, Any]]]
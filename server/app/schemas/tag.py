@@ -19,8 +19,26 @@ class TagUpdate(BaseModel):
     color: Optional[str] = Field(None, pattern=r'^#[0-9A-Fa-f]{6}$')
 
 
+class TagUpsertRequest(BaseModel):
+    """Request model for creating or updating tags by name"""
+    tags: List[TagCreate]
+
+
+class TagUpsertResponse(BaseModel):
+    """IDs of the upserted tags, by outcome"""
+    created: List[int]
+    updated: List[int]
+    unchanged: List[int]
+
+
+class TagMergeRequest(BaseModel):
+    """Request model for merging a tag into another one"""
+    target_id: int = Field(..., serialization_alias="targetId", alias="targetId")
+
+
 class TagResponse(TagBase):
     created_at: datetime = Field(..., serialization_alias="createdAt")
+    version: int = 1
 
     model_config = ConfigDict(
         from_attributes=True,
@@ -40,3 +58,8 @@ class TagWithCount(TagBase):
 class TagsListResponse(BaseModel):
     """Wrapper for list of tags to match API documentation"""
     tags: List[TagWithCount]
+
+
+class TagSuggestResponse(BaseModel):
+    """Tags matching a name prefix, most used first"""
+    tags: List[TagBase]
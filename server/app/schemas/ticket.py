@@ -31,6 +31,7 @@ class TicketResponse(TicketBase):
     is_completed: bool = Field(..., serialization_alias="isCompleted")
     created_at: datetime = Field(..., serialization_alias="createdAt")
     updated_at: datetime = Field(..., serialization_alias="updatedAt")
+    version: int = 1
     tags: List[TagBase] = []
 
     model_config = ConfigDict(
@@ -42,6 +43,8 @@ class TicketResponse(TicketBase):
 class TicketsListResponse(BaseModel):
     """Wrapper for list of tickets to match API documentation"""
     tickets: List[TicketResponse]
+    # More tickets matched than the limit allowed
+    truncated: bool = False
 
 
 class AddTagsRequest(BaseModel):
@@ -60,8 +63,53 @@ class BatchDeleteRequest(BaseModel):
     ticket_ids: List[int] = Field(..., serialization_alias="ticketIds", alias="ticketIds")
 
 
+class BatchFilter(BaseModel):
+    """Ticket filters with the same meaning as on GET /api/tickets"""
+    search: Optional[str] = Field(None, max_length=200)
+    tags: Optional[str] = None
+    status: str = "all"
+
+
+class BatchUpdateRequest(BaseModel):
+    """Request model for patching many tickets: either ticketIds or filter"""
+    ticket_ids: Optional[List[int]] = Field(
+        None, serialization_alias="ticketIds", alias="ticketIds"
+    )
+    filter: Optional[BatchFilter] = None
+    patch: TicketUpdate
+
+
+class BatchGetRequest(BaseModel):
+    """Request model for fetching tickets by ID"""
+    ticket_ids: List[int] = Field(..., serialization_alias="ticketIds", alias="ticketIds")
+
+
+class BatchGetResponse(BaseModel):
+    """Tickets found, in request order, and the requested IDs that were not"""
+    tickets: List[TicketResponse]
+    missing_ids: List[int] = Field(..., serialization_alias="missingIds")
+
+
 class BatchOperationResponse(BaseModel):
     """Response model for batch operations"""
     success: bool
     affected_count: int = Field(..., serialization_alias="affectedCount")
     message: str
+    # Only with Prefer: return=representation
+    tickets: Optional[List[TicketResponse]] = None
+    deleted_ids: Optional[List[int]] = Field(None, serialization_alias="deletedIds")
+
+
+class DeletedTag(BaseModel):
+    """A deleted tag; clients drop it from their tickets, or replace it when merged"""
+    id: int
+    merged_into_id: Optional[int] = Field(None, serialization_alias="mergedIntoId")
+
+
+class TicketChangesResponse(BaseModel):
+    """Tickets changed and deleted since a sync token"""
+    tickets: List[TicketResponse]
+    deleted_ids: List[int] = Field(..., serialization_alias="deletedIds")
+    # Tag deletes and merges do not touch the tickets that carried the tag
+    deleted_tags: List[DeletedTag] = Field(..., serialization_alias="deletedTags")
+    next_token: str = Field(..., serialization_alias="nextToken")
@@ -1,3 +1,3 @@
-from . import ticket_service, tag_service
+from . import ticket_service, tag_service, archive_service, batch_service
 
-__all__ = ["ticket_service", "tag_service"]
+__all__ = ["ticket_service", "tag_service", "archive_service", "batch_service"]
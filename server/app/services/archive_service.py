@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.orm import Session
+from app.models.ticket import ArchivedTicket, Ticket, ticket_tags, ticket_tags_archive
+from app.services.query_cache import query_cache
+from typing import List, Optional
+
+ARCHIVED_COLUMNS = [
+    "id", "title", "description", "is_completed", "created_at", "updated_at", "version"
+]
+
+
+def archive_completed_tickets(
+    db: Session,
+    older_than_days: int,
+    batch_size: int = 1000,
+    max_batches: Optional[int] = None
+) -> int:
+    """
+    Move completed tickets older than a given age into the archive tables
+
+    Works in batches of ``batch_size`` tickets, one transaction each, so the
+    hot tables are never locked for long.
+
+    Args:
+        db: Database session
+        older_than_days: Archive tickets completed (last updated) before this age
+        batch_size: Tickets moved per transaction
+        max_batches: Stop after this many batches (None for no limit)
+
+    Returns:
+        Number of tickets archived
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    total = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        archived = _archive_batch(db, cutoff, batch_size)
+        total += archived
+        batches += 1
+        if archived < batch_size:
+            break
+
+    if total:
+        query_cache.invalidate()
+    return total
+
+
+def _archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """Archive one batch of tickets in a single transaction"""
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        # Tells the change-feed and tombstone triggers this is not a user delete
+        db.execute(text("SET LOCAL pmanager.archiving = 'on'"))
+
+    id_query = select(Ticket.id).where(
+        Ticket.is_completed == True,
+        Ticket.updated_at < cutoff,
+        Ticket.deleted_at.is_(None)
+    ).order_by(Ticket.updated_at).limit(batch_size)
+    if postgres:
+        # Skip rows being edited right now; they are picked up next run
+        id_query = id_query.with_for_update(skip_locked=True)
+
+    ticket_ids: List[int] = list(db.execute(id_query).scalars())
+    if not ticket_ids:
+        db.rollback()
+        return 0
+
+    db.execute(
+        insert(ArchivedTicket).from_select(
+            ARCHIVED_COLUMNS,
+            select(*[getattr(Ticket, column) for column in ARCHIVED_COLUMNS]).where(
+                Ticket.id.in_(ticket_ids)
+            )
+        )
+    )
+    db.execute(
+        insert(ticket_tags_archive).from_select(
+            ["ticket_id", "tag_id", "created_at"],
+            select(ticket_tags.c.ticket_id, ticket_tags.c.tag_id, ticket_tags.c.created_at).where(
+                ticket_tags.c.ticket_id.in_(ticket_ids)
+            )
+        )
+    )
+    db.execute(delete(ticket_tags).where(ticket_tags.c.ticket_id.in_(ticket_ids)))
+    db.execute(
+        delete(Ticket).where(Ticket.id.in_(ticket_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return len(ticket_ids)
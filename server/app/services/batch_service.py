@@ -0,0 +1,209 @@
+"""
+Multi-operation requests (POST /api/batch)
+
+Runs an ordered list of ticket and tag operations in the request's
+transaction and commits once: either every operation applies or none does.
+Operations reuse the regular service functions on a session joined to that
+transaction with SAVEPOINTs: a service's commit releases its savepoint and
+its rollback undoes only its own operation, so the one real commit happens
+at the end.
+
+Arguments may refer to the results of earlier operations with
+``$ops[N].field``, e.g. a ticket created in operation 0 is ``$ops[0].id``.
+"""
+import re
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.metrics import metrics
+from app.schemas.batch import BatchOperation
+from app.schemas.tag import TagCreate, TagResponse, TagUpdate
+from app.schemas.ticket import AddTagsRequest, TicketCreate, TicketResponse, TicketUpdate
+from app.services import tag_service, ticket_service
+from app.services.query_cache import query_cache
+from app.tracing import annotate, traced
+
+REFERENCE = re.compile(r"^\$ops\[(\d+)\]\.(\w+)$")
+
+
+class _Target(BaseModel):
+    """Arguments naming an existing ticket or tag"""
+    id: int
+    expected_version: Optional[int] = Field(None, alias="expectedVersion")
+
+
+def _unversioned_target(args: dict) -> _Target:
+    """Target of an operation that cannot be made conditional"""
+    target = _Target.model_validate(args)
+    if target.expected_version is not None:
+        raise HTTPException(
+            status_code=422, detail="expectedVersion is not supported by this operation"
+        )
+    return target
+
+
+class _TagRef(BaseModel):
+    tag_id: int = Field(..., alias="tagId")
+
+
+def _create_tag(db: Session, args: dict):
+    return tag_service.create_tag(db, TagCreate.model_validate(args))
+
+
+def _update_tag(db: Session, args: dict):
+    target = _Target.model_validate(args)
+    return tag_service.update_tag(
+        db, target.id, TagUpdate.model_validate(args), target.expected_version
+    )
+
+
+def _create_ticket(db: Session, args: dict):
+    return ticket_service.create_ticket(db, TicketCreate.model_validate(args))
+
+
+def _update_ticket(db: Session, args: dict):
+    target = _Target.model_validate(args)
+    return ticket_service.update_ticket(
+        db, target.id, TicketUpdate.model_validate(args), target.expected_version
+    )
+
+
+def _toggle_complete(db: Session, args: dict):
+    target = _Target.model_validate(args)
+    return ticket_service.toggle_complete(db, target.id, target.expected_version)
+
+
+def _delete_ticket(db: Session, args: dict):
+    target = _Target.model_validate(args)
+    ticket_service.delete_ticket(db, target.id, target.expected_version)
+
+
+def _add_tags_to_ticket(db: Session, args: dict):
+    target = _unversioned_target(args)
+    return ticket_service.add_tags(db, target.id, AddTagsRequest.model_validate(args).tag_ids)
+
+
+def _remove_tag_from_ticket(db: Session, args: dict):
+    target = _unversioned_target(args)
+    return ticket_service.remove_tag(db, target.id, _TagRef.model_validate(args).tag_id)
+
+
+# Operation name (as the route handler) -> (handler, response schema)
+OPERATIONS: Dict[str, Tuple[Callable[[Session, dict], Any], Optional[Type[BaseModel]]]] = {
+    "create_tag": (_create_tag, TagResponse),
+    "update_tag": (_update_tag, TagResponse),
+    "create_ticket": (_create_ticket, TicketResponse),
+    "update_ticket": (_update_ticket, TicketResponse),
+    "toggle_complete": (_toggle_complete, TicketResponse),
+    "delete_ticket": (_delete_ticket, None),
+    "add_tags_to_ticket": (_add_tags_to_ticket, TicketResponse),
+    "remove_tag_from_ticket": (_remove_tag_from_ticket, TicketResponse),
+}
+
+
+@contextmanager
+def _savepoint_session(db: Session) -> Iterator[Session]:
+    """Session whose commits and rollbacks stay inside db's transaction"""
+    operations_db = Session(
+        bind=db.connection(),
+        join_transaction_mode="create_savepoint",
+        autoflush=False,
+        info=db.info,
+    )
+    try:
+        yield operations_db
+    finally:
+        operations_db.close()
+
+
+def _resolve(value: Any, results: List[Optional[dict]], index: int) -> Any:
+    """Replace $ops[N].field references in an argument value"""
+    if isinstance(value, dict):
+        return {key: _resolve(item, results, index) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve(item, results, index) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    match = REFERENCE.match(value)
+    if not match:
+        return value
+    ref_index, field = int(match.group(1)), match.group(2)
+    if ref_index >= index:
+        raise HTTPException(status_code=422, detail=f"{value} must refer to an earlier operation")
+    result = results[ref_index]
+    if not result or field not in result:
+        raise HTTPException(
+            status_code=422, detail=f"{value}: operation {ref_index} has no field '{field}'"
+        )
+    return result[field]
+
+
+@traced
+def run_batch(db: Session, operations: List[BatchOperation]) -> List[Optional[dict]]:
+    """
+    Run operations in order and commit them together
+
+    Args:
+        db: Database session
+        operations: Operations with their (possibly referencing) arguments
+
+    Returns:
+        Each operation's result as the corresponding endpoint would return it
+
+    Raises:
+        HTTPException: If the batch is empty or too large, an operation is
+            unknown or invalid, or an operation fails; the status is that of
+            the failing operation and nothing is applied
+    """
+    if not operations:
+        raise HTTPException(status_code=400, detail="No operations provided")
+    max_operations = settings.BATCH_MAX_OPERATIONS
+    if len(operations) > max_operations:
+        raise HTTPException(
+            status_code=422, detail=f"At most {max_operations} operations per batch"
+        )
+    annotate({"batch.operations": len(operations)})
+    unknown = sorted({operation.op for operation in operations} - set(OPERATIONS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown operations: {', '.join(unknown)}")
+
+    results: List[Optional[dict]] = []
+    try:
+        with _savepoint_session(db) as operations_db:
+            for index, operation in enumerate(operations):
+                handler, schema = OPERATIONS[operation.op]
+                try:
+                    value = handler(operations_db, _resolve(operation.args, results, index))
+                except ValidationError as exc:
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"Operation {index} ({operation.op}): invalid arguments: "
+                               + "; ".join(error["msg"] for error in exc.errors())
+                    ) from exc
+                except HTTPException as exc:
+                    raise HTTPException(
+                        status_code=exc.status_code,
+                        detail=f"Operation {index} ({operation.op}): {exc.detail}",
+                        headers=exc.headers
+                    ) from exc
+                results.append(
+                    schema.model_validate(value).model_dump(mode="json", by_alias=True)
+                    if schema
+                    else None
+                )
+    except BaseException:
+        db.rollback()
+        raise
+
+    db.commit()
+    # The services already invalidated, but before the commit: readers may
+    # have cached the old rows in between
+    query_cache.invalidate()
+    metrics.increment("batch.operations", len(operations))
+    return results
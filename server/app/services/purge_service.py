@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+from app.models.ticket import Ticket, ticket_tags
+from typing import List
+
+
+def purge_deleted_tickets(db: Session, retention_seconds: int, batch_size: int = 500) -> int:
+    """
+    Hard-delete one batch of soft-deleted tickets past the retention window
+
+    Each call is one short transaction over at most ``batch_size`` tickets,
+    so the ON DELETE CASCADE fan-out on ticket_tags stays small.
+
+    Args:
+        db: Database session
+        retention_seconds: Undo window; younger deletions are kept
+        batch_size: Maximum tickets removed by this call
+
+    Returns:
+        Number of tickets purged
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=retention_seconds)
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        # Already announced on the change feed when soft-deleted
+        db.execute(text("SET LOCAL pmanager.purging = 'on'"))
+
+    id_query = select(Ticket.id).where(
+        Ticket.deleted_at.isnot(None),
+        Ticket.deleted_at < cutoff
+    ).order_by(Ticket.deleted_at).limit(batch_size)
+    if postgres:
+        # Several workers may run a purger; never wait on each other
+        id_query = id_query.with_for_update(skip_locked=True)
+
+    ticket_ids: List[int] = list(db.execute(id_query).scalars())
+    if not ticket_ids:
+        db.rollback()
+        return 0
+
+    # Explicit so databases without enforced foreign keys (SQLite) match
+    db.execute(delete(ticket_tags).where(ticket_tags.c.ticket_id.in_(ticket_ids)))
+    db.execute(
+        delete(Ticket).where(Ticket.id.in_(ticket_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return len(ticket_ids)
@@ -0,0 +1,204 @@
+"""
+Query result cache for hot read paths
+
+Results are keyed by a namespace, the normalized query parameters and a
+data-version counter. Every write path bumps the version (see
+``invalidate``), so stale entries are never served: they simply stop being
+addressable and age out of the LRU / TTL.
+
+Two backends are available:
+- ``InMemoryBackend``: per-process LRU with TTL
+- ``SharedBackend``: wraps a Redis-like client (``get``/``set``/``incr``) so
+  that all workers share entries and the version counter
+
+The cache is only on by default with the shared backend: with in-memory
+caches, a write bumps the version of its own worker only, and the other
+workers keep serving their entries until the TTL.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Protocol
+
+from app.config import settings
+from app.metrics import metrics
+
+VERSION_KEY = "query_cache:version"
+
+
+class CacheBackend(Protocol):
+    """Storage used by QueryCache"""
+
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+    def get_version(self) -> int: ...
+
+    def bump_version(self) -> int: ...
+
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int: ...
+
+
+class InMemoryBackend:
+    """Process-local LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_version(self) -> int:
+        return self._version
+
+    def bump_version(self) -> int:
+        with self._lock:
+            self._version += 1
+            # Entries from older versions can no longer be hit
+            self._entries.clear()
+            return self._version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedBackend:
+    """Backend shared between workers through a Redis-like client
+
+    The client only needs ``get(key)``, ``set(key, value, ex=seconds)``,
+    ``incr(key)`` and ``delete(*keys)``, so tests can pass a local stand-in.
+    """
+
+    def __init__(self, client: Any, prefix: str = "pmanager"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self._key(key))
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(self._key(key), pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def get_version(self) -> int:
+        raw = self.client.get(self._key(VERSION_KEY))
+        return int(raw) if raw is not None else 0
+
+    def bump_version(self) -> int:
+        return int(self.client.incr(self._key(VERSION_KEY)))
+
+    def clear(self) -> None:
+        # Bumping the version orphans every entry; they expire via TTL
+        self.bump_version()
+
+    def __len__(self) -> int:
+        return 0
+
+
+class QueryCache:
+    """Versioned read-through cache for service-layer query results"""
+
+    def __init__(self, backend: CacheBackend, ttl: float = 30.0, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+
+    @staticmethod
+    def make_key(namespace: str, version: int, params: Dict[str, Any]) -> str:
+        """Build a stable key from a namespace, data version and parameters"""
+        normalized = "&".join(f"{name}={params[name]!r}" for name in sorted(params))
+        return f"{namespace}:v{version}:{normalized}"
+
+    def get_or_load(self, namespace: str, params: Dict[str, Any], loader: Callable[[], Any]) -> Any:
+        """Return the cached result for params, calling loader on a miss"""
+        if not self.enabled:
+            return loader()
+
+        # Read the version before loading so that a write racing with this
+        # request stores its result under the old (already invalid) version.
+        key = self.make_key(namespace, self.backend.get_version(), params)
+        cached = self.backend.get(key)
+        if cached is not None:
+            metrics.increment("query_cache.hits")
+            return cached
+
+        metrics.increment("query_cache.misses")
+        value = loader()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def invalidate(self) -> None:
+        """Bump the data version; called by every ticket/tag write path"""
+        self.backend.bump_version()
+        metrics.increment("query_cache.invalidations")
+
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this process"""
+        return {
+            "hits": metrics.get("query_cache.hits"),
+            "misses": metrics.get("query_cache.misses"),
+            "invalidations": metrics.get("query_cache.invalidations"),
+            "size": len(self.backend),
+        }
+
+
+def build_backend(url: Optional[str], max_entries: int) -> CacheBackend:
+    """Create the configured backend (shared when a URL is set)"""
+    if not url:
+        return InMemoryBackend(max_entries=max_entries)
+
+    try:
+        import redis
+    except ImportError as exc:
+        raise RuntimeError(
+            "QUERY_CACHE_URL is set but the 'redis' package is not installed"
+        ) from exc
+
+    return SharedBackend(redis.Redis.from_url(url))
+
+
+def cache_enabled(enabled: Optional[bool], url: Optional[str]) -> bool:
+    """Whether to cache: as configured, else only when shared between workers"""
+    return enabled if enabled is not None else bool(url)
+
+
+query_cache = QueryCache(
+    build_backend(settings.QUERY_CACHE_URL, settings.QUERY_CACHE_MAX_ENTRIES),
+    ttl=settings.QUERY_CACHE_TTL_SECONDS,
+    enabled=cache_enabled(settings.QUERY_CACHE_ENABLED, settings.QUERY_CACHE_URL),
+)
+metrics.register_gauge("query_cache.size", lambda: len(query_cache.backend))
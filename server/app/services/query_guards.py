@@ -0,0 +1,69 @@
+"""
+Guards against runaway list and search queries
+
+- ``statement_timeout``: per-route ``SET LOCAL statement_timeout`` (Postgres)
+  from STATEMENT_TIMEOUTS_MS; a cancelled statement becomes a 503 and a
+  ``db.statement_timeouts.<route>`` metric instead of a 500; statements
+  cancelled because the client left are not timeouts (see app/cancellation.py)
+- ``escape_like``: user search terms are matched literally, so ``%`` and
+  ``_`` cannot turn a search into an arbitrary pattern
+"""
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.cancellation import query_cancelled
+from app.config import get_settings
+from app.metrics import metrics
+
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+LIKE_ESCAPE = "\\"
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards in a user-supplied term (use with escape=LIKE_ESCAPE)"""
+    return (
+        term.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace("%", LIKE_ESCAPE + "%")
+        .replace("_", LIKE_ESCAPE + "_")
+    )
+
+
+def is_statement_timeout(exc: OperationalError) -> bool:
+    return getattr(exc.orig, "pgcode", None) == QUERY_CANCELED
+
+
+@contextmanager
+def statement_timeout(db: Session, route: str) -> Iterator[None]:
+    """Limit how long the statements run inside the block may take
+
+    The timeout is transaction-local and reset when the block exits. Must be
+    entered where the guarded queries run (inside ``replica_read``
+    functions) so that it is set on the same connection.
+    """
+    timeout_ms = get_settings().STATEMENT_TIMEOUTS_MS.get(route)
+    guarded = bool(timeout_ms) and db.get_bind().dialect.name == "postgresql"
+    if guarded:
+        db.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+
+    try:
+        yield
+    except OperationalError as exc:
+        if not is_statement_timeout(exc) or query_cancelled(db):
+            raise
+        db.rollback()
+        metrics.increment(f"db.statement_timeouts.{route}")
+        raise HTTPException(
+            status_code=503,
+            detail="Query took too long; narrow the search or filters"
+        ) from exc
+
+    if guarded:
+        # Later statements in the same transaction are not guarded
+        db.execute(text("SET LOCAL statement_timeout TO DEFAULT"))
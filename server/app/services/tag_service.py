@@ -1,32 +1,122 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import delete, func, literal, select, text, union_all, update, Select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from app.models.tag import Tag
-from app.models.ticket import ticket_tags
-from app.schemas.tag import TagCreate, TagUpdate, TagWithCount
-from typing import List
+from app.models.ticket import Ticket, ticket_tags, ticket_tags_archive
+from app.schemas.tag import TagBase, TagCreate, TagUpdate, TagUpsertResponse, TagWithCount
+from app.services.query_cache import query_cache
+from app.services.query_guards import LIKE_ESCAPE, escape_like, statement_timeout
+from app.config import settings
+from app.database import replica_read, uses_replicas
+from app.tracing import annotate, traced
+from functools import lru_cache
+from typing import List, Optional
 
 
+@traced
+@replica_read
 def get_tags_with_counts(db: Session) -> List[TagWithCount]:
-    """Get all tags with ticket counts"""
-    tags_with_counts = db.query(
-        Tag,
-        func.count(ticket_tags.c.ticket_id).label('ticket_count')
+    """Get all tags with ticket counts (through the query cache)"""
+    tags = query_cache.get_or_load(
+        "tags", {"replica": uses_replicas(db)}, lambda: _query_tags_with_counts(db)
+    )
+    annotate({"tags.returned": len(tags)})
+    return tags
+
+
+@lru_cache(maxsize=None)
+def _tag_counts_statement() -> Select:
+    """Tag count query; it has no parameters, so it is built once"""
+    # Archived tickets keep their tags, so they still count; soft-deleted
+    # tickets do not
+    usage = union_all(
+        select(ticket_tags.c.tag_id).join(
+            Ticket, Ticket.id == ticket_tags.c.ticket_id
+        ).where(Ticket.deleted_at.is_(None)),
+        select(ticket_tags_archive.c.tag_id)
+    ).subquery()
+
+    return select(
+        Tag.id,
+        Tag.name,
+        Tag.color,
+        func.count(usage.c.tag_id).label('ticket_count')
     ).outerjoin(
-        ticket_tags, Tag.id == ticket_tags.c.tag_id
-    ).group_by(Tag.id).order_by(Tag.name).all()
+        usage, Tag.id == usage.c.tag_id
+    ).group_by(Tag.id).order_by(Tag.name)
+
+
+def _query_tags_with_counts(db: Session) -> List[TagWithCount]:
+    """Count live and archived tickets per tag
+
+    Rows are plain columns rather than Tag entities, which saves the ORM
+    identity-map work per tag.
+    """
+    with statement_timeout(db, "tags_list"):
+        rows = db.execute(_tag_counts_statement()).all()
 
     return [
         TagWithCount(
-            id=tag.id,
-            name=tag.name,
-            color=tag.color,
-            ticket_count=count
+            id=row.id,
+            name=row.name,
+            color=row.color,
+            ticket_count=row.ticket_count
         )
-        for tag, count in tags_with_counts
+        for row in rows
     ]
 
 
+@traced
+@replica_read
+def suggest_tags(db: Session, prefix: str, limit: int) -> List[TagBase]:
+    """
+    Tags whose name starts with a prefix, for autocomplete
+
+    Matches lower(name) through ix_tags_name_lower_prefix. An exact match
+    comes first, then the tags on the most current (not archived) tickets,
+    counted through ix_ticket_tags_tag_id, then by name. Prefixes up to
+    TAG_SUGGEST_CACHE_PREFIX_LENGTH match the most tags and are served from
+    the query cache.
+
+    Args:
+        db: Database session
+        prefix: Name prefix (case-insensitive)
+        limit: Most tags to return
+    """
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    if len(prefix) <= settings.TAG_SUGGEST_CACHE_PREFIX_LENGTH:
+        tags = query_cache.get_or_load(
+            "tag_suggest",
+            {"prefix": prefix, "limit": limit, "replica": uses_replicas(db)},
+            lambda: _query_suggestions(db, prefix, limit)
+        )
+    else:
+        tags = _query_suggestions(db, prefix, limit)
+    annotate({"tags.prefix_length": len(prefix), "tags.returned": len(tags)})
+    return tags
+
+
+def _query_suggestions(db: Session, prefix: str, limit: int) -> List[TagBase]:
+    name = func.lower(Tag.name)
+    usage = select(func.count()).select_from(ticket_tags).where(
+        ticket_tags.c.tag_id == Tag.id
+    ).scalar_subquery()
+
+    query = select(Tag.id, Tag.name, Tag.color).where(
+        name.like(f"{escape_like(prefix)}%", escape=LIKE_ESCAPE)
+    ).order_by((name == prefix).desc(), usage.desc(), name).limit(limit)
+
+    with statement_timeout(db, "tags_suggest"):
+        rows = db.execute(query).all()
+    return [TagBase(id=row.id, name=row.name, color=row.color) for row in rows]
+
+
+@traced
+@replica_read
 def get_tag_by_id(db: Session, tag_id: int) -> Tag:
     """Get a single tag by ID"""
     tag = db.query(Tag).filter(Tag.id == tag_id).first()
@@ -35,6 +125,11 @@ def get_tag_by_id(db: Session, tag_id: int) -> Tag:
     return tag
 
 
+def _duplicate_name(name: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"Tag '{name}' already exists")
+
+
+@traced
 def create_tag(db: Session, tag: TagCreate) -> Tag:
     """Create a new tag"""
     # Check for duplicate name (case-insensitive)
@@ -43,21 +138,109 @@ def create_tag(db: Session, tag: TagCreate) -> Tag:
     ).first()
 
     if existing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Tag '{tag.name}' already exists"
-        )
+        raise _duplicate_name(tag.name)
 
     db_tag = Tag(name=tag.name, color=tag.color)
     db.add(db_tag)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Created by another request since the check (ix_tags_name_lower)
+        db.rollback()
+        raise _duplicate_name(tag.name) from None
+    query_cache.invalidate()
     db.refresh(db_tag)
     return db_tag
 
 
-def update_tag(db: Session, tag_id: int, tag: TagUpdate) -> Tag:
-    """Update a tag"""
-    db_tag = get_tag_by_id(db, tag_id)
+@traced
+def upsert_tags(db: Session, tags: List[TagCreate]) -> TagUpsertResponse:
+    """
+    Create or update tags by name (case-insensitive)
+
+    New names are created; existing tags take the given name (its case may
+    differ) and color, where a missing color keeps the current one. All
+    writes are one INSERT ... ON CONFLICT (lower(name)) DO UPDATE, preceded
+    by one SELECT that tells created, updated and unchanged tags apart. When
+    a name appears more than once the last one wins.
+
+    Args:
+        db: Database session
+        tags: Tags to upsert
+
+    Returns:
+        Tag IDs by outcome, each in request order
+
+    Raises:
+        HTTPException: If no tags or more than TAG_UPSERT_MAX_TAGS are provided
+    """
+    if not tags:
+        raise HTTPException(status_code=400, detail="No tags provided")
+    max_tags = settings.TAG_UPSERT_MAX_TAGS
+    if len(tags) > max_tags:
+        raise HTTPException(status_code=422, detail=f"At most {max_tags} tags per request")
+
+    wanted = {tag.name.lower(): tag for tag in tags}
+    existing = {
+        row.key: row
+        for row in db.execute(
+            select(Tag.id, Tag.name, Tag.color, func.lower(Tag.name).label("key")).where(
+                func.lower(Tag.name).in_(list(wanted))
+            )
+        )
+    }
+
+    unchanged = {
+        key: existing[key].id
+        for key, tag in wanted.items()
+        if key in existing
+        and existing[key].name == tag.name
+        and tag.color in (None, existing[key].color)
+    }
+    changed = [tag for key, tag in wanted.items() if key not in unchanged]
+
+    written = {}
+    if changed:
+        insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(Tag).values([{"name": tag.name, "color": tag.color} for tag in changed])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[func.lower(Tag.name)],
+            set_={
+                "name": stmt.excluded.name,
+                "color": func.coalesce(stmt.excluded.color, Tag.color),
+                "version": Tag.version + 1,
+            }
+        ).returning(Tag.id, func.lower(Tag.name))
+        written = {key: tag_id for tag_id, key in db.execute(stmt)}
+        db.commit()
+        query_cache.invalidate()
+
+    result = TagUpsertResponse(
+        created=[written[key] for key in wanted if key in written and key not in existing],
+        updated=[written[key] for key in wanted if key in written and key in existing],
+        unchanged=[unchanged[key] for key in wanted if key in unchanged]
+    )
+    annotate({
+        "tags.created": len(result.created),
+        "tags.updated": len(result.updated),
+        "tags.unchanged": len(result.unchanged),
+    })
+    return result
+
+
+@traced
+def update_tag(
+    db: Session,
+    tag_id: int,
+    tag: TagUpdate,
+    expected_version: Optional[int] = None
+) -> Tag:
+    """Update a tag
+
+    When expected_version is given the update only applies if the tag still
+    has that version; the check is part of the UPDATE itself.
+    """
+    values = {}
 
     # Check for duplicate name if name is being updated
     if tag.name is not None:
@@ -67,24 +250,120 @@ def update_tag(db: Session, tag_id: int, tag: TagUpdate) -> Tag:
         ).first()
 
         if existing:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Tag '{tag.name}' already exists"
-            )
+            raise _duplicate_name(tag.name)
 
-        db_tag.name = tag.name
+        values[Tag.name] = tag.name
 
     if tag.color is not None:
-        db_tag.color = tag.color
+        values[Tag.color] = tag.color
+
+    stmt = update(Tag).where(Tag.id == tag_id)
+    if expected_version is not None:
+        stmt = stmt.where(Tag.version == expected_version)
+
+    try:
+        result = db.execute(
+            stmt.values({**values, Tag.version: Tag.version + 1}),
+            execution_options={"synchronize_session": False}
+        )
+    except IntegrityError:
+        # The name was taken by another request since the check
+        db.rollback()
+        raise _duplicate_name(tag.name) from None
+    if result.rowcount == 0:
+        db.rollback()
+        get_tag_by_id(db, tag_id)
+        raise HTTPException(
+            status_code=412,
+            detail="Tag was modified by another request; reload and retry"
+        )
 
     db.commit()
-    db.refresh(db_tag)
-    return db_tag
+    query_cache.invalidate()
+    return get_tag_by_id(db, tag_id)
 
 
+@traced
 def delete_tag(db: Session, tag_id: int) -> None:
-    """Delete a tag"""
-    db_tag = get_tag_by_id(db, tag_id)
+    """Delete a tag
 
-    db.delete(db_tag)
+    Set-based: one DELETE of the tag, whose ON DELETE CASCADE removes its
+    associations without loading any tagged ticket.
+    """
+    get_tag_by_id(db, tag_id)
+
+    _log_per_tag(db)
+    _delete_tag(db, tag_id)
     db.commit()
+    query_cache.invalidate()
+
+
+@traced
+def merge_tag(db: Session, tag_id: int, target_id: int) -> Tag:
+    """
+    Merge a tag into another one
+
+    Every live and archived ticket tagged with the source tag gets the target
+    tag instead (tickets that already have both keep one), then the source tag
+    is deleted. Runs as a few set-based statements in one transaction.
+
+    Args:
+        db: Database session
+        tag_id: Tag to merge and delete
+        target_id: Tag that takes over its tickets
+
+    Returns:
+        The target tag
+
+    Raises:
+        HTTPException: If either tag does not exist or both are the same tag
+    """
+    if tag_id == target_id:
+        raise HTTPException(status_code=400, detail="Cannot merge a tag into itself")
+
+    found = set(db.execute(select(Tag.id).where(Tag.id.in_([tag_id, target_id]))).scalars())
+    missing = [str(id_) for id_ in (tag_id, target_id) if id_ not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tags not found: {', '.join(missing)}")
+
+    _log_per_tag(db, merged_into_id=target_id)
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    for table in (ticket_tags, ticket_tags_archive):
+        db.execute(
+            insert(table).from_select(
+                ["ticket_id", "tag_id", "created_at"],
+                select(table.c.ticket_id, literal(target_id), table.c.created_at).where(
+                    table.c.tag_id == tag_id
+                )
+            ).on_conflict_do_nothing()
+        )
+    _delete_tag(db, tag_id)
+
+    db.commit()
+    query_cache.invalidate()
+    return get_tag_by_id(db, target_id)
+
+
+def _log_per_tag(db: Session, merged_into_id: Optional[int] = None) -> None:
+    """Report this transaction's tag delete or merge once, on the tag's tombstone
+
+    Without it the ticket_tags triggers would bump every ticket that carried
+    the tag, which can be most of the table.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    db.execute(text("SET LOCAL pmanager.retagging = 'on'"))
+    if merged_into_id is not None:
+        db.execute(select(func.set_config("pmanager.merge_target", str(merged_into_id), True)))
+
+
+def _delete_tag(db: Session, tag_id: int) -> None:
+    """Delete a tag and its associations without loading them"""
+    if db.get_bind().dialect.name != "postgresql":
+        # SQLite only enforces foreign keys (and their cascades) when asked to
+        for table in (ticket_tags, ticket_tags_archive):
+            db.execute(delete(table).where(table.c.tag_id == tag_id))
+    db.execute(
+        delete(Tag).where(Tag.id == tag_id),
+        execution_options={"synchronize_session": False}
+    )
@@ -1,12 +1,24 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+import heapq
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import or_, and_, not_, bindparam, func, select, update, Select
 from fastapi import HTTPException
-from app.models.ticket import Ticket
-from app.models.tag import Tag
-from app.schemas.ticket import TicketCreate, TicketUpdate
-from typing import List, Optional
-
-
+from app.models.ticket import (
+    Ticket, TicketTombstone, ArchivedTicket, ticket_tags, ticket_tags_archive
+)
+from app.models.tag import Tag, TagTombstone
+from app.schemas.ticket import DeletedTag, TicketCreate, TicketUpdate, TicketResponse
+from app.services.query_cache import query_cache
+from app.services.query_guards import LIKE_ESCAPE, escape_like, statement_timeout
+from app.config import settings
+from app.database import replica_read, uses_replicas
+from app.tracing import annotate, search_shape, traced
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+@traced
 def parse_tag_filter(db: Session, tags_str: str) -> List[int]:
     """Parse tag filter string into list of tag IDs
 
@@ -46,46 +58,369 @@ def parse_tag_filter(db: Session, tags_str: str) -> List[int]:
     return list(set(tag_ids)) if tag_ids else []
 
 
+@traced
+@replica_read
 def get_tickets(
     db: Session,
     search: Optional[str] = None,
     tag_ids: Optional[List[int]] = None,
-    status: str = "all"
-) -> List[Ticket]:
-    """Get tickets with filters"""
-    query = db.query(Ticket)
+    status: str = "all",
+    limit: Optional[int] = None
+) -> Tuple[List[TicketResponse], bool]:
+    """Get tickets with filters
 
-    # Apply status filter
-    if status == "open":
-        query = query.filter(Ticket.is_completed == False)
-    elif status == "completed":
-        query = query.filter(Ticket.is_completed == True)
+    Results are served from the query cache, keyed by the normalized filter
+    and invalidated by every ticket/tag write.
 
-    # Apply search filter
+    At most ``limit`` tickets (never more than TICKET_LIST_MAX_RESULTS) are
+    returned, newest first.
+
+    Returns:
+        The tickets and whether more tickets matched than were returned
+
+    Raises:
+        HTTPException: If limit exceeds TICKET_LIST_MAX_RESULTS
+    """
+    max_results = settings.TICKET_LIST_MAX_RESULTS
+    if limit is not None and limit > max_results:
+        raise HTTPException(status_code=422, detail=f"limit must be at most {max_results}")
+
+    search = search.strip() if search else None
+    annotate({
+        "tickets.filter.status": status or "all",
+        "tickets.filter.tags": len(tag_ids) if tag_ids else 0,
+        "tickets.limit": limit,
+        **search_shape(search, settings.SEARCH_MIN_LENGTH),
+    })
+    params = {
+        "status": status or "all",
+        "search": search.lower() if search else None,
+        "tag_ids": tuple(sorted(set(tag_ids))) if tag_ids else None,
+        "limit": limit or max_results,
+        # Replica results may lag; never serve them to read-your-writes clients
+        "replica": uses_replicas(db),
+    }
+    tickets, truncated = query_cache.get_or_load(
+        "tickets",
+        params,
+        lambda: _query_tickets(
+            db, params["search"], params["tag_ids"], params["status"], params["limit"]
+        )
+    )
+    annotate({"tickets.returned": len(tickets), "tickets.truncated": truncated})
+    return tickets, truncated
+
+
+def _query_tickets(
+    db: Session,
+    search: Optional[str],
+    tag_ids: Optional[tuple],
+    status: str,
+    limit: int
+) -> Tuple[List[TicketResponse], bool]:
+    """Run the ticket list query and serialize the rows
+
+    Archived tickets are all completed, so the archive is only read for
+    status "completed" and "all"; both sources are ordered by updated_at
+    and merged. One row more than the limit is read to detect truncation.
+    """
+    status = _status_filter(status)
+    shape = (status, _search_mode(search), bool(tag_ids))
+    values = {**_list_filter_values(search, tag_ids), "limit": limit + 1}
+    with statement_timeout(db, "tickets_search" if search else "tickets_list"):
+        tickets = db.execute(_list_statement(Ticket, *shape), values).scalars().all()
+
+        if status in ("completed", "all"):
+            archived = db.execute(
+                _list_statement(ArchivedTicket, *shape), values
+            ).scalars().all()
+            if archived:
+                tickets = list(heapq.merge(
+                    tickets, archived, key=lambda ticket: ticket.updated_at, reverse=True
+                ))
+
+    truncated = len(tickets) > limit
+    return [TicketResponse.model_validate(ticket) for ticket in tickets[:limit]], truncated
+
+
+def _status_filter(status: Optional[str]) -> str:
+    return status if status in ("open", "completed") else "all"
+
+
+def _search_mode(search: Optional[str]) -> Optional[str]:
+    if not search:
+        return None
+    return "prefix" if len(search) < settings.SEARCH_MIN_LENGTH else "contains"
+
+
+def _list_filter_values(
+    search: Optional[str], tag_ids: Optional[Sequence[int]]
+) -> Dict[str, Any]:
+    """Bound parameter values of the statements built by _apply_list_filters"""
+    values: Dict[str, Any] = {}
     if search:
-        query = query.filter(
+        pattern = escape_like(search)
+        if _search_mode(search) == "prefix":
+            values["prefix"] = f"{pattern.lower()}%"
+        else:
+            values["pattern"] = f"%{pattern}%"
+    if tag_ids:
+        values["tag_ids"] = list(tag_ids)
+    return values
+
+
+@lru_cache(maxsize=None)
+def _list_statement(
+    model,
+    status: str,
+    search_mode: Optional[str],
+    filter_tags: bool
+) -> Select:
+    """Ticket list query for live or archived tickets, built once per filter shape
+
+    Filter values and the limit are bound at execution (_list_filter_values
+    and "limit"), so each combination of filters is one statement object
+    whose SQL compilation SQLAlchemy caches.
+    """
+    query = _apply_list_filters(
+        select(model).options(selectinload(model.tags)), model, status, search_mode, filter_tags
+    )
+    # Newest first; one extra row tells whether the result was truncated
+    return query.order_by(model.updated_at.desc()).limit(bindparam("limit"))
+
+
+def _apply_list_filters(
+    query: Select,
+    model,
+    status: str,
+    search_mode: Optional[str],
+    filter_tags: bool
+) -> Select:
+    """Apply the list filters to a query of live or archived tickets
+
+    Filter values are left as bound parameters (see _list_filter_values).
+    """
+    if model is Ticket:
+        query = query.where(Ticket.deleted_at.is_(None))
+        # Apply status filter (archived tickets are all completed)
+        if status == "open":
+            query = query.where(Ticket.is_completed == False)
+        elif status == "completed":
+            query = query.where(Ticket.is_completed == True)
+
+    # Apply search filter
+    if search_mode == "prefix":
+        # Too short for a substring scan to be useful (or cheap): match
+        # title prefixes instead, served by ix_tickets_title_lower_prefix
+        query = query.where(
+            func.lower(model.title).like(bindparam("prefix"), escape=LIKE_ESCAPE)
+        )
+    elif search_mode == "contains":
+        pattern = bindparam("pattern")
+        query = query.where(
             or_(
-                Ticket.title.ilike(f"%{search}%"),
-                Ticket.description.ilike(f"%{search}%")
+                model.title.ilike(pattern, escape=LIKE_ESCAPE),
+                model.description.ilike(pattern, escape=LIKE_ESCAPE)
             )
         )
 
-    # Apply tag filter (OR logic - tickets with any of the specified tags)
-    if tag_ids:
-        query = query.join(Ticket.tags).filter(Tag.id.in_(tag_ids)).distinct()
+    # Apply tag filter (OR logic - tickets with any of the specified tags);
+    # a semi-join, so no DISTINCT over the ticket rows is needed
+    if filter_tags:
+        links = ticket_tags if model is Ticket else ticket_tags_archive
+        tag_ids = bindparam("tag_ids", expanding=True)
+        query = query.where(
+            model.id.in_(select(links.c.ticket_id).where(links.c.tag_id.in_(tag_ids)))
+        )
+
+    return query
+
+
+def parse_sync_token(token: Optional[str]) -> int:
+    """Parse a sync token from get_changes (empty means full sync)"""
+    if not token:
+        return 0
+    if not token.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return int(token)
+
+
+@traced
+def get_changes(
+    db: Session, since: int
+) -> Tuple[List[TicketResponse], List[int], List[DeletedTag], str]:
+    """
+    Get tickets created/updated and IDs deleted since a sync token
+
+    Tokens are transaction IDs rather than timestamps, so they are monotonic
+    and immune to clock skew. The next token is the xmin of the current
+    snapshot: every transaction below it has finished, so no change can be
+    missed. Rows written by transactions at or above it may be returned
+    again on the next sync; clients apply changes idempotently.
+
+    Deleting or merging a tag leaves its tickets' rows alone (that can be
+    most of the table); the tag's tombstone reports it instead, and clients
+    remove or replace the tag on their copies.
+
+    Args:
+        db: Database session
+        since: Token returned by the previous call (0 for a full sync)
+
+    Returns:
+        Changed tickets, deleted ticket IDs, deleted tags and the next token
 
-    # Order by updated_at desc
-    return query.order_by(Ticket.updated_at.desc()).all()
+    Raises:
+        HTTPException: If the database does not support change tracking
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        raise HTTPException(status_code=501, detail="Change tracking requires PostgreSQL")
+
+    # Taken before reading the rows, so the rows are at least as new
+    next_token = db.execute(
+        select(func.pg_snapshot_xmin(func.pg_current_snapshot()))
+    ).scalar_one()
+
+    with statement_timeout(db, "tickets_changes"):
+        changed = db.query(Ticket).options(selectinload(Ticket.tags)).filter(
+            Ticket.change_xid >= since
+        ).order_by(Ticket.change_xid, Ticket.id).all()
+
+        # Soft-deleted rows are tombstones until the purger removes them; after
+        # that the deletion log (filled on hard delete) reports them
+        tickets = [ticket for ticket in changed if ticket.deleted_at is None]
+        deleted_ids = []
+        deleted_tags = []
+        if since:
+            deleted_ids = [ticket.id for ticket in changed if ticket.deleted_at is not None]
+            deleted_ids.extend(
+                row.ticket_id
+                for row in db.query(TicketTombstone.ticket_id).filter(
+                    TicketTombstone.deleted_xid >= since
+                ).order_by(TicketTombstone.deleted_xid)
+            )
+            deleted_tags = [
+                DeletedTag(id=row.tag_id, merged_into_id=row.merged_into_id)
+                for row in db.query(TagTombstone).filter(
+                    TagTombstone.deleted_xid >= since
+                ).order_by(TagTombstone.deleted_xid)
+            ]
+
+    return (
+        [TicketResponse.model_validate(ticket) for ticket in tickets],
+        deleted_ids,
+        deleted_tags,
+        str(next_token)
+    )
 
 
+@traced
+@replica_read
 def get_ticket_by_id(db: Session, ticket_id: int) -> Ticket:
     """Get a single ticket by ID"""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    ticket = db.execute(_ticket_by_id_statement(), {"ticket_id": ticket_id}).scalars().first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     return ticket
 
 
+@lru_cache(maxsize=None)
+def _ticket_by_id_statement() -> Select:
+    """Single ticket query; the ID is bound at execution, so it is built once"""
+    return select(Ticket).options(selectinload(Ticket.tags)).where(
+        Ticket.id == bindparam("ticket_id"),
+        Ticket.deleted_at.is_(None)
+    )
+
+
+@traced
+@replica_read
+def get_tickets_by_ids(
+    db: Session, ticket_ids: List[int]
+) -> Tuple[List[TicketResponse], List[int]]:
+    """
+    Get several tickets by ID
+
+    One query for the tickets and one for their tags, however many IDs are
+    asked for. Like get_ticket_by_id, deleted and archived tickets are not
+    found.
+
+    Args:
+        db: Database session
+        ticket_ids: Ticket IDs; duplicates are returned once
+
+    Returns:
+        The tickets in request order and the IDs that were not found
+
+    Raises:
+        HTTPException: If no IDs or more than BATCH_GET_MAX_IDS are provided
+    """
+    if not ticket_ids:
+        raise HTTPException(status_code=400, detail="No ticket IDs provided")
+    max_ids = settings.BATCH_GET_MAX_IDS
+    if len(ticket_ids) > max_ids:
+        raise HTTPException(status_code=422, detail=f"At most {max_ids} ticket IDs per request")
+
+    requested = list(dict.fromkeys(ticket_ids))
+    found = _load_live_tickets(db, requested)
+
+    tickets = [
+        TicketResponse.model_validate(found[ticket_id])
+        for ticket_id in requested
+        if ticket_id in found
+    ]
+    missing_ids = [ticket_id for ticket_id in requested if ticket_id not in found]
+    annotate({"tickets.requested": len(requested), "tickets.missing": len(missing_ids)})
+    return tickets, missing_ids
+
+
+@traced
+def load_tickets(db: Session, ticket_ids: List[int]) -> List[TicketResponse]:
+    """Live tickets with their tags, in the given order (missing IDs skipped)
+
+    Reads from the primary, so it sees the session's own writes; used to
+    return the tickets a batch operation just changed.
+    """
+    found = _load_live_tickets(db, ticket_ids)
+    return [
+        TicketResponse.model_validate(found[ticket_id])
+        for ticket_id in ticket_ids
+        if ticket_id in found
+    ]
+
+
+def _load_live_tickets(db: Session, ticket_ids: List[int]) -> Dict[int, Ticket]:
+    """One query for the tickets and one for all of their tags
+
+    selectinload would split the tags into one query per 500 tickets; the
+    links are read in one join instead and set on each ticket's tags.
+    """
+    tickets = {
+        ticket.id: ticket
+        for ticket in db.execute(
+            select(Ticket).where(
+                Ticket.id.in_(ticket_ids),
+                Ticket.deleted_at.is_(None)
+            )
+        ).scalars()
+    }
+    if not tickets:
+        return tickets
+
+    tags_by_ticket: Dict[int, List[Tag]] = {ticket_id: [] for ticket_id in tickets}
+    links = db.execute(
+        select(ticket_tags.c.ticket_id, Tag)
+        .join(Tag, Tag.id == ticket_tags.c.tag_id)
+        .where(ticket_tags.c.ticket_id.in_(list(tickets)))
+    )
+    for ticket_id, tag in links:
+        tags_by_ticket[ticket_id].append(tag)
+    # As loaded from the database: not a change to flush
+    for ticket_id, ticket in tickets.items():
+        set_committed_value(ticket, "tags", tags_by_ticket[ticket_id])
+    return tickets
+
+
+@traced
 def create_ticket(db: Session, ticket: TicketCreate) -> Ticket:
     """Create a new ticket"""
     db_ticket = Ticket(
@@ -100,44 +435,163 @@ def create_ticket(db: Session, ticket: TicketCreate) -> Ticket:
 
     db.add(db_ticket)
     db.commit()
+    query_cache.invalidate()
     db.refresh(db_ticket)
     return db_ticket
 
 
-def update_ticket(db: Session, ticket_id: int, ticket: TicketUpdate) -> Ticket:
-    """Update a ticket"""
-    db_ticket = get_ticket_by_id(db, ticket_id)
+def _conditional_update(
+    db: Session,
+    ticket_id: int,
+    values: dict,
+    expected_version: Optional[int] = None
+) -> Ticket:
+    """
+    Apply values with a single UPDATE, optionally guarded by version
+
+    The version check happens inside the UPDATE's WHERE clause, so no row
+    is read or locked beforehand. Zero affected rows means the ticket is
+    either gone (404) or was changed by someone else (412).
+    """
+    stmt = update(Ticket).where(Ticket.id == ticket_id, Ticket.deleted_at.is_(None))
+    if expected_version is not None:
+        stmt = stmt.where(Ticket.version == expected_version)
+
+    result = db.execute(
+        stmt.values({**values, Ticket.version: Ticket.version + 1}),
+        execution_options={"synchronize_session": False}
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        get_ticket_by_id(db, ticket_id)
+        raise HTTPException(
+            status_code=412,
+            detail="Ticket was modified by another request; reload and retry"
+        )
 
+    db.commit()
+    query_cache.invalidate()
+    return get_ticket_by_id(db, ticket_id)
+
+
+@traced
+def update_ticket(
+    db: Session,
+    ticket_id: int,
+    ticket: TicketUpdate,
+    expected_version: Optional[int] = None
+) -> Ticket:
+    """Update a ticket
+
+    When expected_version is given the update only applies if the ticket
+    still has that version (optimistic concurrency).
+    """
+    values = {}
     if ticket.title is not None:
-        db_ticket.title = ticket.title
+        values[Ticket.title] = ticket.title
     if ticket.description is not None:
-        db_ticket.description = ticket.description
+        values[Ticket.description] = ticket.description
     if ticket.is_completed is not None:
-        db_ticket.is_completed = ticket.is_completed
+        values[Ticket.is_completed] = ticket.is_completed
+
+    if not values:
+        db_ticket = get_ticket_by_id(db, ticket_id)
+        if expected_version is not None and db_ticket.version != expected_version:
+            raise HTTPException(
+                status_code=412,
+                detail="Ticket was modified by another request; reload and retry"
+            )
+        return db_ticket
 
-    db.commit()
-    db.refresh(db_ticket)
-    return db_ticket
+    return _conditional_update(db, ticket_id, values, expected_version)
 
 
-def delete_ticket(db: Session, ticket_id: int) -> None:
-    """Delete a ticket"""
-    db_ticket = get_ticket_by_id(db, ticket_id)
+@traced
+def delete_ticket(db: Session, ticket_id: int, expected_version: Optional[int] = None) -> None:
+    """Delete a ticket
+
+    Soft delete: the row is only marked, so the request does not pay for
+    cascading association deletes. The purger removes it after the
+    retention window, until then it can be restored. With expected_version
+    the delete is guarded like _conditional_update (412 on a mismatch).
+    """
+    stmt = update(Ticket).where(Ticket.id == ticket_id, Ticket.deleted_at.is_(None))
+    if expected_version is not None:
+        stmt = stmt.where(Ticket.version == expected_version)
+
+    result = db.execute(
+        stmt.values({
+            Ticket.deleted_at: func.now(),
+            Ticket.version: Ticket.version + 1
+        }),
+        execution_options={"synchronize_session": False}
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        if expected_version is None:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        get_ticket_by_id(db, ticket_id)
+        raise HTTPException(
+            status_code=412,
+            detail="Ticket was modified by another request; reload and retry"
+        )
 
-    db.delete(db_ticket)
     db.commit()
+    query_cache.invalidate()
 
 
-def toggle_complete(db: Session, ticket_id: int) -> Ticket:
-    """Toggle ticket completion status"""
-    db_ticket = get_ticket_by_id(db, ticket_id)
+@traced
+def restore_ticket(db: Session, ticket_id: int) -> Ticket:
+    """
+    Undo a delete within the retention window
+
+    Args:
+        db: Database session
+        ticket_id: ID of the deleted ticket
+
+    Returns:
+        Restored ticket
+
+    Raises:
+        HTTPException: If the ticket is not deleted or can no longer be restored
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.SOFT_DELETE_RETENTION_SECONDS)
+    result = db.execute(
+        update(Ticket).where(
+            Ticket.id == ticket_id,
+            Ticket.deleted_at.isnot(None),
+            Ticket.deleted_at >= cutoff
+        ).values({
+            Ticket.deleted_at: None,
+            Ticket.version: Ticket.version + 1
+        }),
+        execution_options={"synchronize_session": False}
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="No restorable deleted ticket found")
 
-    db_ticket.is_completed = not db_ticket.is_completed
     db.commit()
-    db.refresh(db_ticket)
-    return db_ticket
+    query_cache.invalidate()
+    return get_ticket_by_id(db, ticket_id)
 
 
+@traced
+def toggle_complete(
+    db: Session,
+    ticket_id: int,
+    expected_version: Optional[int] = None
+) -> Ticket:
+    """Toggle ticket completion status"""
+    return _conditional_update(
+        db,
+        ticket_id,
+        {Ticket.is_completed: not_(func.coalesce(Ticket.is_completed, False))},
+        expected_version
+    )
+
+
+@traced
 def add_tags(db: Session, ticket_id: int, tag_ids: List[int]) -> Ticket:
     """
     Add tags to a ticket
@@ -183,10 +637,12 @@ def add_tags(db: Session, ticket_id: int, tag_ids: List[int]) -> Ticket:
         return db_ticket
 
     db.commit()
+    query_cache.invalidate()
     db.refresh(db_ticket)
     return db_ticket
 
 
+@traced
 def remove_tag(db: Session, ticket_id: int, tag_id: int) -> Ticket:
     """
     Remove a tag from a ticket
@@ -219,11 +675,13 @@ def remove_tag(db: Session, ticket_id: int, tag_id: int) -> Ticket:
     # Remove the tag
     db_ticket.tags.remove(tag)
     db.commit()
+    query_cache.invalidate()
     db.refresh(db_ticket)
     return db_ticket
 
 
-def batch_update_status(db: Session, ticket_ids: List[int], is_completed: bool) -> int:
+@traced
+def batch_update_status(db: Session, ticket_ids: List[int], is_completed: bool) -> List[int]:
     """
     Batch update ticket completion status
 
@@ -233,7 +691,7 @@ def batch_update_status(db: Session, ticket_ids: List[int], is_completed: bool)
         is_completed: New completion status
 
     Returns:
-        Number of tickets updated
+        IDs of the tickets updated (from UPDATE ... RETURNING)
 
     Raises:
         HTTPException: If no valid ticket IDs provided
@@ -242,16 +700,24 @@ def batch_update_status(db: Session, ticket_ids: List[int], is_completed: bool)
         raise HTTPException(status_code=400, detail="No ticket IDs provided")
 
     # Update all tickets with the given IDs
-    result = db.query(Ticket).filter(Ticket.id.in_(ticket_ids)).update(
-        {Ticket.is_completed: is_completed},
-        synchronize_session=False
-    )
+    updated_ids = list(db.execute(
+        update(Ticket).where(
+            Ticket.id.in_(ticket_ids),
+            Ticket.deleted_at.is_(None)
+        ).values(
+            {Ticket.is_completed: is_completed, Ticket.version: Ticket.version + 1}
+        ).returning(Ticket.id),
+        execution_options={"synchronize_session": False}
+    ).scalars())
 
     db.commit()
-    return result
+    query_cache.invalidate()
+    annotate({"tickets.requested": len(ticket_ids), "tickets.updated": len(updated_ids)})
+    return updated_ids
 
 
-def batch_delete(db: Session, ticket_ids: List[int]) -> int:
+@traced
+def batch_delete(db: Session, ticket_ids: List[int]) -> List[int]:
     """
     Batch delete tickets
 
@@ -260,7 +726,7 @@ def batch_delete(db: Session, ticket_ids: List[int]) -> int:
         ticket_ids: List of ticket IDs to delete
 
     Returns:
-        Number of tickets deleted
+        IDs of the tickets deleted (from UPDATE ... RETURNING)
 
     Raises:
         HTTPException: If no valid ticket IDs provided
@@ -268,10 +734,113 @@ def batch_delete(db: Session, ticket_ids: List[int]) -> int:
     if not ticket_ids:
         raise HTTPException(status_code=400, detail="No ticket IDs provided")
 
-    # Delete all tickets with the given IDs
-    result = db.query(Ticket).filter(Ticket.id.in_(ticket_ids)).delete(
-        synchronize_session=False
-    )
+    # Soft delete all tickets with the given IDs (see delete_ticket)
+    deleted_ids = list(db.execute(
+        update(Ticket).where(
+            Ticket.id.in_(ticket_ids),
+            Ticket.deleted_at.is_(None)
+        ).values(
+            {Ticket.deleted_at: func.now(), Ticket.version: Ticket.version + 1}
+        ).returning(Ticket.id),
+        execution_options={"synchronize_session": False}
+    ).scalars())
 
     db.commit()
-    return result
+    query_cache.invalidate()
+    annotate({"tickets.requested": len(ticket_ids), "tickets.deleted": len(deleted_ids)})
+    return deleted_ids
+
+
+@traced
+def match_ticket_ids(
+    db: Session,
+    search: Optional[str] = None,
+    tag_ids: Optional[List[int]] = None,
+    status: str = "all"
+) -> List[int]:
+    """
+    IDs of the live tickets matching list filters (for batch writes)
+
+    Matches like get_tickets, without the result limit. Archived tickets are
+    not included. Reads from the primary since the IDs are about to be
+    written.
+
+    Args:
+        db: Database session
+        search: Search term
+        tag_ids: Tag IDs (any of them)
+        status: all, open or completed
+
+    Returns:
+        Matching ticket IDs in ascending order
+    """
+    search = search.strip() if search else None
+    annotate({
+        "tickets.filter.status": status,
+        "tickets.filter.tags": len(tag_ids) if tag_ids else 0,
+        **search_shape(search, settings.SEARCH_MIN_LENGTH),
+    })
+    statement = _match_statement(_status_filter(status), _search_mode(search), bool(tag_ids))
+
+    with statement_timeout(db, "tickets_search" if search else "tickets_list"):
+        return list(db.execute(statement, _list_filter_values(search, tag_ids)).scalars())
+
+
+@lru_cache(maxsize=None)
+def _match_statement(status: str, search_mode: Optional[str], filter_tags: bool) -> Select:
+    """IDs query of match_ticket_ids, built once per filter shape"""
+    query = _apply_list_filters(select(Ticket.id), Ticket, status, search_mode, filter_tags)
+    return query.order_by(Ticket.id)
+
+
+@traced
+def batch_update(db: Session, ticket_ids: List[int], patch: TicketUpdate) -> List[int]:
+    """
+    Apply the same field changes to many tickets
+
+    Runs one UPDATE per BATCH_UPDATE_CHUNK_SIZE tickets, each in its own
+    transaction so no lock is held for long; a failure leaves the earlier
+    chunks applied. updated_at is set by the update (and the Postgres
+    trigger) as for single updates, and each ticket's version is bumped.
+
+    Args:
+        db: Database session
+        ticket_ids: IDs of the tickets to update
+        patch: Fields to set; unset fields are left alone
+
+    Returns:
+        IDs of the tickets updated, ascending
+
+    Raises:
+        HTTPException: If no ticket IDs or no fields are provided, or a
+            required field is set to null
+    """
+    if not ticket_ids:
+        raise HTTPException(status_code=400, detail="No ticket IDs provided")
+
+    values = {
+        getattr(Ticket, field): value
+        for field, value in patch.model_dump(exclude_unset=True).items()
+    }
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    if values.get(Ticket.title, "") is None or values.get(Ticket.is_completed, False) is None:
+        raise HTTPException(status_code=422, detail="title and isCompleted cannot be null")
+
+    ticket_ids = sorted(set(ticket_ids))
+    chunk_size = settings.BATCH_UPDATE_CHUNK_SIZE
+    updated_ids: List[int] = []
+    for start in range(0, len(ticket_ids), chunk_size):
+        updated_ids.extend(db.execute(
+            update(Ticket).where(
+                Ticket.id.in_(ticket_ids[start:start + chunk_size]),
+                Ticket.deleted_at.is_(None)
+            ).values({**values, Ticket.version: Ticket.version + 1}).returning(Ticket.id),
+            execution_options={"synchronize_session": False}
+        ).scalars())
+        db.commit()
+        # Committed chunks stay applied if a later one fails
+        query_cache.invalidate()
+
+    annotate({"tickets.requested": len(ticket_ids), "tickets.updated": len(updated_ids)})
+    return sorted(updated_ids)
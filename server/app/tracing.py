@@ -0,0 +1,239 @@
+"""
+Request tracing (OpenTelemetry)
+
+One trace per request, with spans for:
+- the request, its dependencies, the endpoint and response serialization
+  (FastAPI's built-in telemetry), continuing the caller's trace from a W3C
+  ``traceparent`` header
+- the service functions marked with ``@traced``
+- every SQL statement, with the number of rows returned or affected
+
+Off unless TRACING_ENABLED; it then needs ``opentelemetry-sdk``, plus
+``opentelemetry-exporter-otlp-proto-http`` for the ``otlp`` exporter.
+OpenTelemetry is only imported once tracing is enabled.
+
+- Sampling: TRACING_SAMPLE_RATIO of new traces; requests with a
+  ``traceparent`` follow the caller's decision
+- Exporters: ``otlp`` (OTLP/HTTP to TRACING_OTLP_ENDPOINT, e.g. a local
+  collector) or ``file`` (one JSON span per line in TRACING_FILE_PATH)
+
+Search text never ends up in a span: statements are recorded with their
+placeholders, filters only by their shape (search length and mode, number
+of tags) and the ``search`` query parameter is redacted from request spans.
+"""
+import os
+from functools import wraps
+from typing import IO, TYPE_CHECKING, Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import Settings
+
+if TYPE_CHECKING:
+    from opentelemetry.trace import Tracer
+
+# Query parameters whose values are replaced in request spans
+REDACTED_QUERY_PARAMETERS = {"search"}
+
+# Tracer of the configured provider; None while tracing is off
+_tracer: Optional["Tracer"] = None
+_sql_hooks_installed = False
+
+
+def traced(func):
+    """Trace calls of a service function as ``<module>.<function>``"""
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _tracer is None:
+            return func(*args, **kwargs)
+
+        with _tracer.start_as_current_span(
+            name, record_exception=False, set_status_on_exception=False
+        ) as span:
+            try:
+                return func(*args, **kwargs)
+            except HTTPException as exc:
+                span.set_attribute("http.response.status_code", exc.status_code)
+                raise
+            except Exception as exc:
+                from opentelemetry.trace import StatusCode
+
+                span.set_attribute("error.type", type(exc).__qualname__)
+                span.set_status(StatusCode.ERROR)
+                raise
+
+    return wrapper
+
+
+def annotate(attributes: Dict[str, Any]) -> None:
+    """Set attributes on the current span (None values are left out)"""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attributes({key: value for key, value in attributes.items() if value is not None})
+
+
+def search_shape(search: Optional[str], min_length: int) -> Dict[str, Any]:
+    """Span attributes describing a search term without its text"""
+    if not search:
+        return {}
+    return {
+        "search.length": len(search),
+        "search.mode": "prefix" if len(search) < min_length else "contains",
+    }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _tracer is None or context is None:
+        return
+    from opentelemetry.trace import SpanKind
+
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    attributes = {
+        "db.system.name": conn.dialect.name,
+        "db.operation.name": operation,
+        # Parameters (search terms included) are never recorded
+        "db.query.text": statement,
+    }
+    if executemany:
+        attributes["db.operation.batch.size"] = len(parameters)
+    context._trace_span = _tracer.start_span(
+        f"db {operation}", kind=SpanKind.CLIENT, attributes=attributes
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is None:
+        return
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        returns_rows = cursor.description is not None
+        span.set_attribute(
+            "db.response.returned_rows" if returns_rows else "db.response.affected_rows",
+            cursor.rowcount,
+        )
+    span.end()
+    context._trace_span = None
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is None:
+        return
+    from opentelemetry.trace import StatusCode
+
+    span.set_attribute("error.type", type(exception_context.original_exception).__qualname__)
+    span.set_status(StatusCode.ERROR)
+    span.end()
+    exception_context.execution_context._trace_span = None
+
+
+def _install_sql_hooks() -> None:
+    global _sql_hooks_installed
+    if _sql_hooks_installed:
+        return
+    # On the Engine class: applies to the primary, replicas and test engines
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _sql_hooks_installed = True
+
+
+def redact_query(query: str) -> str:
+    return urlencode([
+        (key, "REDACTED" if key in REDACTED_QUERY_PARAMETERS else value)
+        for key, value in parse_qsl(query, keep_blank_values=True)
+    ])
+
+
+def _build_exporter(settings: Settings, trace_file: Optional[IO[str]]):
+    if settings.TRACING_EXPORTER == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter(
+            service_name=settings.TRACING_SERVICE_NAME,
+            out=trace_file,
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+    if settings.TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError as exc:
+            raise RuntimeError(
+                "TRACING_EXPORTER=otlp needs the 'opentelemetry-exporter-otlp-proto-http' package"
+            ) from exc
+        return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    raise RuntimeError(
+        f"Unknown TRACING_EXPORTER {settings.TRACING_EXPORTER!r} (use 'otlp' or 'file')"
+    )
+
+
+def build_tracer_provider(settings: Settings):
+    """SDK tracer provider with the configured sampler and exporter
+
+    The ``file`` exporter's file is kept as the provider's ``trace_file``
+    (None for other exporters); shutdown_tracer_provider() closes it.
+    """
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError as exc:
+        raise RuntimeError(
+            "TRACING_ENABLED is set but the 'opentelemetry-sdk' package is not installed"
+        ) from exc
+
+    class RedactQuery(SpanProcessor):
+        """Replaces search text in the request span's url.query"""
+
+        def on_start(self, span, parent_context=None):
+            query = span.attributes.get("url.query") if span.attributes else None
+            if query:
+                span.set_attribute("url.query", redact_query(query))
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+        shutdown_on_exit=False,
+    )
+    provider.trace_file = (
+        open(settings.TRACING_FILE_PATH, "a", encoding="utf-8")
+        if settings.TRACING_EXPORTER == "file"
+        else None
+    )
+    provider.add_span_processor(RedactQuery())
+    provider.add_span_processor(BatchSpanProcessor(_build_exporter(settings, provider.trace_file)))
+    return provider
+
+
+def shutdown_tracer_provider(provider) -> None:
+    """Export the spans still buffered, then close the trace file"""
+    provider.shutdown()
+    if provider.trace_file is not None:
+        provider.trace_file.close()
+
+
+def configure_tracing(settings: Settings):
+    """Set up tracing for an application; returns its tracer provider (None when off)
+
+    The service and SQL spans go to the provider of the application created
+    last (there is one per worker).
+    """
+    global _tracer
+    if not settings.TRACING_ENABLED:
+        _tracer = None
+        return None
+
+    provider = build_tracer_provider(settings)
+    _install_sql_hooks()
+    _tracer = provider.get_tracer(__name__)
+    return provider
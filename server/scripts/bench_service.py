@@ -0,0 +1,87 @@
+"""
+Service-layer overhead benchmark
+
+Usage:
+    python scripts/bench_service.py [--calls N] [--tickets N]
+
+Times the hot read paths (get_tickets, get_ticket_by_id,
+get_tags_with_counts) against an in-memory SQLite database, with the query
+cache disabled, so that the numbers are dominated by Python-side work:
+building statements, SQL compilation / cache lookups, ORM loading and
+serialization. Run before and after a change to compare.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models.tag import Tag  # noqa: E402
+from app.models.ticket import Ticket  # noqa: E402
+from app.services import tag_service, ticket_service  # noqa: E402
+from app.services.query_cache import query_cache  # noqa: E402
+
+
+def seed(db, tickets: int) -> None:
+    tags = [Tag(name=f"tag-{i}", color="#3366ff") for i in range(10)]
+    db.add_all(tags)
+    for i in range(tickets):
+        db.add(Ticket(title=f"Ticket {i}", description="benchmark", tags=[tags[i % 10]]))
+    db.commit()
+
+
+def measure(func: Callable[[], object], calls: int) -> List[float]:
+    """Per-call times in microseconds (after a warmup call)"""
+    func()
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--tickets", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, args.tickets)
+    query_cache.enabled = False
+    ticket_id = db.query(Ticket.id).first()[0]
+
+    cases = {
+        "get_ticket_by_id": lambda: ticket_service.get_ticket_by_id(db, ticket_id),
+        "get_tickets (all)": lambda: ticket_service.get_tickets(db),
+        "get_tickets (search+tags)": lambda: ticket_service.get_tickets(
+            db, search="ticket", tag_ids=[1, 2], status="open"
+        ),
+        "get_tags_with_counts": lambda: tag_service.get_tags_with_counts(db),
+    }
+    print(f"{args.tickets} tickets, {args.calls} calls each (us per call)")
+    for name, func in cases.items():
+        samples = measure(func, args.calls)
+        db.expunge_all()
+        print(f"  {name:28} median {statistics.median(samples):8.1f}  "
+              f"p90 {statistics.quantiles(samples, n=10)[-1]:8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
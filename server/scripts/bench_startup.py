@@ -0,0 +1,122 @@
+"""
+Startup benchmark
+
+Usage:
+    python scripts/bench_startup.py [--runs N] [--top N]
+
+Reports, for a fresh interpreter each run:
+- import time of ``app.main`` (``python -X importtime``), with the slowest
+  modules by cumulative time
+- time to build the app with ``create_app()``
+- time to first response: from launching ``uvicorn --factory
+  app.main:create_app`` until ``GET /health`` answers
+
+Run from the ``server`` directory with DATABASE_URL and SECRET_KEY set.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List, Tuple
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(*args: str, **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=SERVER_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        **kwargs,
+    )
+
+
+def measure_imports() -> Tuple[float, List[Tuple[float, str]]]:
+    """Import app.main in a fresh interpreter; return total ms and per-module ms"""
+    result = _python("-X", "importtime", "-c", "import app.main")
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative) / 1000, name.strip()))
+    total = next(ms for ms, name in reversed(modules) if name == "app.main")
+    return total, modules
+
+
+def measure_create_app() -> float:
+    """Time create_app() after app.main is imported, in ms"""
+    code = (
+        "import time, app.main as m; t = time.perf_counter(); m.create_app(); "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    return float(_python("-c", code).stdout.strip())
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(timeout: float = 30.0) -> float:
+    """Launch uvicorn and poll /health; return ms until the first 200"""
+    port = _free_port()
+    health_url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", "app.main:create_app",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR,
+        env={**os.environ, "PURGE_ENABLED": os.environ.get("PURGE_ENABLED", "false")},
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(health_url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"Server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    import_totals, build_times, first_responses = [], [], []
+    modules: List[Tuple[float, str]] = []
+    for _ in range(args.runs):
+        total, modules = measure_imports()
+        import_totals.append(total)
+        build_times.append(measure_create_app())
+        first_responses.append(measure_first_response())
+
+    print("Slowest imports (cumulative, last run):")
+    for ms, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+    print()
+    for label, samples in (
+        ("import app.main", import_totals),
+        ("create_app()", build_times),
+        ("first response", first_responses),
+    ):
+        print(f"{label:16} median {statistics.median(samples):7.1f} ms  "
+              f"min {min(samples):7.1f} ms  max {max(samples):7.1f} ms  ({len(samples)} runs)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,24 @@
 """
 Pytest configuration and fixtures for testing
 """
+import os
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+# No background purger against the configured database during tests
+os.environ.setdefault("PURGE_ENABLED", "false")
+# Startup warmup is exercised against its own database in test_startup.py
+os.environ.setdefault("DB_POOL_WARMUP_CONNECTIONS", "0")
+# Rate limits are tested with their own app in test_rate_limit.py
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
 from app.database import Base, get_db
 from app.main import app
+from app.services.query_cache import query_cache
 
 # Use in-memory SQLite for tests
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -18,6 +28,20 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+
+
+# pysqlite only issues BEGIN before DML, so a SAVEPOINT (batch operations)
+# would start, and its RELEASE commit, the transaction: let SQLAlchemy
+# begin transactions instead, as the Postgres driver does
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -25,6 +49,7 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def db_session():
     """Create a fresh database for each test"""
     Base.metadata.create_all(bind=engine)
+    query_cache.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -0,0 +1,126 @@
+"""
+Tests for admission control and load shedding
+"""
+import asyncio
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.admission import (
+    CHEAP, EXPENSIVE, MULTI_OP, NORMAL, AdmissionController, classify
+)
+from app.config import Settings
+from app.main import create_app
+
+
+def make_request(method, path, query=""):
+    return Request({
+        "type": "http", "method": method, "path": path,
+        "query_string": query.encode(), "headers": [],
+    })
+
+
+class TestClassify:
+    """Tests for route cost classes"""
+
+    def test_classes(self):
+        """Test the cost class of each kind of route"""
+        for method, path, query, expected in [
+            ("GET", "/api/tags/", "", CHEAP),
+            ("GET", "/api/tickets/5", "", CHEAP),
+            ("GET", "/api/tickets/", "", EXPENSIVE),
+            ("GET", "/api/tickets/", "status=open", EXPENSIVE),
+            ("GET", "/api/tickets/", "search=bug", NORMAL),
+            ("GET", "/api/tickets/changes", "", NORMAL),
+            ("POST", "/api/tickets/", "", NORMAL),
+            ("POST", "/api/tickets/batch/status", "", EXPENSIVE),
+            ("POST", "/api/tickets/batch/get", "", NORMAL),
+            ("POST", "/api/tags/batch", "", EXPENSIVE),
+            ("POST", "/api/batch", "", MULTI_OP),
+            ("GET", "/health/ready", "", None),
+            ("GET", "/api/events/", "", None),
+        ]:
+            assert classify(make_request(method, path, query)) == expected, (method, path, query)
+
+
+class TestAdmissionController:
+    """Tests for the slot queue"""
+
+    def test_sheds_after_queue_timeout(self):
+        """Test that requests beyond capacity fail once the queue timeout passes"""
+        async def scenario():
+            controller = AdmissionController(1, {CHEAP: 1, NORMAL: 1, EXPENSIVE: 1}, 0.05)
+            assert await controller.acquire(NORMAL)
+            assert not await controller.acquire(NORMAL)
+            controller.release(NORMAL)
+            return controller.in_flight, await controller.acquire(NORMAL)
+
+        assert asyncio.run(scenario()) == (0, True)
+
+    def test_cheap_requests_go_first(self):
+        """Test that a freed slot goes to the highest priority waiter"""
+        async def scenario():
+            controller = AdmissionController(1, {CHEAP: 1, NORMAL: 1, EXPENSIVE: 1}, 1)
+            await controller.acquire(NORMAL)
+            order = []
+
+            async def request(cost):
+                await controller.acquire(cost)
+                order.append(cost)
+                await asyncio.sleep(0)
+                controller.release(cost)
+
+            tasks = [asyncio.create_task(request(cost)) for cost in (EXPENSIVE, NORMAL, CHEAP)]
+            await asyncio.sleep(0)
+            controller.release(NORMAL)
+            await asyncio.gather(*tasks)
+            return order
+
+        assert asyncio.run(scenario()) == [CHEAP, NORMAL, EXPENSIVE]
+
+    def test_expensive_share(self):
+        """Test that expensive requests cannot take every slot"""
+        async def scenario():
+            settings = Settings(
+                DATABASE_URL="sqlite://", SECRET_KEY="test", DB_POOL_SIZE=2, DB_MAX_OVERFLOW=2,
+                ADMISSION_QUEUE_TIMEOUT_SECONDS=0.05
+            )
+            controller = AdmissionController.from_settings(settings)
+            results = [await controller.acquire(EXPENSIVE) for _ in range(3)]
+            results.append(await controller.acquire(CHEAP))
+            return controller.capacity, results
+
+        assert asyncio.run(scenario()) == (4, [True, True, False, True])
+
+    def test_multi_op_share(self):
+        """Test that multi-operation batches have their own share, apart from bulk writes"""
+        async def scenario():
+            settings = Settings(
+                DATABASE_URL="sqlite://", SECRET_KEY="test", DB_POOL_SIZE=2, DB_MAX_OVERFLOW=2,
+                ADMISSION_QUEUE_TIMEOUT_SECONDS=0.05
+            )
+            controller = AdmissionController.from_settings(settings)
+            results = [await controller.acquire(MULTI_OP) for _ in range(3)]
+            results.append(await controller.acquire(EXPENSIVE))
+            return results
+
+        assert asyncio.run(scenario()) == [True, True, False, True]
+
+
+class TestLoadShedding:
+    """Tests for the admission middleware"""
+
+    def test_busy_worker_returns_503_with_retry_after(self):
+        """Test that a shed request gets a 503 and Retry-After"""
+        app = create_app(Settings(
+            DATABASE_URL="sqlite://", SECRET_KEY="test", DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0,
+            ADMISSION_QUEUE_TIMEOUT_SECONDS=0.01, ADMISSION_RETRY_AFTER_SECONDS=3
+        ))
+        client = TestClient(app)
+        app.state.admission.in_flight = 1
+
+        response = client.get("/api/tags/")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "3"
+        assert client.get("/health/live").status_code == status.HTTP_200_OK
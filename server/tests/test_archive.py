@@ -0,0 +1,89 @@
+"""
+Tests for archival of completed tickets
+"""
+from datetime import datetime, timedelta, timezone
+
+from fastapi import status
+from sqlalchemy import update
+
+from app.models.ticket import ArchivedTicket, Ticket
+from app.services.archive_service import archive_completed_tickets
+
+
+def make_old(db_session, ticket_id, days=365):
+    """Backdate a ticket's updated_at"""
+    db_session.execute(
+        update(Ticket).where(Ticket.id == ticket_id).values(
+            updated_at=datetime.now(timezone.utc) - timedelta(days=days)
+        )
+    )
+    db_session.commit()
+
+
+class TestArchival:
+    """Tests for the archive batch job and transparent reads"""
+
+    def _setup(self, client, db_session):
+        tag = client.post("/api/tags", json={"name": "legacy"}).json()
+        old = client.post("/api/tickets", json={"title": "Old done", "tagIds": [tag["id"]]}).json()
+        recent = client.post("/api/tickets", json={"title": "Recent done"}).json()
+        open_ticket = client.post("/api/tickets", json={"title": "Still open"}).json()
+        client.post(
+            "/api/tickets/batch/status",
+            json={"ticketIds": [old["id"], recent["id"]], "isCompleted": True},
+        )
+        make_old(db_session, old["id"])
+        make_old(db_session, open_ticket["id"])
+        return tag, old, recent, open_ticket
+
+    def test_archives_only_old_completed_tickets(self, client, db_session):
+        """Test that open and recently completed tickets stay live"""
+        _, old, _, _ = self._setup(client, db_session)
+
+        assert archive_completed_tickets(db_session, older_than_days=30) == 1
+        assert db_session.query(Ticket).filter(Ticket.id == old["id"]).first() is None
+        assert db_session.query(ArchivedTicket).filter(ArchivedTicket.id == old["id"]).one()
+
+    def test_batches(self, client, db_session):
+        """Test that work is split into batches"""
+        for i in range(5):
+            ticket = client.post("/api/tickets", json={"title": f"Done {i}"}).json()
+            client.patch(f"/api/tickets/{ticket['id']}/complete")
+            make_old(db_session, ticket["id"])
+
+        assert archive_completed_tickets(db_session, 30, batch_size=2, max_batches=1) == 2
+        assert archive_completed_tickets(db_session, 30, batch_size=2) == 3
+
+    def test_list_includes_archive_for_completed_and_all(self, client, db_session):
+        """Test that archived tickets are listed transparently"""
+        tag, old, recent, open_ticket = self._setup(client, db_session)
+        archive_completed_tickets(db_session, older_than_days=30)
+
+        all_ids = [t["id"] for t in client.get("/api/tickets?status=all").json()["tickets"]]
+        assert sorted(all_ids) == sorted([old["id"], recent["id"], open_ticket["id"]])
+
+        completed = client.get("/api/tickets?status=completed").json()["tickets"]
+        assert {t["id"] for t in completed} == {old["id"], recent["id"]}
+
+        open_ids = [t["id"] for t in client.get("/api/tickets?status=open").json()["tickets"]]
+        assert open_ids == [open_ticket["id"]]
+
+    def test_archived_tickets_keep_tags(self, client, db_session):
+        """Test that tag filters and counts still see archived tickets"""
+        tag, old, _, _ = self._setup(client, db_session)
+        archive_completed_tickets(db_session, older_than_days=30)
+
+        tagged = client.get(f"/api/tickets?tags={tag['id']}").json()["tickets"]
+        assert [t["id"] for t in tagged] == [old["id"]]
+        assert tagged[0]["tags"][0]["name"] == "legacy"
+
+        tags = client.get("/api/tags").json()["tags"]
+        assert tags[0]["ticketCount"] == 1
+
+    def test_archived_ticket_is_not_editable(self, client, db_session):
+        """Test that archived tickets are read-only"""
+        _, old, _, _ = self._setup(client, db_session)
+        archive_completed_tickets(db_session, older_than_days=30)
+
+        response = client.put(f"/api/tickets/{old['id']}", json={"title": "Edit"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
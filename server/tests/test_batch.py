@@ -0,0 +1,129 @@
+"""
+Tests for multi-operation requests (POST /api/batch)
+"""
+from fastapi import status
+from sqlalchemy import event
+
+
+def run(client, *operations):
+    return client.post("/api/batch", json={"operations": [
+        {"op": op, "args": args} for op, args in operations
+    ]})
+
+
+class TestBatchEnvelope:
+    """Tests for running several operations in one transaction"""
+
+    def test_create_ticket_with_new_tags(self, client, db_session):
+        """Test that back-references connect operations and everything commits once"""
+        commits = []
+        event.listen(db_session, "after_commit", commits.append)
+
+        response = run(
+            client,
+            ("create_ticket", {"title": "Login fails on Safari"}),
+            ("create_tag", {"name": "safari", "color": "#0ea5e9"}),
+            ("create_tag", {"name": "auth"}),
+            ("add_tags_to_ticket", {"id": "$ops[0].id", "tagIds": ["$ops[1].id", "$ops[2].id"]}),
+        )
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()["results"]
+        assert len(commits) == 1
+
+        ticket = results[3]
+        assert ticket["id"] == results[0]["id"]
+        assert sorted(tag["name"] for tag in ticket["tags"]) == ["auth", "safari"]
+        assert client.get(f"/api/tickets/{ticket['id']}").json()["tags"] == ticket["tags"]
+
+    def test_later_operations_see_earlier_changes(self, client):
+        """Test updates, toggles and deletes on rows written earlier in the batch"""
+        response = run(
+            client,
+            ("create_ticket", {"title": "Draft"}),
+            ("update_ticket", {"id": "$ops[0].id", "title": "Final", "expectedVersion": 1}),
+            ("toggle_complete", {"id": "$ops[0].id", "expectedVersion": "$ops[1].version"}),
+            ("create_ticket", {"title": "Scratch"}),
+            ("delete_ticket", {"id": "$ops[3].id"}),
+        )
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()["results"]
+        final = results[2]
+        assert (final["title"], final["isCompleted"], final["version"]) == ("Final", True, 3)
+        assert results[4] is None
+        assert (
+            client.get(f"/api/tickets/{results[3]['id']}").status_code == status.HTTP_404_NOT_FOUND
+        )
+
+    def test_failure_applies_nothing(self, client):
+        """Test that a failing operation rolls back the earlier ones"""
+        response = run(
+            client,
+            ("create_tag", {"name": "orphan"}),
+            ("create_ticket", {"title": "Orphan ticket"}),
+            ("add_tags_to_ticket", {"id": "$ops[1].id", "tagIds": [9999]}),
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"].startswith("Operation 2 (add_tags_to_ticket)")
+        assert client.get("/api/tags").json()["tags"] == []
+        assert client.get("/api/tickets").json()["tickets"] == []
+
+    def test_failed_operation_only_undoes_itself_before_the_batch_rolls_back(self, client):
+        """Test that an operation's own rollback leaves earlier operations to the batch"""
+        response = run(
+            client,
+            ("create_ticket", {"title": "Draft"}),
+            ("create_tag", {"name": "draft"}),
+            ("update_ticket", {"id": "$ops[0].id", "title": "Final", "expectedVersion": 7}),
+        )
+        # The ticket created by operation 0 is still there when operation 2
+        # checks why its update matched nothing: a stale version, not a 404
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert response.json()["detail"].startswith("Operation 2 (update_ticket)")
+        assert client.get("/api/tags").json()["tags"] == []
+        assert client.get("/api/tickets").json()["tickets"] == []
+
+    def test_invalid_batches(self, client):
+        """Test unknown operations, bad arguments and bad references"""
+        assert run(client).status_code == status.HTTP_400_BAD_REQUEST
+        assert run(client, ("drop_tables", {})).status_code == status.HTTP_400_BAD_REQUEST
+
+        response = run(client, ("create_ticket", {}))
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert "Operation 0 (create_ticket): invalid arguments" in response.json()["detail"]
+
+        for reference, expected in [
+            # Resolves, but ticket 1 does not exist
+            ("$ops[0].id", status.HTTP_404_NOT_FOUND),
+            ("$ops[1].id", status.HTTP_422_UNPROCESSABLE_ENTITY),
+            ("$ops[0].nope", status.HTTP_422_UNPROCESSABLE_ENTITY),
+        ]:
+            response = run(
+                client,
+                ("create_tag", {"name": "first"}),
+                ("add_tags_to_ticket", {"id": 1, "tagIds": [reference]}),
+            )
+            assert response.status_code == expected, reference
+        assert client.get("/api/tags").json()["tags"] == []
+
+    def test_expected_version(self, client):
+        """Test that expectedVersion guards deletes and is rejected where unsupported"""
+        ticket = client.post("/api/tickets", json={"title": "Shared"}).json()
+        tag = client.post("/api/tags", json={"name": "shared"}).json()
+
+        response = run(client, ("delete_ticket", {"id": ticket["id"], "expectedVersion": 2}))
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert client.get(f"/api/tickets/{ticket['id']}").status_code == status.HTTP_200_OK
+
+        response = run(
+            client,
+            (
+                "add_tags_to_ticket",
+                {"id": ticket["id"], "tagIds": [tag["id"]], "expectedVersion": 1},
+            ),
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert "expectedVersion is not supported" in response.json()["detail"]
+
+        response = run(client, ("delete_ticket", {"id": ticket["id"], "expectedVersion": 1}))
+        assert response.status_code == status.HTTP_200_OK
+        assert client.get(f"/api/tickets/{ticket['id']}").status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,173 @@
+"""
+Tests for cancelling the queries of disconnected clients
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.cancellation import CANCELLER_KEY, QueryCanceller
+from app.config import Settings
+from app.database import get_db
+from app.main import create_app
+from app.metrics import metrics
+from app.services import tag_service, ticket_service
+
+# Counts for a long time unless interrupted
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+    "SELECT count(*) FROM (SELECT x FROM c LIMIT 300000000)"
+)
+
+
+def slow_query(db, *args, **kwargs):
+    db.execute(SLOW_QUERY).scalar()
+
+
+def slow_get_tickets(db, *args, **kwargs):
+    slow_query(db)
+    return [], False
+
+
+async def call_asgi(app, path, disconnect_after, method="GET", body=b""):
+    """Send a request, disconnect after ``disconnect_after`` seconds; returns the messages sent"""
+    sent = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+@pytest.fixture
+def cancel_app(db_session):
+    app = create_app(
+        Settings(DATABASE_URL="sqlite://", SECRET_KEY="test", RATE_LIMIT_ENABLED=False)
+    )
+    app.dependency_overrides[get_db] = lambda: db_session
+    return app
+
+
+class TestQueryCanceller:
+    """Tests for tracking and cancelling a session's connections"""
+
+    def test_cancel_interrupts_running_query(self, db_session):
+        """Test that cancel() stops the statement running in another thread"""
+        canceller = QueryCanceller()
+        db_session.info[CANCELLER_KEY] = canceller
+        errors = []
+
+        def run():
+            try:
+                db_session.execute(SLOW_QUERY).scalar()
+            except OperationalError as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=run)
+        started = time.monotonic()
+        thread.start()
+        time.sleep(0.2)
+        canceller.cancel()
+        thread.join(timeout=10)
+
+        assert not thread.is_alive()
+        assert time.monotonic() - started < 5
+        assert errors and canceller.cancelled
+
+    def test_connection_forgotten_on_checkin(self, db_session):
+        """Test that a connection returned to the pool can no longer be cancelled"""
+        canceller = QueryCanceller()
+        db_session.info[CANCELLER_KEY] = canceller
+        db_session.execute(text("SELECT 1"))
+        assert len(canceller._connections) == 1
+
+        db_session.rollback()
+        assert not canceller._connections
+
+
+class TestCancelOnDisconnect:
+    """Tests for the disconnect watch on list, search and bulk read endpoints"""
+
+    def test_disconnect_cancels_search(self, cancel_app, monkeypatch):
+        """Test that a disconnected search is cancelled, rolled back, counted and not answered"""
+        monkeypatch.setattr(ticket_service, "get_tickets", slow_get_tickets)
+        before = metrics.get("db.cancelled_queries.tickets_list")
+
+        started = time.monotonic()
+        sent = asyncio.run(call_asgi(cancel_app, "/api/tickets/?search=bug", disconnect_after=0.2))
+
+        assert time.monotonic() - started < 5
+        assert sent == []
+        assert metrics.get("db.cancelled_queries.tickets_list") == before + 1
+
+    @pytest.mark.parametrize("method, path, body, service, function, route", [
+        (
+            "POST", "/api/tickets/batch/get", b'{"ticketIds": [1, 2, 3]}',
+            ticket_service, "get_tickets_by_ids", "tickets_batch_get",
+        ),
+        ("GET", "/api/tags/", b"", tag_service, "get_tags_with_counts", "tags_list"),
+    ])
+    def test_disconnect_cancels_bulk_reads(
+        self, cancel_app, monkeypatch, method, path, body, service, function, route
+    ):
+        """Test that fetches by ID and the tag list are cancelled like searches"""
+        monkeypatch.setattr(service, function, slow_query)
+        before = metrics.get(f"db.cancelled_queries.{route}")
+
+        started = time.monotonic()
+        sent = asyncio.run(
+            call_asgi(cancel_app, path, disconnect_after=0.2, method=method, body=body)
+        )
+
+        assert time.monotonic() - started < 5
+        assert sent == []
+        assert metrics.get(f"db.cancelled_queries.{route}") == before + 1
+
+    def test_completed_request_unaffected(self, cancel_app, db_session):
+        """Test that a request finishing before the client leaves is served normally"""
+        sent = asyncio.run(call_asgi(cancel_app, "/api/tickets/", disconnect_after=5))
+        assert sent[0]["status"] == 200
+        assert CANCELLER_KEY not in db_session.info
+
+    def test_disabled(self, db_session, monkeypatch):
+        """Test that CANCEL_QUERIES_ON_DISCONNECT=false lets the query finish"""
+        app = create_app(Settings(
+            DATABASE_URL="sqlite://", SECRET_KEY="test", RATE_LIMIT_ENABLED=False,
+            CANCEL_QUERIES_ON_DISCONNECT=False
+        ))
+        app.dependency_overrides[get_db] = lambda: db_session
+        monkeypatch.setattr(
+            ticket_service,
+            "get_tickets",
+            lambda db, *args, **kwargs: (time.sleep(0.5), ([], False))[1],
+        )
+
+        sent = asyncio.run(call_asgi(app, "/api/tickets/", disconnect_after=0.1))
+        assert sent[0]["status"] == 200
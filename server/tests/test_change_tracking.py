@@ -0,0 +1,279 @@
+"""
+Change tracking tests against Postgres
+
+GET /api/tickets/changes and the ETags rely on triggers that only exist in
+the Alembic migrations, tag deletes on the foreign key cascades and the
+workers' purgers on an advisory lock. These tests migrate a scratch
+``sync_tests`` schema of a local Postgres (dropped and recreated) and run
+the app on it.
+
+Only runs when PG_TEST_DATABASE_URL points at a Postgres database:
+
+    PG_TEST_DATABASE_URL=postgresql://localhost/pm_test pytest tests/test_change_tracking.py
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import Settings
+from app.database import get_db
+from app.jobs.purge import PURGE_LOCK_KEY, Purger
+from app.main import create_app
+from app.services import tag_service
+
+PG_DB_URL = os.environ.get("PG_TEST_DATABASE_URL")
+SCHEMA = "sync_tests"
+# Tickets carrying the tag deleted or merged by TestSetBasedTagDelete
+TAGGED_TICKETS = 2000
+SERVER_DIR = Path(__file__).parent.parent
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not PG_DB_URL, reason="PG_TEST_DATABASE_URL not set"),
+]
+
+
+@pytest.fixture(scope="module")
+def sync_engine():
+    """Engine on a freshly migrated sync_tests schema"""
+    options = f"-csearch_path={SCHEMA}"
+    engine = create_engine(PG_DB_URL, connect_args={"options": options})
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=SERVER_DIR,
+        # libpq reads the search_path from PGOPTIONS
+        env={**os.environ, "DATABASE_URL": PG_DB_URL, "PGOPTIONS": options},
+        check=True,
+        capture_output=True,
+    )
+
+    yield engine
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+@pytest.fixture
+def sync_client(sync_engine):
+    app = create_app(
+        Settings(DATABASE_URL="sqlite://", SECRET_KEY="test", RATE_LIMIT_ENABLED=False)
+    )
+    session_factory = sessionmaker(bind=sync_engine, autoflush=False)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+
+    with sync_engine.begin() as connection:
+        connection.execute(
+            text("TRUNCATE tickets, tags, ticket_tombstones, tag_tombstones CASCADE")
+        )
+
+
+def sync(client, token):
+    response = client.get("/api/tickets/changes", params={"since": token})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+def changes_since(client, token):
+    body = sync(client, token)
+    return {ticket["id"]: ticket for ticket in body["tickets"]}, body["nextToken"]
+
+
+class TestTagChangesAreSynced:
+    """Tests that tag changes reach the changes feed and the ETag"""
+
+    def test_tag_changes_appear_after_token(self, sync_client):
+        """Test that adding, renaming and removing tags mark their tickets changed"""
+        ticket = sync_client.post("/api/tickets/", json={"title": "Sync me"}).json()
+        other = sync_client.post("/api/tickets/", json={"title": "Untouched"}).json()
+        tag = sync_client.post("/api/tags/", json={"name": "sync", "color": "#112233"}).json()
+        etag = sync_client.get(f"/api/tickets/{ticket['id']}").headers["ETag"]
+        _, token = changes_since(sync_client, None)
+
+        sync_client.post(f"/api/tickets/{ticket['id']}/tags", json={"tagIds": [tag["id"]]})
+        changed, token = changes_since(sync_client, token)
+        assert set(changed) == {ticket["id"]}
+        assert [t["name"] for t in changed[ticket["id"]]["tags"]] == ["sync"]
+        new_etag = sync_client.get(f"/api/tickets/{ticket['id']}").headers["ETag"]
+        assert new_etag != etag
+
+        sync_client.put(f"/api/tags/{tag['id']}", json={"name": "synced"})
+        changed, token = changes_since(sync_client, token)
+        assert other["id"] not in changed
+        assert [t["name"] for t in changed[ticket["id"]]["tags"]] == ["synced"]
+        assert sync_client.get(f"/api/tickets/{ticket['id']}").headers["ETag"] != new_etag
+
+        sync_client.delete(f"/api/tickets/{ticket['id']}/tags/{tag['id']}")
+        changed, _ = changes_since(sync_client, token)
+        assert changed[ticket["id"]]["tags"] == []
+
+    def test_touching_keeps_updated_at(self, sync_client):
+        """Test that tag changes leave the ticket's updated_at (list order, archive age) alone"""
+        ticket = sync_client.post("/api/tickets/", json={"title": "Old"}).json()
+        tag = sync_client.post("/api/tags/", json={"name": "touch"}).json()
+
+        sync_client.post(f"/api/tickets/{ticket['id']}/tags", json={"tagIds": [tag["id"]]})
+        sync_client.put(f"/api/tags/{tag['id']}", json={"color": "#445566"})
+
+        touched = sync_client.get(f"/api/tickets/{ticket['id']}").json()
+        assert touched["version"] == 3
+        assert touched["updatedAt"] == ticket["updatedAt"]
+
+    def test_tag_delete_and_merge_are_logged_per_tag(self, sync_client):
+        """Test that deleted and merged tags come as tombstones, not as changed tickets"""
+        ticket = sync_client.post("/api/tickets/", json={"title": "Tagged"}).json()
+        source = sync_client.post("/api/tags/", json={"name": "source"}).json()
+        target = sync_client.post("/api/tags/", json={"name": "target"}).json()
+        doomed = sync_client.post("/api/tags/", json={"name": "doomed"}).json()
+        tag_ids = [source["id"], doomed["id"]]
+        sync_client.post(f"/api/tickets/{ticket['id']}/tags", json={"tagIds": tag_ids})
+        before = sync_client.get(f"/api/tickets/{ticket['id']}").json()
+        token = sync(sync_client, None)["nextToken"]
+
+        sync_client.post(f"/api/tags/{source['id']}/merge", json={"targetId": target["id"]})
+        sync_client.delete(f"/api/tags/{doomed['id']}")
+
+        body = sync(sync_client, token)
+        assert body["tickets"] == []
+        assert body["deletedTags"] == [
+            {"id": source["id"], "mergedIntoId": target["id"]},
+            {"id": doomed["id"], "mergedIntoId": None},
+        ]
+        after = sync_client.get(f"/api/tickets/{ticket['id']}").json()
+        assert [t["name"] for t in after["tags"]] == ["target"]
+        assert (after["version"], after["updatedAt"]) == (before["version"], before["updatedAt"])
+
+    def test_create_with_tags_is_one_version(self, sync_client):
+        """Test that links written with the ticket do not bump it again"""
+        tag = sync_client.post("/api/tags/", json={"name": "initial"}).json()
+        ticket = sync_client.post(
+            "/api/tickets/", json={"title": "Tagged", "tagIds": [tag["id"]]}
+        ).json()
+        assert sync_client.get(f"/api/tickets/{ticket['id']}").headers["ETag"] == '"1"'
+
+
+@pytest.fixture
+def tagged_tickets(sync_engine):
+    """TAGGED_TICKETS tickets tagged 'source', every other one also 'target'"""
+    with sync_engine.begin() as connection:
+        connection.execute(text("INSERT INTO tags (name) VALUES ('source'), ('target')"))
+        connection.execute(
+            text(
+                "INSERT INTO tickets (title, is_completed)"
+                " SELECT 'Ticket ' || i, false FROM generate_series(1, :count) AS i"
+            ),
+            {"count": TAGGED_TICKETS},
+        )
+        connection.execute(text("""
+            INSERT INTO ticket_tags (ticket_id, tag_id)
+            SELECT t.id, g.id FROM tickets t JOIN tags g
+              ON g.name = 'source' OR (g.name = 'target' AND t.id % 2 = 0)
+        """))
+        tag_ids = dict(connection.execute(text("SELECT name, id FROM tags")).all())
+
+    yield tag_ids
+
+    with sync_engine.begin() as connection:
+        connection.execute(
+            text("TRUNCATE tickets, tags, ticket_tombstones, tag_tombstones CASCADE")
+        )
+
+
+def run_counted(engine, action):
+    """Run action(db) and return the (statement, rowcount) of each statement it sent"""
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement.split()[0].upper(), cursor.rowcount))
+
+    event.listen(engine, "after_cursor_execute", count)
+    try:
+        with Session(engine) as db:
+            action(db)
+    finally:
+        event.remove(engine, "after_cursor_execute", count)
+    return executed
+
+
+def untouched_tickets(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT count(*) FROM tickets WHERE version = 1")).scalar()
+
+
+class TestSetBasedTagDelete:
+    """Tests that deleting and merging a tag do not scale with its tickets"""
+
+    def test_delete_is_one_delete(self, sync_engine, tagged_tickets):
+        """Test that the associations go with the tag's cascade, tickets untouched"""
+        executed = run_counted(
+            sync_engine, lambda db: tag_service.delete_tag(db, tagged_tickets["source"])
+        )
+
+        # Look up the tag, mark the transaction, delete the tag
+        assert executed == [("SELECT", 1), ("SET", -1), ("DELETE", 1)]
+        assert untouched_tickets(sync_engine) == TAGGED_TICKETS
+
+    def test_merge_is_one_insert_and_one_delete(self, sync_engine, tagged_tickets):
+        """Test that merging re-points the links with one INSERT per link table"""
+        source, target = tagged_tickets["source"], tagged_tickets["target"]
+        executed = run_counted(sync_engine, lambda db: tag_service.merge_tag(db, source, target))
+
+        assert [statement for statement, _ in executed] == [
+            "SELECT", "SET", "SELECT", "INSERT", "INSERT", "DELETE", "SELECT"
+        ]
+        # Only the tickets without the target yet get a link; none is updated
+        assert [rows for statement, rows in executed if statement != "SELECT"] == [
+            -1, TAGGED_TICKETS // 2, 0, 1
+        ]
+        assert untouched_tickets(sync_engine) == TAGGED_TICKETS
+        with sync_engine.connect() as connection:
+            assert connection.execute(
+                text("SELECT count(*) FROM ticket_tags WHERE tag_id = :tag"), {"tag": target}
+            ).scalar() == TAGGED_TICKETS
+
+
+class TestPurgerLock:
+    """Tests that the workers' purgers take turns"""
+
+    def test_one_purger_at_a_time(self, sync_engine):
+        """Test that a batch is skipped while another worker's purger holds the lock"""
+        with sync_engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO tickets (title, is_completed, deleted_at)"
+                " SELECT 'Deleted ' || i, false, now() - interval '1 day'"
+                " FROM generate_series(1, 3) AS i"
+            ))
+        purger = Purger(sessionmaker(bind=sync_engine), 60, 2, 0)
+        try:
+            with sync_engine.begin() as other_worker:
+                other_worker.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"), {"key": PURGE_LOCK_KEY}
+                )
+                assert purger.run_once(exclusive=True) == 0
+                # The drain command does not wait its turn
+                assert purger.run_once() == 2
+
+            assert purger.run_once(exclusive=True) == 1
+        finally:
+            with sync_engine.begin() as connection:
+                connection.execute(text("TRUNCATE tickets, ticket_tombstones CASCADE"))
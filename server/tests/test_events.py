@@ -0,0 +1,169 @@
+"""
+Tests for the change feed broker, listener and SSE endpoint
+"""
+import asyncio
+import json
+
+from fastapi import status
+
+from app.config import Settings
+from app.events import EventBroker, PostgresListener, broker, format_sse
+from app.main import create_app
+
+
+class TestEventBroker:
+    """Tests for in-memory event fan-out"""
+
+    def test_publish_fans_out_to_all_subscribers(self):
+        """Test that one published event reaches every subscriber"""
+
+        async def scenario():
+            broker = EventBroker()
+            queues = [broker.subscribe() for _ in range(3)]
+            broker.publish({"type": "ticket.created", "ids": [1]})
+            return [await asyncio.wait_for(q.get(), timeout=1) for q in queues]
+
+        events = asyncio.run(scenario())
+        assert all(event["ids"] == [1] for event in events)
+
+    def test_unsubscribed_queue_receives_nothing(self):
+        """Test that unsubscribing stops delivery"""
+
+        async def scenario():
+            broker = EventBroker()
+            queue = broker.subscribe()
+            broker.unsubscribe(queue)
+            broker.publish({"type": "tag.deleted", "ids": [2]})
+            await asyncio.sleep(0)
+            return queue.empty(), broker.subscriber_count
+
+        empty, count = asyncio.run(scenario())
+        assert empty
+        assert count == 0
+
+    def test_slow_consumer_gets_resync(self):
+        """Test that an overflowing queue is replaced by a resync marker"""
+
+        async def scenario():
+            broker = EventBroker(max_queue_size=2)
+            queue = broker.subscribe()
+            for i in range(3):
+                broker.publish({"type": "ticket.updated", "ids": [i]})
+            await asyncio.sleep(0)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        events = asyncio.run(scenario())
+        assert events[0] == {"type": "resync"}
+        assert events[-1]["ids"] == [2]
+
+
+class TestSseFormat:
+    """Tests for the Server-Sent Events encoding"""
+
+    def test_format_sse(self):
+        """Test that events are encoded with an event name and JSON data"""
+        event = {"type": "ticket.deleted", "ids": [3], "count": 1, "batch": False}
+        message = format_sse(event)
+        assert message.startswith("event: ticket.deleted\n")
+        assert message.endswith("\n\n")
+        assert json.loads(message.split("data: ", 1)[1]) == event
+
+
+class StopAfter:
+    """Stand-in for the listener's stop event that records the waits"""
+
+    def __init__(self, waits: int):
+        self.remaining = waits
+        self.waits = []
+
+    def is_set(self):
+        return self.remaining <= 0
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        self.remaining -= 1
+        return self.is_set()
+
+
+class TestPostgresListener:
+    """Tests for the LISTEN thread's reconnects"""
+
+    def test_reconnect_backoff_is_capped(self):
+        """Test that failed connects back off exponentially up to the cap"""
+        listener = PostgresListener(None, EventBroker(), min_backoff=1, max_backoff=8)
+        listener._stop = StopAfter(6)
+
+        def refuse():
+            raise OSError("connection refused")
+
+        listener._connect = refuse
+        listener._run()
+        assert listener._stop.waits == [1, 2, 4, 8, 8, 8]
+
+    def test_lost_connections_back_off_and_resync(self):
+        """Test that a connection dropping right away does not reconnect in a tight loop"""
+        listener = PostgresListener(None, EventBroker(), min_backoff=1, max_backoff=8)
+        listener._stop = StopAfter(3)
+        published = []
+        listener.broker.publish = published.append
+
+        class Connection:
+            def close(self):
+                pass
+
+        def drop(conn):
+            raise OSError("server closed the connection")
+
+        listener._connect = Connection
+        listener._listen = drop
+        listener._run()
+        assert listener._stop.waits == [1, 2, 4]
+        assert published == [{"type": "resync"}] * 3
+
+
+class TestEventStream:
+    """Tests for GET /api/events"""
+
+    def test_stream_delivers_published_events(self):
+        """Test that a subscriber receives published events as SSE messages"""
+        # The test client buffers whole responses, so the endless stream is
+        # read over ASGI and ended with a client disconnect
+        app = create_app(Settings(DATABASE_URL="sqlite://", SECRET_KEY="test"))
+        event = {"type": "ticket.created", "ids": [7], "count": 1, "batch": False}
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/api/events/", "raw_path": b"/api/events/",
+            "query_string": b"", "headers": [], "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80), "root_path": "",
+        }
+
+        async def scenario():
+            broker.bind_loop(asyncio.get_running_loop())
+            messages = []
+            subscribed, received = asyncio.Event(), asyncio.Event()
+
+            async def receive():
+                await received.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                messages.append(message)
+                body = message.get("body", b"")
+                if body.startswith(b"retry:"):
+                    subscribed.set()
+                elif body:
+                    received.set()
+
+            request = asyncio.create_task(app(scope, receive, send))
+            await asyncio.wait_for(subscribed.wait(), timeout=5)
+            broker.publish(event)
+            await asyncio.wait_for(request, timeout=5)
+            return messages
+
+        messages = asyncio.run(scenario())
+        start = messages[0]
+        assert start["status"] == status.HTTP_200_OK
+        assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+        bodies = [message["body"].decode() for message in messages[1:] if message.get("body")]
+        assert bodies == ["retry: 3000\n\n", format_sse(event)]
+        assert broker.subscriber_count == 0
@@ -0,0 +1,101 @@
+"""
+Tests for on-demand request profiling and memory snapshots
+"""
+import sys
+import tracemalloc
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.database import get_db
+from app.main import create_app
+from app.profiling import SamplingProfiler
+
+TOKEN = {"X-Profile-Token": "secret"}
+
+
+@pytest.fixture
+def profiling_client(db_session):
+    app = create_app(
+        Settings(DATABASE_URL="sqlite://", SECRET_KEY="test", PROFILING_TOKEN="secret")
+    )
+    app.dependency_overrides[get_db] = lambda: db_session
+    yield TestClient(app)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+class TestRequestProfiling:
+    """Tests for profiling single requests"""
+
+    def test_off_without_token_setting(self, client):
+        """Test that the profile flag and /debug routes do nothing unless configured"""
+        response = client.get("/api/tickets/", headers={"X-Profile": "1", **TOKEN})
+        assert response.status_code == status.HTTP_200_OK
+        assert "tickets" in response.json()
+        assert client.get("/debug/memory", headers=TOKEN).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_profile_request(self, profiling_client):
+        """Test that a flagged request returns its profile instead of its body"""
+        plain = profiling_client.get("/api/tickets/")
+        assert "tickets" in plain.json()
+
+        rejected = profiling_client.get("/api/tickets/?profile=1")
+        assert rejected.status_code == status.HTTP_403_FORBIDDEN
+
+        response = profiling_client.get("/api/tickets/", headers={"X-Profile": "1", **TOKEN})
+        assert response.status_code == status.HTTP_200_OK
+        profile = response.json()
+        assert profile["status_code"] == 200
+        assert profile["response_bytes"] == len(plain.content)
+        assert profile["samples"] == sum(profile["stacks"].values())
+        assert set(profile) >= {"duration_ms", "interval_ms", "breakdown_ms"}
+
+    def test_sample_folds_stack(self):
+        """Test that request stacks are folded root-first and others dropped"""
+        profiler = SamplingProfiler(1.0)
+        profiler.sample("pg-listener", sys._getframe())
+        assert profiler.samples == 0
+
+        namespace = {"sys": sys}
+        exec(
+            compile("frame = sys._getframe()", "site-packages/starlette/routing.py", "exec"),
+            namespace,
+        )
+        profiler.sample("main", namespace["frame"])
+        (stack, count), = profiler.stacks.items()
+        assert count == 1
+        assert stack.startswith("main;")
+        assert stack.endswith(";starlette/routing.py:<module>")
+        assert profiler.report()["breakdown_ms"] == {"other": 1.0}
+
+
+class TestMemorySnapshots:
+    """Tests for the tracemalloc endpoints"""
+
+    def test_memory_top(self, profiling_client):
+        """Test starting, reading and stopping allocation tracing"""
+        assert profiling_client.get("/debug/memory").status_code == status.HTTP_403_FORBIDDEN
+        assert (
+            profiling_client.get("/debug/memory", headers=TOKEN).status_code
+            == status.HTTP_409_CONFLICT
+        )
+
+        started = profiling_client.post("/debug/memory/start?frames=2", headers=TOKEN).json()
+        assert started["tracing"] is True
+        assert started["frames"] == 2
+
+        profiling_client.get("/api/tickets/")
+        top = profiling_client.get("/debug/memory?top=5", headers=TOKEN).json()
+        assert len(top["top"]) == 5
+        assert set(top["top"][0]) == {"location", "size_kib", "count"}
+
+        grown = profiling_client.get(
+            "/debug/memory?top=3&compare=true&groupBy=filename", headers=TOKEN
+        ).json()
+        assert grown["group_by"] == "filename"
+        assert "size_diff_kib" in grown["top"][0]
+
+        assert profiling_client.post("/debug/memory/stop", headers=TOKEN).json()["tracing"] is False
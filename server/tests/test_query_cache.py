@@ -0,0 +1,137 @@
+"""
+Tests for the query result cache
+"""
+import pytest
+from fastapi import status
+
+from app.services.query_cache import (
+    InMemoryBackend,
+    QueryCache,
+    SharedBackend,
+    cache_enabled,
+    query_cache,
+)
+
+
+class FakeSharedClient:
+    """Local stand-in for a Redis client"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class TestQueryCacheBackends:
+    """Tests for the cache layer itself"""
+
+    def test_key_is_normalized(self):
+        """Test that parameter order does not change the key"""
+        key_a = QueryCache.make_key("tickets", 1, {"status": "open", "search": None})
+        key_b = QueryCache.make_key("tickets", 1, {"search": None, "status": "open"})
+        assert key_a == key_b
+
+    def test_lru_eviction(self):
+        """Test that the in-memory backend evicts least recently used entries"""
+        backend = InMemoryBackend(max_entries=2)
+        backend.set("a", 1, ttl=60)
+        backend.set("b", 2, ttl=60)
+        backend.get("a")
+        backend.set("c", 3, ttl=60)
+        assert backend.get("a") == 1
+        assert backend.get("b") is None
+        assert backend.get("c") == 3
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are not returned"""
+        backend = InMemoryBackend()
+        backend.set("a", 1, ttl=-1)
+        assert backend.get("a") is None
+
+    @pytest.mark.parametrize(
+        "backend_factory",
+        [InMemoryBackend, lambda: SharedBackend(FakeSharedClient())],
+    )
+    def test_invalidate_forces_reload(self, backend_factory):
+        """Test that a version bump makes the next read a miss"""
+        cache = QueryCache(backend_factory(), ttl=60)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return ["result"]
+
+        assert cache.get_or_load("tickets", {"status": "all"}, loader) == ["result"]
+        assert cache.get_or_load("tickets", {"status": "all"}, loader) == ["result"]
+        assert len(calls) == 1
+
+        cache.invalidate()
+        cache.get_or_load("tickets", {"status": "all"}, loader)
+        assert len(calls) == 2
+
+    @pytest.mark.parametrize(
+        "enabled, url, expected",
+        [
+            (None, None, False),
+            (None, "redis://cache:6379/0", True),
+            (True, None, True),
+            (False, "redis://cache:6379/0", False),
+        ],
+    )
+    def test_enabled_by_default_only_when_shared(self, enabled, url, expected):
+        """Test that an unset QUERY_CACHE_ENABLED caches only with a shared backend"""
+        assert cache_enabled(enabled, url) is expected
+
+
+class TestTicketListCaching:
+    """Tests for caching of GET /api/tickets"""
+
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, monkeypatch):
+        monkeypatch.setattr(query_cache, "enabled", True)
+
+    def test_repeated_list_is_a_cache_hit(self, client):
+        """Test that the second identical list request is served from cache"""
+        client.post("/api/tickets", json={"title": "Cached"})
+        hits_before = query_cache.stats()["hits"]
+
+        client.get("/api/tickets?status=open")
+        client.get("/api/tickets?status=open")
+
+        assert query_cache.stats()["hits"] == hits_before + 1
+
+    def test_write_invalidates_list(self, client):
+        """Test that ticket writes are visible in the next list request"""
+        client.post("/api/tickets", json={"title": "First"})
+        assert len(client.get("/api/tickets").json()["tickets"]) == 1
+
+        client.post("/api/tickets", json={"title": "Second"})
+        assert len(client.get("/api/tickets").json()["tickets"]) == 2
+
+    def test_tag_write_invalidates_list(self, client):
+        """Test that renaming a tag is reflected in cached ticket lists"""
+        tag = client.post("/api/tags", json={"name": "old"}).json()
+        client.post("/api/tickets", json={"title": "Tagged", "tagIds": [tag["id"]]})
+        assert client.get("/api/tickets").json()["tickets"][0]["tags"][0]["name"] == "old"
+
+        client.put(f"/api/tags/{tag['id']}", json={"name": "new"})
+        assert client.get("/api/tickets").json()["tickets"][0]["tags"][0]["name"] == "new"
+
+    def test_metrics_endpoint(self, client):
+        """Test that cache counters are exposed"""
+        client.get("/api/tickets")
+        response = client.get("/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        assert "query_cache.misses" in response.json()
@@ -0,0 +1,298 @@
+"""
+Query plan regression tests
+
+Seeds a large dataset into a scratch schema of a local Postgres, runs every
+service query shape and checks the plan of each statement it sent with
+``EXPLAIN (FORMAT JSON)``: no sequential scan of the big tables unless the
+shape needs one, and the planner's cost and row estimates within a budget.
+
+The plan structure of each statement (node types, tables, indexes; not
+the SQL text) is kept as a snapshot in tests/query_plans/<case>.json so
+that plan changes show up in review. Plans depend on the table sizes, so
+snapshots are only compared when PLAN_TEST_TICKETS is the seed size they
+were recorded with; the budgets are always checked.
+
+Only runs when PLAN_TEST_DATABASE_URL points at a Postgres database; the
+``plan_tests`` schema in it is dropped and recreated. Options:
+- PLAN_TEST_TICKETS: number of tickets to seed (default 100000; below about
+  20000 sequential scans become the cheaper plans)
+- PLAN_SNAPSHOT_UPDATE=1: rewrite the snapshots instead of comparing
+
+    PLAN_TEST_DATABASE_URL=postgresql://localhost/pm_test pytest tests/test_query_plans.py
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.schemas.tag import TagCreate
+from app.schemas.ticket import TicketUpdate
+from app.services import tag_service, ticket_service
+from app.services.query_cache import query_cache
+
+PLAN_DB_URL = os.environ.get("PLAN_TEST_DATABASE_URL")
+SEED_TICKETS = int(os.environ.get("PLAN_TEST_TICKETS", "100000"))
+UPDATE_SNAPSHOTS = os.environ.get("PLAN_SNAPSHOT_UPDATE") == "1"
+SCHEMA = "plan_tests"
+SNAPSHOT_DIR = Path(__file__).parent / "query_plans"
+
+# Tables that must never be read in full by the shapes that don't need it
+BIG_TABLES = {"tickets", "ticket_tags", "tickets_archive", "ticket_tags_archive"}
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.slow,
+    pytest.mark.skipif(not PLAN_DB_URL, reason="PLAN_TEST_DATABASE_URL not set"),
+]
+
+
+SEED_SQL = [
+    "INSERT INTO tags (name, color) SELECT 'tag-' || i, '#3366ff' FROM generate_series(1, 50) AS i",
+    # 10% completed, 1% soft-deleted, updated_at spread over a year
+    """
+    INSERT INTO tickets (title, description, is_completed, created_at, updated_at, deleted_at)
+    SELECT
+        'Ticket ' || i || ' ' || md5(i::text),
+        'Description of ticket ' || i,
+        i % 10 = 0,
+        now() - (i || ' minutes')::interval,
+        now() - (i || ' minutes')::interval,
+        CASE WHEN i % 100 = 7 THEN now() ELSE NULL END
+    FROM generate_series(1, :tickets) AS i
+    """,
+    # Up to three tags per ticket
+    """
+    INSERT INTO ticket_tags (ticket_id, tag_id)
+    SELECT DISTINCT t.id, 1 + (t.id * k) % 50
+    FROM tickets t, generate_series(1, 3) AS k
+    WHERE (t.id + k) % 4 <> 0
+    """,
+    """
+    INSERT INTO tickets_archive (id, title, description, is_completed, created_at, updated_at)
+    SELECT :tickets + i, 'Archived ' || i, 'Old ticket ' || i, true,
+           now() - interval '2 years', now() - interval '2 years' + (i || ' minutes')::interval
+    FROM generate_series(1, :tickets) AS i
+    """,
+    """
+    INSERT INTO ticket_tags_archive (ticket_id, tag_id)
+    SELECT id, 1 + id % 50 FROM tickets_archive
+    """,
+]
+
+
+@pytest.fixture(scope="module")
+def plan_engine():
+    """Engine on a freshly seeded plan_tests schema"""
+    engine = create_engine(PLAN_DB_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(bind=connection)
+        for statement in SEED_SQL:
+            connection.execute(text(statement), {"tickets": SEED_TICKETS})
+        # Statistics and visibility maps only change when the tests say so
+        for table in Base.metadata.tables:
+            connection.execute(text(f"ALTER TABLE {table} SET (autovacuum_enabled = false)"))
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE"))
+
+    yield engine
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+@pytest.fixture
+def plan_session(plan_engine, monkeypatch):
+    """Session whose commits are rolled back after the test"""
+    monkeypatch.setattr(query_cache, "enabled", False)
+    connection = plan_engine.connect()
+    outer = connection.begin()
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield db
+    finally:
+        db.close()
+        outer.rollback()
+        connection.close()
+        # Rolled back writes still clear visibility map bits, which turns
+        # index-only scans of later cases into bitmap heap scans
+        with plan_engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+
+def tag_id(db: Session, name: str) -> int:
+    return db.execute(text("SELECT id FROM tags WHERE name = :name"), {"name": name}).scalar_one()
+
+
+def ticket_ids(db: Session, count: int) -> List[int]:
+    return list(db.execute(
+        text("SELECT id FROM tickets WHERE deleted_at IS NULL ORDER BY id LIMIT :count"),
+        {"count": count},
+    ).scalars())
+
+
+class Case(NamedTuple):
+    call: Callable[..., Any]
+    # Looks up the call's arguments; its own statements are not checked
+    setup: Callable[[Session], tuple] = lambda db: ()
+    # Big tables the shape has to read in full
+    full_scans: frozenset = frozenset()
+    # Planner estimates for each statement (the seeded data gives about a
+    # third of these)
+    max_cost: float = 2000
+    max_rows: float = 1000
+
+
+def tag_ids(*names: str) -> Callable[[Session], tuple]:
+    return lambda db: ([tag_id(db, name) for name in names],)
+
+
+CASES: Dict[str, Case] = {
+    "tickets_list_all": Case(lambda db: ticket_service.get_tickets(db, limit=50)),
+    "tickets_list_open": Case(lambda db: ticket_service.get_tickets(db, status="open", limit=50)),
+    "tickets_list_completed": Case(
+        lambda db: ticket_service.get_tickets(db, status="completed", limit=50)),
+    "tickets_list_default_limit": Case(
+        lambda db: ticket_service.get_tickets(db), max_cost=10000, max_rows=6000),
+    # Short terms match title prefixes through ix_tickets_title_lower_prefix
+    "tickets_search_prefix": Case(
+        lambda db: ticket_service.get_tickets(db, search="ti", limit=50)),
+    # Substring search has no index to use; the limit bounds it, not the scan
+    "tickets_search_contains": Case(
+        lambda db: ticket_service.get_tickets(db, search="ticket 123", limit=50),
+        full_scans=frozenset({"tickets", "tickets_archive"}), max_cost=10000),
+    "tickets_tag_filter": Case(
+        lambda db, tags: ticket_service.get_tickets(db, tag_ids=tags, limit=50),
+        tag_ids("tag-1", "tag-2")),
+    "tickets_combined": Case(
+        lambda db, tags: ticket_service.get_tickets(
+            db, search="ticket 12", tag_ids=tags, status="open", limit=50
+        ),
+        tag_ids("tag-3"), full_scans=frozenset({"tickets"}), max_cost=15000),
+    "ticket_by_id": Case(
+        lambda db, ids: ticket_service.get_ticket_by_id(db, ids[0]),
+        lambda db: (ticket_ids(db, 1),), max_cost=100, max_rows=100),
+    "tickets_by_ids": Case(
+        lambda db, ids: ticket_service.get_tickets_by_ids(db, ids),
+        lambda db: (ticket_ids(db, 500),), max_cost=10000, max_rows=2000),
+    # Counts every association: full scans are the plan
+    "tag_counts": Case(
+        lambda db: tag_service.get_tags_with_counts(db),
+        full_scans=frozenset(BIG_TABLES), max_cost=40000),
+    # Usage counts per candidate through ix_ticket_tags_tag_id; the seeded
+    # tags are few and each is on thousands of tickets, so counting dominates
+    "tag_suggest": Case(lambda db: tag_service.suggest_tags(db, "tag-1", 10), max_cost=40000),
+    "batch_update_status": Case(
+        lambda db, ids: ticket_service.batch_update_status(db, ids, True),
+        lambda db: (ticket_ids(db, 500),), max_cost=5000),
+    "batch_delete": Case(
+        lambda db, ids: ticket_service.batch_delete(db, ids),
+        lambda db: (ticket_ids(db, 500),), max_cost=5000),
+    "batch_update_by_filter": Case(
+        lambda db, tags: ticket_service.batch_update(
+            db,
+            ticket_service.match_ticket_ids(db, tag_ids=tags, status="completed"),
+            TicketUpdate(description="Triaged")
+        ),
+        tag_ids("tag-11"), max_cost=6000, max_rows=2000),
+    "tag_upsert": Case(
+        lambda db: tag_service.upsert_tags(
+            db, [TagCreate(name=f"tag-{i}", color="#000000") for i in range(40, 60)]
+        ),
+    ),
+    "tag_merge": Case(
+        lambda db, tags: tag_service.merge_tag(db, *tags),
+        tag_ids("tag-5", "tag-6"), max_cost=5000),
+    "tag_delete": Case(
+        lambda db, tags: tag_service.delete_tag(db, *tags),
+        tag_ids("tag-7"), max_cost=5000),
+}
+
+EXPLAINED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def capture_statements(db: Session, case: Case) -> List[Tuple[str, Any]]:
+    """Run a case's service call and return the statements it sent"""
+    args = case.setup(db)
+    statements = []
+    connection = db.connection()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(EXPLAINED):
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        case.call(db, *args)
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+    return statements
+
+
+def explain(db: Session, statement: str, parameters: Any) -> Dict[str, Any]:
+    raw = db.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + statement, parameters
+    ).scalar_one()
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    return raw[0]["Plan"]
+
+
+def plan_shape(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan structure without costs, for snapshots"""
+    shape = {"node": node["Node Type"]}
+    keys = (("Relation Name", "relation"), ("Index Name", "index"), ("Join Type", "join"))
+    for key, name in keys:
+        if key in node:
+            shape[name] = node[key]
+    if node.get("Plans"):
+        shape["plans"] = [plan_shape(child) for child in node["Plans"]]
+    return shape
+
+
+def seq_scanned(node: Dict[str, Any]) -> set:
+    tables = {node["Relation Name"]} if node["Node Type"] == "Seq Scan" else set()
+    for child in node.get("Plans", []):
+        tables |= seq_scanned(child)
+    return tables
+
+
+class TestQueryPlans:
+    """Plan checks for every service query shape"""
+
+    @pytest.mark.parametrize("name", sorted(CASES))
+    def test_plan(self, name, plan_session):
+        case = CASES[name]
+        statements = capture_statements(plan_session, case)
+        assert statements, "no statements captured"
+
+        plans = []
+        for statement, parameters in statements:
+            plan = explain(plan_session, statement, parameters)
+            scanned = (seq_scanned(plan) & BIG_TABLES) - case.full_scans
+            assert not scanned, f"sequential scan of {sorted(scanned)} in:\n{statement}"
+            cost, rows = plan["Total Cost"], plan["Plan Rows"]
+            assert cost <= case.max_cost, f"cost {cost} > {case.max_cost}:\n{statement}"
+            assert rows <= case.max_rows, f"rows {rows} > {case.max_rows}:\n{statement}"
+            plans.append(plan_shape(plan))
+
+        path = SNAPSHOT_DIR / f"{name}.json"
+        if UPDATE_SNAPSHOTS:
+            SNAPSHOT_DIR.mkdir(exist_ok=True)
+            snapshot = {"seed_tickets": SEED_TICKETS, "plans": plans}
+            path.write_text(json.dumps(snapshot, indent=2) + "\n")
+            return
+
+        assert path.exists(), f"no snapshot for {name}; run with PLAN_SNAPSHOT_UPDATE=1"
+        snapshot = json.loads(path.read_text())
+        if snapshot["seed_tickets"] == SEED_TICKETS:
+            assert plans == snapshot["plans"], (
+                f"plan of {name} changed; review and run with PLAN_SNAPSHOT_UPDATE=1"
+            )
@@ -0,0 +1,163 @@
+"""
+Tests for per-client rate limiting
+"""
+from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.config import Settings
+from app.database import get_db
+from app.main import create_app
+from app.metrics import metrics
+from app.rate_limit import (
+    BATCH,
+    MULTI_OP,
+    TAGS,
+    TICKETS_READ,
+    TICKETS_WRITE,
+    InMemoryBackend,
+    RateLimiter,
+    SharedBackend,
+    client_identity,
+    route_group,
+)
+
+
+class FakeSharedClient:
+    """Minimal stand-in for a Redis client"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+    def expire(self, key, seconds):
+        self.expiry[key] = seconds
+
+
+class DownSharedClient:
+    """Redis client stand-in whose server is unreachable"""
+
+    def incr(self, key):
+        raise ConnectionError("connection refused")
+
+
+def make_request(method, path, headers=None):
+    raw_headers = [
+        (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+    ]
+    return Request({
+        "type": "http", "method": method, "path": path, "query_string": b"",
+        "headers": raw_headers,
+        "client": ("10.0.0.1", 1234),
+    })
+
+
+class TestRouting:
+    """Tests for route groups and client keys"""
+
+    def test_route_groups(self):
+        """Test that each route maps to its group"""
+        assert route_group(make_request("GET", "/api/tickets/")) == TICKETS_READ
+        assert route_group(make_request("PUT", "/api/tickets/1")) == TICKETS_WRITE
+        assert route_group(make_request("POST", "/api/tickets/batch/delete")) == BATCH
+        assert route_group(make_request("POST", "/api/tickets/batch/get")) == TICKETS_READ
+        assert route_group(make_request("POST", "/api/tags/batch")) == BATCH
+        assert route_group(make_request("POST", "/api/batch")) == MULTI_OP
+        assert route_group(make_request("GET", "/api/tags/")) == TAGS
+        assert route_group(make_request("GET", "/health/live")) is None
+
+    def test_clients_keyed_by_ip(self):
+        """Test that client-supplied headers cannot pick a fresh bucket"""
+        assert client_identity(make_request("GET", "/")) == "ip:10.0.0.1"
+        assert client_identity(make_request("GET", "/", {"X-API-Key": "random"})) == "ip:10.0.0.1"
+
+
+class TestBackends:
+    """Tests for the bucket backends"""
+
+    def test_token_bucket_burst_and_refill(self, monkeypatch):
+        """Test that a bucket allows a burst and then refills at the rate"""
+        now = [100.0]
+        monkeypatch.setattr("app.rate_limit.time.monotonic", lambda: now[0])
+        backend = InMemoryBackend()
+
+        assert [backend.hit("k", 1.0, 3)[0] for _ in range(4)] == [True, True, True, False]
+        allowed, remaining, retry_after = backend.hit("k", 1.0, 3)
+        assert (allowed, remaining, retry_after) == (False, 0, 1.0)
+
+        now[0] += 1.5
+        assert backend.hit("k", 1.0, 3)[:2] == (True, 0)
+        assert backend.hit("other", 1.0, 3)[:2] == (True, 2)
+
+    def test_bucket_count_is_bounded(self):
+        """Test that the least recently used bucket is dropped past max_buckets"""
+        backend = InMemoryBackend(max_buckets=2)
+        backend.hit("a", 1.0, 1)
+        backend.hit("b", 1.0, 1)
+        assert backend.hit("a", 1.0, 1)[0] is False
+
+        backend.hit("c", 1.0, 1)
+        assert len(backend) == 2
+        # "a" was used after "b", so it kept its (empty) bucket
+        assert backend.hit("a", 1.0, 1)[0] is False
+
+    def test_shared_backend(self):
+        """Test that the shared backend counts hits per window"""
+        client = FakeSharedClient()
+        backend = SharedBackend(client)
+        results = [backend.hit("k", 1.0, 2)[0] for _ in range(3)]
+        assert results == [True, True, False]
+        assert list(client.expiry.values()) == [3]
+
+
+class TestRateLimitMiddleware:
+    """Tests for the rate limit middleware"""
+
+    def test_headers_and_429(self, db_session):
+        """Test RateLimit-* headers and rejection with Retry-After"""
+        app = create_app(Settings(
+            DATABASE_URL="sqlite://", SECRET_KEY="test",
+            RATE_LIMIT_ENABLED=True, RATE_LIMITS={"tags": (1.0, 2)}
+        ))
+        app.dependency_overrides[get_db] = lambda: db_session
+        limited = TestClient(app)
+
+        first = limited.get("/api/tags/")
+        assert first.status_code == status.HTTP_200_OK
+        assert first.headers["RateLimit-Limit"] == "2"
+        assert first.headers["RateLimit-Remaining"] == "1"
+
+        limited.get("/api/tags/")
+        rejected = limited.get("/api/tags/")
+        assert rejected.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert rejected.headers["Retry-After"] == "1"
+
+        # A made-up API key is not a new client; unlimited groups are unaffected
+        assert limited.get("/api/tags/", headers={"X-API-Key": "abc"}).status_code == (
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        assert "RateLimit-Limit" not in limited.get("/api/tickets/").headers
+
+    def test_shared_backend_fails_open(self, db_session):
+        """Test that requests go through, counted, while the shared store is down"""
+        app = create_app(
+            Settings(DATABASE_URL="sqlite://", SECRET_KEY="test", RATE_LIMIT_ENABLED=True)
+        )
+        app.dependency_overrides[get_db] = lambda: db_session
+        limited = TestClient(app)
+        before = metrics.get("rate_limit.backend_errors")
+
+        app.state.rate_limiter = RateLimiter(SharedBackend(DownSharedClient()), {"tags": (1.0, 1)})
+        for _ in range(3):
+            response = limited.get("/api/tags/")
+            assert response.status_code == status.HTTP_200_OK
+            assert "RateLimit-Limit" not in response.headers
+        assert metrics.get("rate_limit.backend_errors") == before + 3
+
+        app.state.rate_limiter = RateLimiter(SharedBackend(FakeSharedClient()), {"tags": (1.0, 1)})
+        assert limited.get("/api/tags/").headers["RateLimit-Remaining"] == "0"
+        assert limited.get("/api/tags/").status_code == status.HTTP_429_TOO_MANY_REQUESTS
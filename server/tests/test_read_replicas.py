@@ -0,0 +1,94 @@
+"""
+Tests for read replica routing, using two local SQLite databases
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, RoutingSession
+from app.models.tag import Tag
+from app.models.ticket import Ticket
+from app.services import tag_service, ticket_service
+from app.schemas.ticket import TicketCreate
+from app.services.query_cache import query_cache
+
+
+@pytest.fixture
+def routing_session_factory(tmp_path):
+    """Session factory with a primary and one replica holding different data"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, source in ((primary, "primary"), (replica, "replica")):
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            db.add(Ticket(id=1, title=f"from {source}"))
+            db.add(Tag(name=f"{source}-tag"))
+            db.commit()
+
+    factory = sessionmaker(class_=RoutingSession, bind=primary, replicas=[replica])
+
+    def make_session(allow_replica):
+        db = factory()
+        db.info["allow_replica"] = allow_replica
+        return db
+
+    yield make_session
+    primary.dispose()
+    replica.dispose()
+
+
+class TestReplicaRouting:
+    """Tests for RoutingSession"""
+
+    def test_read_only_function_uses_replica(self, routing_session_factory):
+        """Test that replica_read service functions go to the replica"""
+        with routing_session_factory(allow_replica=True) as db:
+            assert ticket_service.get_ticket_by_id(db, 1).title == "from replica"
+
+    def test_write_requests_use_primary(self, routing_session_factory):
+        """Test that sessions of write requests never touch a replica"""
+        with routing_session_factory(allow_replica=False) as db:
+            assert ticket_service.get_ticket_by_id(db, 1).title == "from primary"
+
+    def test_undecorated_reads_use_primary(self, routing_session_factory):
+        """Test that queries outside replica_read functions go to the primary"""
+        with routing_session_factory(allow_replica=True) as db:
+            assert db.query(Ticket).filter(Ticket.id == 1).one().title == "from primary"
+
+    def test_reads_after_write_are_pinned_to_primary(self, routing_session_factory):
+        """Test read-your-writes within a session"""
+        with routing_session_factory(allow_replica=True) as db:
+            created = ticket_service.create_ticket(db, TicketCreate(title="new"))
+            assert ticket_service.get_ticket_by_id(db, created.id).title == "new"
+            assert ticket_service.get_ticket_by_id(db, 1).title == "from primary"
+
+    def test_tag_counts_use_replica(self, routing_session_factory, monkeypatch):
+        """Test that tag reads are routed as well"""
+        monkeypatch.setattr(query_cache, "enabled", False)
+        with routing_session_factory(allow_replica=True) as db:
+            assert [tag.name for tag in tag_service.get_tags_with_counts(db)] == ["replica-tag"]
+        with routing_session_factory(allow_replica=False) as db:
+            assert [tag.name for tag in tag_service.get_tags_with_counts(db)] == ["primary-tag"]
+
+
+class TestPrimaryPinning:
+    """Tests for the request-level primary pin"""
+
+    def test_get_db_allows_replica_for_get(self, client):
+        """Test that the dependency only allows replicas for GET requests"""
+        from starlette.requests import Request
+        from app.database import get_db
+
+        def make_request(method, cookies=""):
+            headers = [(b"cookie", cookies.encode())] if cookies else []
+            return Request({"type": "http", "method": method, "headers": headers})
+
+        for method, cookies, expected in [
+            ("GET", "", True),
+            ("POST", "", False),
+            ("GET", "pm_read_primary=1", False),
+        ]:
+            generator = get_db(make_request(method, cookies))
+            db = next(generator)
+            assert db.info["allow_replica"] is expected
+            generator.close()
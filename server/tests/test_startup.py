@@ -0,0 +1,206 @@
+"""
+Tests for lazy startup and the app factory
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.config import Settings
+from app.database import Base
+from app.health import HealthProbe, migration_heads, migration_revisions
+from app.main import create_app
+from app.metrics import metrics
+from app.models.tag import Tag
+from app.services.query_cache import query_cache
+
+
+class TestLazyImports:
+    """Tests that importing app.main stays cheap"""
+
+    def test_import_does_not_build_app_or_engine(self):
+        """Test that routers, DB driver and settings are left for later"""
+        code = (
+            "import sys, app.main, app.config, app.database\n"
+            "assert 'app.routers' not in sys.modules\n"
+            "assert app.database._engine is None\n"
+            "assert app.config.get_settings.cache_info().currsize == 0\n"
+        )
+        # Import must work without any configuration in the environment
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, env={"PATH": ""},
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        assert result.returncode == 0, result.stderr
+
+
+class TestCreateApp:
+    """Tests for the app factory"""
+
+    def test_factory_builds_working_app(self):
+        """Test that create_app() returns a fully wired application"""
+        with TestClient(create_app()) as client:
+            assert client.get("/health").json() == {"status": "healthy"}
+            paths = client.get("/openapi.json").json()["paths"]
+            for prefix in ("/api/tickets", "/api/tags", "/api/events"):
+                assert any(path.startswith(prefix) for path in paths)
+
+    def test_module_app_is_built_once(self):
+        """Test that app.main:app is cached"""
+        import app.main
+
+        assert app.main.app is app.main.app
+        assert app.main.app is not create_app()
+
+    def test_unknown_attribute(self):
+        """Test that the lazy module attribute does not hide typos"""
+        import app.main
+
+        assert not hasattr(app.main, "ap")
+
+
+class TestLifespan:
+    """Tests for engine setup, warmup and teardown in the app lifespan"""
+
+    @pytest.fixture
+    def settings(self, tmp_path):
+        """Settings pointing at a fresh SQLite database with one tag"""
+        url = f"sqlite:///{tmp_path / 'warmup.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            db.add(Tag(name="Bug", color="#ff0000"))
+            db.commit()
+        engine.dispose()
+        query_cache.clear()
+        return Settings(
+            DATABASE_URL=url, SECRET_KEY="test", PURGE_ENABLED=False, DB_POOL_WARMUP_CONNECTIONS=2,
+            HEALTH_CHECK_MIGRATIONS=False
+        )
+
+    def test_warmup_before_ready(self, settings, monkeypatch):
+        """Test that the pool and tag cache are warm once the app is ready"""
+        monkeypatch.setattr(query_cache, "enabled", True)
+        app = create_app(settings)
+        assert app.state.ready is False
+
+        with TestClient(app) as client:
+            engine = database.get_engine()
+            assert str(engine.url) == settings.DATABASE_URL
+            assert engine.pool.checkedin() == 2
+
+            misses = metrics.get("query_cache.misses")
+            assert client.get("/health/ready").json()["status"] == "ok"
+            assert client.get("/api/tags").json()["tags"][0]["name"] == "Bug"
+            assert metrics.get("query_cache.misses") == misses
+
+        assert app.state.ready is False
+        assert database._engine is None
+
+    def test_not_ready_without_lifespan(self, settings):
+        """Test that readiness fails until startup has run"""
+        client = TestClient(create_app(settings))
+        assert client.get("/health/ready").status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert client.get("/health/live").status_code == status.HTTP_200_OK
+
+    def test_warmup_failure_is_not_fatal(self, settings):
+        """Test that an unreachable database does not block startup"""
+        settings.DATABASE_URL = "sqlite:////nonexistent/dir/db.sqlite"
+        with TestClient(create_app(settings)) as client:
+            assert client.get("/health/live").status_code == status.HTTP_200_OK
+            response = client.get("/health/ready")
+            assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            assert response.json()["checks"]["database"]["status"] == "unavailable"
+
+
+class TestHealthProbe:
+    """Tests for the readiness checks"""
+
+    @pytest.fixture
+    def probe(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'probe.db'}"
+        settings = Settings(DATABASE_URL=url, SECRET_KEY="test", DB_POOL_SIZE=2, DB_MAX_OVERFLOW=0)
+        engine = create_engine(url, pool_size=2, max_overflow=0)
+        probe = HealthProbe(engine, settings)
+        yield probe
+        probe.stop()
+        engine.dispose()
+
+    def test_schema_behind_migration_head_is_unavailable(self, probe):
+        """Test that an unmigrated database is not ready"""
+        result = probe.run_once()
+        assert result["status"] == "unavailable"
+        assert result["checks"]["migrations"]["current"] == []
+
+        with probe.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"
+            )
+            for head in migration_heads():
+                connection.exec_driver_sql(f"INSERT INTO alembic_version VALUES ('{head}')")
+        assert probe.run_once()["status"] == "ok"
+
+    def test_schema_revision_relative_to_code(self, probe):
+        """Test that only a schema behind the code is unavailable"""
+        older = sorted(migration_revisions() - set(migration_heads()))[0]
+        with probe.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"
+            )
+            connection.exec_driver_sql(f"INSERT INTO alembic_version VALUES ('{older}')")
+        assert probe.run_once()["checks"]["migrations"]["status"] == "unavailable"
+
+        # Migrated by a newer deploy than this worker's code
+        with probe.engine.begin() as connection:
+            connection.exec_driver_sql("UPDATE alembic_version SET version_num = 'ffffffffffff'")
+        result = probe.run_once()
+        assert result["checks"]["migrations"]["status"] == "degraded"
+        assert result["status"] == "degraded"
+
+    def test_failed_migration_check_is_degraded(self, probe, monkeypatch):
+        """Test that a failing migration check is reported on its own, not as unreachable"""
+        def broken_scripts():
+            raise FileNotFoundError("alembic.ini")
+
+        monkeypatch.setattr("app.health.migration_heads", broken_scripts)
+        result = probe.run_once()
+        assert result["status"] == "degraded"
+        assert result["checks"]["database"]["status"] == "ok"
+        assert result["checks"]["migrations"] == {
+            "status": "degraded",
+            "reason": "migration check failed",
+            "error": "FileNotFoundError",
+        }
+
+    def test_pool_saturation_thresholds(self, probe):
+        """Test degraded and unavailable pool saturation"""
+        probe.settings.HEALTH_CHECK_MIGRATIONS = False
+        probe.settings.HEALTH_POOL_SATURATION_WARN = 0.5
+        first = probe.engine.connect()
+        assert probe.run_once()["checks"]["pool"] == {"status": "degraded", "saturation": 0.5}
+        second = probe.engine.connect()
+        assert probe.run_once()["status"] == "unavailable"
+        first.close()
+        second.close()
+        assert probe.run_once()["status"] == "ok"
+
+    def test_latency_threshold(self, probe):
+        """Test that a slow SELECT 1 degrades readiness"""
+        probe.settings.HEALTH_CHECK_MIGRATIONS = False
+        probe.settings.HEALTH_DB_LATENCY_WARN_MS = 0
+        assert probe.run_once()["checks"]["database"]["status"] == "degraded"
+
+    def test_stale_result_is_unavailable(self, probe):
+        """Test that a stuck probe stops reporting ready"""
+        probe.settings.HEALTH_CHECK_MIGRATIONS = False
+        assert probe.report()["status"] == "unavailable"
+        probe.run_once()
+        assert probe.report()["status"] == "ok"
+        probe.settings.HEALTH_PROBE_STALE_SECONDS = -1
+        assert probe.report()["status"] == "unavailable"
@@ -275,3 +275,175 @@ class TestTicketTagAssociation:
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert len(data["tickets"]) == 2
+
+
+class TestTagUpsert:
+    """Tests for bulk tag upsert"""
+
+    def test_upsert_tags(self, client):
+        """Test that tags are created, updated or left alone by name"""
+        kept = client.post("/api/tags", json={"name": "bug", "color": "#ff0000"}).json()
+        recolored = client.post("/api/tags", json={"name": "feature", "color": "#00ff00"}).json()
+
+        response = client.post("/api/tags/batch", json={"tags": [
+            {"name": "new"},
+            {"name": "BUG"},
+            {"name": "Feature", "color": "#0000ff"},
+            {"name": "bug"},
+        ]})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["updated"] == [recolored["id"]]
+        assert data["unchanged"] == [kept["id"]]
+        assert len(data["created"]) == 1
+
+        tag = client.get(f"/api/tags/{recolored['id']}").json()
+        assert (tag["name"], tag["color"], tag["version"]) == ("Feature", "#0000ff", 2)
+        names = sorted(tag["name"] for tag in client.get("/api/tags").json()["tags"])
+        assert names == ["Feature", "bug", "new"]
+
+    def test_upsert_limits(self, client):
+        """Test that empty and oversized tag lists are rejected"""
+        from app.config import settings
+
+        response = client.post("/api/tags/batch", json={"tags": []})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        too_many = [{"name": f"tag-{i}"} for i in range(settings.TAG_UPSERT_MAX_TAGS + 1)]
+        response = client.post("/api/tags/batch", json={"tags": too_many})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestTagDeleteAndMerge:
+    """Tests for set-based tag deletion and merging"""
+
+    def test_delete_tag_removes_associations(self, client):
+        """Test that deleting a used tag untags its tickets"""
+        tag = client.post("/api/tags", json={"name": "bug"}).json()
+        ticket = client.post("/api/tickets", json={"title": "Tagged", "tagIds": [tag["id"]]}).json()
+
+        assert client.delete(f"/api/tags/{tag['id']}").status_code == status.HTTP_204_NO_CONTENT
+        assert client.get(f"/api/tickets/{ticket['id']}").json()["tags"] == []
+
+    def test_merge_tag(self, client):
+        """Test that merging moves tickets to the target and deletes the source"""
+        source = client.post("/api/tags", json={"name": "bugs"}).json()
+        target = client.post("/api/tags", json={"name": "bug"}).json()
+        only_source = client.post(
+            "/api/tickets", json={"title": "One", "tagIds": [source["id"]]}
+        ).json()
+        both = client.post(
+            "/api/tickets", json={"title": "Two", "tagIds": [source["id"], target["id"]]}
+        ).json()
+
+        response = client.post(f"/api/tags/{source['id']}/merge", json={"targetId": target["id"]})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == target["id"]
+
+        for ticket in (only_source, both):
+            tags = client.get(f"/api/tickets/{ticket['id']}").json()["tags"]
+            assert [tag["id"] for tag in tags] == [target["id"]]
+        assert client.get(f"/api/tags/{source['id']}").status_code == status.HTTP_404_NOT_FOUND
+        counts = {tag["name"]: tag["ticketCount"] for tag in client.get("/api/tags").json()["tags"]}
+        assert counts == {"bug": 2}
+
+    def test_merge_tag_errors(self, client):
+        """Test merging into itself or with a missing tag"""
+        tag = client.post("/api/tags", json={"name": "bug"}).json()
+
+        response = client.post(f"/api/tags/{tag['id']}/merge", json={"targetId": tag["id"]})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = client.post(f"/api/tags/{tag['id']}/merge", json={"targetId": 99999})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "99999" in response.json()["detail"]
+
+
+class TestTagSuggest:
+    """Tests for tag name suggestions"""
+
+    def test_suggest_by_prefix_and_usage(self, client):
+        """Test prefix matching, ranking by usage and the exact match first"""
+        ids = {
+            name: client.post("/api/tags", json={"name": name}).json()["id"]
+            for name in ("android", "Andromeda", "and", "backend", "an_x")
+        }
+        for tag_ids in ([ids["android"]], [ids["android"]], [ids["Andromeda"], ids["backend"]]):
+            client.post("/api/tickets", json={"title": "Tagged", "tagIds": tag_ids})
+
+        response = client.get("/api/tags/suggest?q=AND")
+        assert response.status_code == status.HTTP_200_OK
+        assert [tag["name"] for tag in response.json()["tags"]] == ["and", "android", "Andromeda"]
+
+        names = [
+            tag["name"] for tag in client.get("/api/tags/suggest?q=andr&limit=1").json()["tags"]
+        ]
+        assert names == ["android"]
+        # LIKE wildcards in q are matched literally
+        names = [tag["name"] for tag in client.get("/api/tags/suggest?q=an_").json()["tags"]]
+        assert names == ["an_x"]
+        assert client.get("/api/tags/suggest").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_suggest_short_prefix_cache_invalidated(self, client):
+        """Test that cached short prefixes see new tags"""
+        client.post("/api/tags", json={"name": "bug"})
+        assert len(client.get("/api/tags/suggest?q=b").json()["tags"]) == 1
+
+        client.post("/api/tags", json={"name": "build"})
+        assert len(client.get("/api/tags/suggest?q=b").json()["tags"]) == 2
+
+        response = client.get("/api/tags/suggest?q=b&limit=51")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestTagConcurrency:
+    """Tests for optimistic concurrency control on tags"""
+
+    def test_update_tag_with_stale_version(self, client):
+        """Test that a stale If-Match is rejected with 412"""
+        tag = client.post("/api/tags", json={"name": "race", "color": "#ff0000"}).json()
+        etag = client.get(f"/api/tags/{tag['id']}").headers["ETag"]
+
+        client.put(f"/api/tags/{tag['id']}", json={"color": "#00ff00"})
+        response = client.put(
+            f"/api/tags/{tag['id']}",
+            json={"color": "#0000ff"},
+            headers={"If-Match": etag}
+        )
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert client.get(f"/api/tags/{tag['id']}").json()["color"] == "#00ff00"
+
+    @staticmethod
+    def insert_tag_before_write(db_session, name):
+        """Insert a tag named name right before the request's INSERT or UPDATE of a tag"""
+        from sqlalchemy import event, insert
+        from app.models.tag import Tag
+
+        done = []
+
+        def race(session):
+            if not done:
+                done.append(True)
+                session.connection().execute(insert(Tag).values(name=name))
+
+        event.listen(db_session, "before_flush", lambda session, *args: race(session))
+        event.listen(
+            db_session, "do_orm_execute",
+            lambda state: race(state.session) if state.is_update else None
+        )
+
+    def test_create_tag_name_race(self, client, db_session):
+        """Test that a name taken after the duplicate check is still a 400"""
+        self.insert_tag_before_write(db_session, "Race")
+        response = client.post("/api/tags", json={"name": "race"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Tag 'race' already exists"
+
+    def test_rename_tag_name_race(self, client, db_session):
+        """Test that a rename to a name taken after the check is a 400"""
+        tag = client.post("/api/tags", json={"name": "old"}).json()
+        self.insert_tag_before_write(db_session, "New")
+        response = client.put(f"/api/tags/{tag['id']}", json={"name": "new"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Tag 'new' already exists"
+        assert client.get(f"/api/tags/{tag['id']}").json()["name"] == "old"
@@ -250,6 +250,96 @@ class TestTicketFiltering:
             data = response.json()
             assert len(data["tickets"]) == 1
 
+    def test_same_filter_shape_reuses_statement(self, client, db_session):
+        """Test that filters of the same shape reuse one statement and its compiled SQL"""
+        from sqlalchemy import event
+        from sqlalchemy.engine.default import CACHE_HIT
+
+        from app.services.ticket_service import _list_statement
+
+        tag_id = client.post("/api/tags", json={"name": "ui"}).json()["id"]
+        for title in ["Important task", "Regular task"]:
+            ticket = client.post("/api/tickets", json={"title": title}).json()
+            client.post(f"/api/tickets/{ticket['id']}/tags", json={"tagIds": [tag_id]})
+
+        client.get(f"/api/tickets?search=important&tags={tag_id}&status=open")
+        hits = _list_statement.cache_info().hits
+        cache_hits = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith("SELECT tickets."):
+                cache_hits.append(context.cache_hit == CACHE_HIT)
+
+        bind = db_session.get_bind()
+        event.listen(bind, "before_cursor_execute", record)
+        try:
+            response = client.get(f"/api/tickets?search=regular&tags={tag_id}&status=open")
+        finally:
+            event.remove(bind, "before_cursor_execute", record)
+
+        assert [t["title"] for t in response.json()["tickets"]] == ["Regular task"]
+        assert _list_statement.cache_info().hits == hits + 1
+        assert cache_hits and all(cache_hits)
+
+
+class TestQueryGuards:
+    """Tests for search/list cost guards"""
+
+    def test_short_search_matches_title_prefix(self, client):
+        """Test that searches under the minimum length only match title prefixes"""
+        client.post("/api/tickets", json={"title": "Bug in login"})
+        client.post("/api/tickets", json={"title": "Login is slow", "description": "bad"})
+
+        titles = [t["title"] for t in client.get("/api/tickets?search=b").json()["tickets"]]
+        assert titles == ["Bug in login"]
+        assert len(client.get("/api/tickets?search=login").json()["tickets"]) == 2
+
+    def test_search_wildcards_are_literal(self, client):
+        """Test that % and _ in a search term are not LIKE wildcards"""
+        client.post("/api/tickets", json={"title": "100% done"})
+        client.post("/api/tickets", json={"title": "1000 items"})
+
+        found = client.get("/api/tickets?search=00%25").json()["tickets"]
+        assert [t["title"] for t in found] == ["100% done"]
+        assert client.get("/api/tickets?search=___").json()["tickets"] == []
+
+    def test_limit_and_truncation(self, client):
+        """Test that lists are capped and report truncation"""
+        for i in range(3):
+            client.post("/api/tickets", json={"title": f"Ticket {i}"})
+
+        data = client.get("/api/tickets?limit=2").json()
+        assert len(data["tickets"]) == 2
+        assert data["truncated"] is True
+        assert client.get("/api/tickets?limit=3").json()["truncated"] is False
+
+    def test_limit_above_maximum(self, client):
+        """Test that limits above TICKET_LIST_MAX_RESULTS are rejected"""
+        response = client.get("/api/tickets?limit=1000000")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_statement_timeout_becomes_503(self, db_session):
+        """Test that a cancelled statement is a 503 with a metric, not a 500"""
+        from fastapi import HTTPException
+        from sqlalchemy.exc import OperationalError
+
+        from app.metrics import metrics
+        from app.services.query_guards import QUERY_CANCELED, statement_timeout
+
+        class QueryCanceled(Exception):
+            pgcode = QUERY_CANCELED
+
+        before = metrics.get("db.statement_timeouts.tickets_search")
+        with pytest.raises(HTTPException) as exc_info:
+            with statement_timeout(db_session, "tickets_search"):
+                raise OperationalError("SELECT ...", {}, QueryCanceled())
+        assert exc_info.value.status_code == 503
+        assert metrics.get("db.statement_timeouts.tickets_search") == before + 1
+
+        with pytest.raises(OperationalError):
+            with statement_timeout(db_session, "tickets_search"):
+                raise OperationalError("SELECT ...", {}, Exception("connection lost"))
+
 
 class TestBatchOperations:
     """Tests for batch operations on tickets"""
@@ -415,3 +505,330 @@ class TestBatchOperations:
         )
         assert response.status_code == status.HTTP_200_OK
         assert response.json()["affectedCount"] == 3
+
+    def test_batch_return_representation(self, client):
+        """Test that Prefer: return=representation returns the affected tickets"""
+        tag_id = client.post("/api/tags", json={"name": "urgent"}).json()["id"]
+        ticket_ids = [
+            client.post("/api/tickets", json={"title": title, "tagIds": [tag_id]}).json()["id"]
+            for title in ("Ticket 1", "Ticket 2")
+        ]
+        prefer = {"Prefer": "return=representation"}
+
+        response = client.post(
+            "/api/tickets/batch/status",
+            json={"ticketIds": ticket_ids + [9999], "isCompleted": True},
+            headers=prefer
+        )
+        assert response.headers["Preference-Applied"] == "return=representation"
+        data = response.json()
+        assert data["affectedCount"] == 2
+        assert sorted(ticket["id"] for ticket in data["tickets"]) == ticket_ids
+        assert all(ticket["isCompleted"] and ticket["version"] == 2 for ticket in data["tickets"])
+        assert data["tickets"][0]["tags"][0]["id"] == tag_id
+        assert data["tickets"][0]["description"] is None
+
+        response = client.post(
+            "/api/tickets/batch/delete",
+            json={"ticketIds": [ticket_ids[0], 9999]},
+            headers=prefer
+        )
+        assert response.json()["deletedIds"] == [ticket_ids[0]]
+
+        # Without the preference the response stays as it was
+        response = client.post(
+            "/api/tickets/batch/status", json={"ticketIds": ticket_ids, "isCompleted": False}
+        )
+        assert "Preference-Applied" not in response.headers
+        assert set(response.json()) == {"success", "affectedCount", "message"}
+
+    def test_batch_representation_is_capped(self, client, monkeypatch):
+        """Test that the preference is ignored above BATCH_GET_MAX_IDS tickets"""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "BATCH_GET_MAX_IDS", 2)
+        for i in range(3):
+            client.post("/api/tickets", json={"title": f"Ticket {i+1}"})
+
+        response = client.post(
+            "/api/tickets/batch/update",
+            json={"filter": {}, "patch": {"description": "Bulk"}},
+            headers={"Prefer": "return=representation"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert "Preference-Applied" not in response.headers
+        assert response.json()["affectedCount"] == 3
+        assert "tickets" not in response.json()
+
+    def test_batch_update_by_ids(self, client, monkeypatch):
+        """Test patching listed tickets in several chunks"""
+        from app.config import settings
+        from app.metrics import metrics
+
+        monkeypatch.setattr(settings, "BATCH_UPDATE_CHUNK_SIZE", 2)
+        ticket_ids = [
+            client.post("/api/tickets", json={"title": f"Ticket {i+1}"}).json()["id"]
+            for i in range(5)
+        ]
+        untouched = client.post("/api/tickets", json={"title": "Other"}).json()
+        invalidations = metrics.get("query_cache.invalidations")
+
+        response = client.post("/api/tickets/batch/update", json={
+            "ticketIds": ticket_ids + [9999],
+            "patch": {"description": "From template", "isCompleted": True}
+        })
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["affectedCount"] == 5
+        # Cached reads are invalidated as each chunk commits
+        assert metrics.get("query_cache.invalidations") == invalidations + 3
+
+        for ticket_id in ticket_ids:
+            ticket = client.get(f"/api/tickets/{ticket_id}").json()
+            fields = (ticket["description"], ticket["isCompleted"], ticket["version"])
+            assert fields == ("From template", True, 2)
+        assert client.get(f"/api/tickets/{untouched['id']}").json()["description"] is None
+
+    def test_batch_update_by_filter(self, client):
+        """Test patching the tickets that match a filter"""
+        tag = client.post("/api/tags", json={"name": "bug"}).json()
+        tagged = client.post("/api/tickets", json={"title": "Crash", "tagIds": [tag["id"]]}).json()
+        other = client.post("/api/tickets", json={"title": "Crash too"}).json()
+
+        response = client.post("/api/tickets/batch/update", json={
+            "filter": {"tags": "bug", "search": "crash"},
+            "patch": {"description": None}
+        })
+        assert response.json()["affectedCount"] == 1
+
+        response = client.post("/api/tickets/batch/update", json={
+            "filter": {"tags": "no-such-tag"},
+            "patch": {"title": "Renamed"}
+        })
+        assert response.json()["affectedCount"] == 0
+        assert client.get(f"/api/tickets/{other['id']}").json()["title"] == "Crash too"
+        assert client.get(f"/api/tickets/{tagged['id']}").json()["version"] == 2
+
+    def test_batch_update_invalid_requests(self, client):
+        """Test that ambiguous targets and empty or invalid patches are rejected"""
+        ticket_id = client.post("/api/tickets", json={"title": "Ticket"}).json()["id"]
+        for body, expected in [
+            ({"patch": {"title": "x"}}, status.HTTP_400_BAD_REQUEST),
+            (
+                {"ticketIds": [ticket_id], "filter": {}, "patch": {"title": "x"}},
+                status.HTTP_400_BAD_REQUEST,
+            ),
+            ({"ticketIds": [ticket_id], "patch": {}}, status.HTTP_400_BAD_REQUEST),
+            (
+                {"ticketIds": [ticket_id], "patch": {"title": None}},
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+            ),
+        ]:
+            response = client.post("/api/tickets/batch/update", json=body)
+            assert response.status_code == expected, body
+
+    def test_batch_get_tickets(self, client):
+        """Test fetching tickets by ID in request order with missing IDs reported"""
+        tag_id = client.post("/api/tags", json={"name": "urgent"}).json()["id"]
+        ticket_ids = [
+            client.post("/api/tickets", json={"title": title, "tagIds": [tag_id]}).json()["id"]
+            for title in ("Ticket 1", "Ticket 2", "Ticket 3")
+        ]
+        client.delete(f"/api/tickets/{ticket_ids[1]}")
+
+        requested = [ticket_ids[2], 9999, ticket_ids[0], ticket_ids[1], ticket_ids[2]]
+        response = client.post("/api/tickets/batch/get", json={"ticketIds": requested})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [ticket["id"] for ticket in data["tickets"]] == [ticket_ids[2], ticket_ids[0]]
+        assert data["tickets"][0]["tags"][0]["id"] == tag_id
+        assert data["missingIds"] == [9999, ticket_ids[1]]
+
+    def test_batch_get_loads_tags_in_one_query(self, client, db_session):
+        """Test that a large batch get is two statements, however many tickets"""
+        from sqlalchemy import event
+        from app.models.tag import Tag
+        from app.models.ticket import Ticket
+
+        tags = [Tag(name="bug"), Tag(name="ui")]
+        tickets = [Ticket(title=f"Ticket {i}", tags=tags[: i % 3]) for i in range(1200)]
+        db_session.add_all(tickets)
+        db_session.commit()
+        ticket_ids = [ticket.id for ticket in tickets]
+        db_session.expunge_all()
+
+        statements = []
+        bind = db_session.get_bind()
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(bind, "before_cursor_execute", record)
+        try:
+            response = client.post("/api/tickets/batch/get", json={"ticketIds": ticket_ids})
+        finally:
+            event.remove(bind, "before_cursor_execute", record)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len([sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]) == 2
+        returned = response.json()["tickets"]
+        assert [len(ticket["tags"]) for ticket in returned[:3]] == [0, 1, 2]
+        assert len(returned) == 1200
+
+    def test_batch_get_limits(self, client):
+        """Test that empty and oversized ID lists are rejected"""
+        from app.config import settings
+
+        response = client.post("/api/tickets/batch/get", json={"ticketIds": []})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        too_many = list(range(1, settings.BATCH_GET_MAX_IDS + 2))
+        response = client.post("/api/tickets/batch/get", json={"ticketIds": too_many})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestTicketChanges:
+    """Tests for incremental sync"""
+
+    def test_parse_sync_token(self):
+        """Test that an empty token means a full sync"""
+        from app.services.ticket_service import parse_sync_token
+
+        assert parse_sync_token(None) == 0
+        assert parse_sync_token("") == 0
+        assert parse_sync_token("1234") == 1234
+
+    def test_invalid_sync_token(self, client):
+        """Test that a malformed token is rejected"""
+        response = client.get("/api/tickets/changes?since=yesterday")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_changes_require_postgres(self, client):
+        """Test that change tracking reports it is unavailable on SQLite"""
+        response = client.get("/api/tickets/changes")
+        assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+
+class TestTicketConcurrency:
+    """Tests for optimistic concurrency control"""
+
+    def test_get_ticket_returns_etag(self, client):
+        """Test that a ticket exposes its version as an ETag"""
+        ticket = client.post("/api/tickets", json={"title": "Versioned"}).json()
+        response = client.get(f"/api/tickets/{ticket['id']}")
+        assert response.headers["ETag"] == f'"{ticket["version"]}"'
+
+    def test_update_with_matching_version(self, client):
+        """Test that an update with the current ETag succeeds and bumps it"""
+        ticket = client.post("/api/tickets", json={"title": "Original"}).json()
+        etag = client.get(f"/api/tickets/{ticket['id']}").headers["ETag"]
+
+        response = client.put(
+            f"/api/tickets/{ticket['id']}",
+            json={"title": "Updated"},
+            headers={"If-Match": etag}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["version"] == ticket["version"] + 1
+        assert response.headers["ETag"] != etag
+
+    def test_update_with_stale_version(self, client):
+        """Test that a concurrent edit is rejected with 412"""
+        ticket = client.post("/api/tickets", json={"title": "Original"}).json()
+        etag = client.get(f"/api/tickets/{ticket['id']}").headers["ETag"]
+
+        client.put(f"/api/tickets/{ticket['id']}", json={"title": "First writer"})
+        response = client.put(
+            f"/api/tickets/{ticket['id']}",
+            json={"title": "Second writer"},
+            headers={"If-Match": etag}
+        )
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert client.get(f"/api/tickets/{ticket['id']}").json()["title"] == "First writer"
+
+    def test_toggle_with_stale_version(self, client):
+        """Test that toggling completion honors If-Match"""
+        ticket = client.post("/api/tickets", json={"title": "Toggle"}).json()
+        client.patch(f"/api/tickets/{ticket['id']}/complete")
+
+        response = client.patch(
+            f"/api/tickets/{ticket['id']}/complete",
+            headers={"If-Match": f'"{ticket["version"]}"'}
+        )
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    def test_delete_with_stale_version(self, client):
+        """Test that deleting honors If-Match"""
+        ticket = client.post("/api/tickets", json={"title": "Delete me"}).json()
+        client.put(f"/api/tickets/{ticket['id']}", json={"title": "Edited"})
+
+        response = client.delete(f"/api/tickets/{ticket['id']}", headers={"If-Match": '"1"'})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        response = client.delete(f"/api/tickets/{ticket['id']}", headers={"If-Match": '"2"'})
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        response = client.delete(f"/api/tickets/{ticket['id']}", headers={"If-Match": '"3"'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_conditional_update_of_missing_ticket(self, client):
+        """Test that a missing ticket is still a 404, not a 412"""
+        response = client.put(
+            "/api/tickets/99999",
+            json={"title": "Updated"},
+            headers={"If-Match": '"1"'}
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestSoftDelete:
+    """Tests for soft delete, restore and purge"""
+
+    def test_deleted_ticket_is_hidden_but_kept(self, client, db_session):
+        """Test that delete only marks the row"""
+        from app.models.ticket import Ticket
+
+        ticket = client.post("/api/tickets", json={"title": "Soft"}).json()
+        client.delete(f"/api/tickets/{ticket['id']}")
+
+        assert client.get("/api/tickets").json()["tickets"] == []
+        row = db_session.query(Ticket).filter(Ticket.id == ticket["id"]).one()
+        assert row.deleted_at is not None
+
+    def test_restore_deleted_ticket(self, client):
+        """Test that a deleted ticket can be restored with its tags"""
+        tag = client.post("/api/tags", json={"name": "keep"}).json()
+        ticket = client.post(
+            "/api/tickets", json={"title": "Undo me", "tagIds": [tag["id"]]}
+        ).json()
+        client.post("/api/tickets/batch/delete", json={"ticketIds": [ticket["id"]]})
+        assert client.get("/api/tags").json()["tags"][0]["ticketCount"] == 0
+
+        response = client.post(f"/api/tickets/{ticket['id']}/restore")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["tags"][0]["id"] == tag["id"]
+        assert len(client.get("/api/tickets").json()["tickets"]) == 1
+        assert client.get("/api/tags").json()["tags"][0]["ticketCount"] == 1
+
+    def test_restore_live_ticket_fails(self, client):
+        """Test that only deleted tickets can be restored"""
+        ticket = client.post("/api/tickets", json={"title": "Alive"}).json()
+        response = client.post(f"/api/tickets/{ticket['id']}/restore")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_delete_twice(self, client):
+        """Test that deleting an already deleted ticket is a 404"""
+        ticket = client.post("/api/tickets", json={"title": "Once"}).json()
+        client.delete(f"/api/tickets/{ticket['id']}")
+        response = client.delete(f"/api/tickets/{ticket['id']}")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_purge_respects_retention(self, client, db_session):
+        """Test that the purger only removes deletions past the retention window"""
+        from app.models.ticket import Ticket
+        from app.services.purge_service import purge_deleted_tickets
+
+        ids = [client.post("/api/tickets", json={"title": f"T{i}"}).json()["id"] for i in range(3)]
+        client.post("/api/tickets/batch/delete", json={"ticketIds": ids})
+
+        assert purge_deleted_tickets(db_session, retention_seconds=3600) == 0
+        assert purge_deleted_tickets(db_session, retention_seconds=-60, batch_size=2) == 2
+        assert purge_deleted_tickets(db_session, retention_seconds=-60, batch_size=2) == 1
+        assert db_session.query(Ticket).count() == 0
@@ -0,0 +1,122 @@
+"""
+Tests for request tracing
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app import tracing
+from app.config import Settings
+from app.database import get_db
+from app.main import create_app
+
+pytest.importorskip("opentelemetry.sdk")
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def traced_app(db_session, tmp_path):
+    """App exporting every new trace to a file; returns (client, read_spans)"""
+    path = tmp_path / "traces.jsonl"
+
+    def build(sample_ratio=1.0):
+        app = create_app(Settings(
+            DATABASE_URL="sqlite://", SECRET_KEY="test", TRACING_ENABLED=True,
+            TRACING_EXPORTER="file", TRACING_FILE_PATH=str(path), TRACING_SAMPLE_RATIO=sample_ratio
+        ))
+        app.dependency_overrides[get_db] = lambda: db_session
+
+        def read_spans():
+            app.state.tracer_provider.force_flush()
+            return (
+                [json.loads(line) for line in path.read_text().splitlines()]
+                if path.exists()
+                else []
+            )
+
+        return TestClient(app), read_spans
+
+    yield build
+    tracing.configure_tracing(Settings(DATABASE_URL="sqlite://", SECRET_KEY="test"))
+
+
+class TestTracing:
+    """Tests for spans across the request, service and SQL layers"""
+
+    def test_request_trace(self, traced_app):
+        """Test the span tree of a request continuing the caller's trace"""
+        client, read_spans = traced_app()
+        client.post("/api/tickets/", json={"title": "Secret launch plan"})
+
+        response = client.get(
+            "/api/tickets/?search=launch&status=open",
+            headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        spans = [span for span in read_spans() if span["context"]["trace_id"] == "0x" + TRACE_ID]
+        by_name = {span["name"]: span for span in spans}
+        server = by_name["GET /api/tickets/"]
+        assert server["parent_id"] == "0x" + PARENT_ID
+        assert server["attributes"]["url.query"] == "search=REDACTED&status=open"
+        assert "fastapi.serialization" in by_name
+
+        service = by_name["ticket_service.get_tickets"]
+        assert service["attributes"]["search.length"] == 6
+        assert service["attributes"]["search.mode"] == "contains"
+        assert service["attributes"]["tickets.filter.status"] == "open"
+        assert service["attributes"]["tickets.returned"] == 1
+
+        selects = [span for span in spans if span["name"] == "db SELECT"]
+        assert selects
+        assert all(span["parent_id"] == service["context"]["span_id"] for span in selects)
+        # SQLite reports no row count for SELECTs; Postgres does
+        assert all(span["attributes"]["db.system.name"] == "sqlite" for span in selects)
+
+        # Search text is never recorded
+        assert not any("launch" in json.dumps(span) for span in spans)
+
+    def test_sampling_follows_parent(self, traced_app):
+        """Test that unsampled new traces export nothing, sampled parents win"""
+        client, read_spans = traced_app(sample_ratio=0.0)
+        client.get("/api/tickets/")
+        assert read_spans() == []
+
+        client.get("/api/tags/", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+        names = {span["name"] for span in read_spans()}
+        assert {"GET /api/tags/", "tag_service.get_tags_with_counts", "db SELECT"} <= names
+
+    def test_off_by_default(self, client):
+        """Test that no tracer is configured unless tracing is enabled"""
+        assert client.app.state.tracer_provider is None
+        assert tracing._tracer is None
+
+    def test_sdk_not_imported_when_off(self):
+        """Test that building an app without tracing leaves the SDK unloaded"""
+        script = (
+            "import sys\n"
+            "from app.config import Settings\n"
+            "from app.main import create_app\n"
+            "create_app(Settings(DATABASE_URL='sqlite://', SECRET_KEY='test'))\n"
+            "print('opentelemetry.sdk' in sys.modules)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == "False"
+
+    def test_shutdown_closes_trace_file(self, traced_app):
+        """Test that shutting the provider down exports buffered spans and closes the file"""
+        client, read_spans = traced_app()
+        client.get("/api/tags/")
+        provider = client.app.state.tracer_provider
+
+        tracing.shutdown_tracer_provider(provider)
+        assert provider.trace_file.closed
+        assert "GET /api/tags/" in {span["name"] for span in read_spans()}